@@ -1,26 +1,61 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Blueprint, Flask, Response, abort, request, jsonify
 from flask_cors import CORS
-from predict import predict_injury_risk
+from predict import (
+    predict_injury_risk, predict_injury_risk_batch, predict_sensitivity, prediction_cache, batcher_stats, close_batcher,
+    close_athlete_store, get_athlete_store, _check_encoders
+)
+from batcher import BatcherFullError, BatcherTimeoutError
 from recommendation import generate_recommendations
+from llm_client import LLMBusyError, LLMClient, LLMTimeoutError, LLMUpstreamError
+from cache import MISSING, SingleFlight, TTLCache
+from static_assets import StaticAssets
+from hot_reload import ReloadInProgressError, reloader
+import instrumentation
+import model_registry
+from settings import env_flag, env_float, env_int
+import hmac
+import math
 import os
-import requests
+import re
 import json
 import logging
+import threading
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# Set up logging (LOG_LEVEL=DEBUG also logs chat requests and answers)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
-# Define paths using relative paths
-# Frontend folder is at final 3/UI2, so go up two levels from api to final 3, then into UI2
-FRONTEND_FOLDER = os.path.join(os.path.dirname(__file__), "..", "..", "UI2")
+# Frontend folder shipped with the repository (FRONTEND_FOLDER overrides it)
+FRONTEND_FOLDER = os.environ.get("FRONTEND_FOLDER") or os.path.join(os.path.dirname(__file__), "..", "UI")
+
+# Frontend assets are fingerprinted, precompressed and served from memory;
+# SERVE_STATIC=0 leaves them to a front proxy (see static_assets.py)
+SERVE_STATIC = env_flag("SERVE_STATIC", True)
+STATIC_COMPRESSION = env_flag("STATIC_COMPRESSION", True)
+static_assets = StaticAssets(FRONTEND_FOLDER, compress=STATIC_COMPRESSION) if SERVE_STATIC else None
+
+# Load all model artifacts up front, e.g. in the gunicorn master with --preload
+# so forked workers share them; otherwise they load on the first prediction
+if env_flag("MODEL_PRELOAD"):
+    model_registry.preload()
+
+# Bearer token for the /admin endpoints; they are disabled (404) when unset,
+# since reloading a model directory unpickles whatever it contains
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
 
-app = Flask(__name__, static_folder=FRONTEND_FOLDER, static_url_path="")
-CORS(app)
+# Largest accepted request body; /predict/batch payloads of MAX_BATCH_SIZE
+# records stay well below the default 8 MB
+MAX_CONTENT_LENGTH = env_int("MAX_CONTENT_LENGTH", 8 * 1024 * 1024)
 
-# Cohere API setup
-COHERE_API_TOKEN = ""  # Replace with your Cohere API token
-COHERE_API_URL = "https://api.cohere.ai/v1/generate"
+api = Blueprint("api", __name__)
+frontend = Blueprint("frontend", __name__)
+
+# Set once the server starts shutting down, so /readyz takes the instance out of rotation
+draining = threading.Event()
+
+# Cohere API client: pooled keep-alive connections, timeouts and a concurrency limit
+# (COHERE_API_URL, COHERE_API_TOKEN and LLM_* environment variables, see llm_client.py)
+llm = LLMClient()
 
 # System prompt for context
 SYSTEM_PROMPT = (
@@ -33,45 +68,163 @@ SYSTEM_PROMPT = (
     "For personal injury risk queries, prompt the user to provide data via the calculator form."
 )
 
-# Serve index.html
-@app.route("/", methods=["GET"])
-def serve_index():
-    return send_from_directory(FRONTEND_FOLDER, "index.html")
+# Cache of chatbot answers keyed on the normalized question; concurrent
+# identical questions share one upstream call
+CHAT_CACHE_SIZE = env_int("CHAT_CACHE_SIZE", 512)
+CHAT_CACHE_TTL = env_float("CHAT_CACHE_TTL", 3600.0)
+chat_cache = TTLCache(maxsize=CHAT_CACHE_SIZE, ttl=CHAT_CACHE_TTL)
+chat_flights = SingleFlight()
 
-# Serve calculator.html
-@app.route("/calculator.html", methods=["GET"])
-def serve_calculator():
-    return send_from_directory(FRONTEND_FOLDER, "calculator.html")
+# Typical athlete used to enrich prevention answers; its tips never change,
+# so they are computed once at startup
+PREVENTION_SAMPLE_INPUT = {
+    "Fatigue_Level": 5,
+    "Recovery_Time_Between_Sessions": 12,
+    "Total_Weekly_Training_Hours": 10,
+    "High_Intensity_Training_Hours": 3,
+    "Previous_Injury_Count": 0,
+    "Flexibility_Score": 5,
+    "Agility_Score": 5,
+    "Strength_Training_Frequency": 2,
+    "Experience_Level": 1,
+    "Sport_Type": 0
+}
+PREVENTION_TIPS = " Specific tips: " + ", ".join(generate_recommendations(PREVENTION_SAMPLE_INPUT))
 
-# Serve about.html
-@app.route("/about.html", methods=["GET"])
-def serve_about():
-    return send_from_directory(FRONTEND_FOLDER, "about.html")
+def normalize_question(text):
+    """
+    Normalize a chat question for caching: lowercase, single spaces, no trailing punctuation.
 
-# Serve chatbot.html
-@app.route("/chatbot.html", methods=["GET"])
-def serve_chatbot():
-    return send_from_directory(FRONTEND_FOLDER, "chatbot.html")
+    Args:
+        text (str): Raw question.
 
-# Serve static files (JS, CSS)
-@app.route("/<path:filename>")
+    Returns:
+        str: Normalized question.
+    """
+    return re.sub(r"\s+", " ", text.lower()).strip().rstrip("?!. ")
+
+def answer_question(question):
+    """
+    Answer a general question through the cache, coalescing identical in-flight calls.
+
+    Args:
+        question (str): Normalized question.
+
+    Returns:
+        str: Backend answer.
+    """
+    answer = chat_cache.get(question)
+    if answer is not MISSING:
+        return answer
+
+    def fetch():
+        result = llm.generate(f"{SYSTEM_PROMPT}\nUser: {question}\nAssistant:", max_tokens=100, temperature=0.7)
+        chat_cache.set(question, result)
+        return result
+
+    return chat_flights.do(question, fetch)
+
+# Serve index.html
+@frontend.route("/", methods=["GET"])
+def serve_index():
+    return serve_static_files("index.html")
+
+# Serve the HTML pages and static files (JS, CSS)
+@frontend.route("/<path:filename>", methods=["GET"])
 def serve_static_files(filename):
-    return send_from_directory(FRONTEND_FOLDER, filename)
+    response = static_assets.response(filename, request)
+    if response is None:
+        abort(404)
+    return response
+
+def query_flag(name):
+    """Read a boolean query parameter, e.g. ``?explain=1`` ("1", "true", "yes", "on" are true)."""
+    return request.args.get(name, "").strip().lower() in ("1", "true", "yes", "on")
 
 # API: Injury prediction
-@app.route("/predict", methods=["POST"])
+@api.route("/predict", methods=["POST"])
 def predict():
+    instrumentation.count("predict")
     try:
         input_data = request.get_json()
-        result = predict_injury_risk(input_data)  # Pass only input_data
+        explain = query_flag("explain")
+        if explain:
+            instrumentation.count("predict_explain")
+        result = predict_injury_risk(input_data, explain=explain)  # Pass only input_data
         return jsonify(result)
+    except BatcherFullError as e:
+        instrumentation.count("predict_errors")
+        logger.warning(str(e))
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+    except BatcherTimeoutError as e:
+        instrumentation.count("predict_errors")
+        logger.error(str(e))
+        return jsonify({"error": str(e)}), 504
     except Exception as e:
+        instrumentation.count("predict_errors")
         logger.error(f"Predict endpoint error: {str(e)}")
         return jsonify({"error": str(e)}), 400
 
+# API: Batch injury prediction
+@api.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    instrumentation.count("predict_batch")
+    try:
+        input_data = request.get_json()
+        records = input_data.get("records") if isinstance(input_data, dict) else input_data
+        result = predict_injury_risk_batch(records, explain=query_flag("explain"))
+        instrumentation.count("predict_batch_records", len(records))
+        return jsonify(result)
+    except Exception as e:
+        instrumentation.count("predict_batch_errors")
+        logger.error(f"Batch predict endpoint error: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+
+# API: What-if risk surface for one athlete over a grid of feature values
+@api.route("/predict/sensitivity", methods=["POST"])
+def predict_sensitivity_endpoint():
+    instrumentation.count("predict_sensitivity")
+    try:
+        input_data = request.get_json()
+        if not isinstance(input_data, dict):
+            return jsonify({"error": "Request body must be a JSON object with 'athlete' and 'grid'."}), 400
+        result = predict_sensitivity(input_data.get("athlete"), input_data.get("grid"))
+        instrumentation.count("predict_sensitivity_points", math.prod(result["shape"]))
+        return jsonify(result)
+    except Exception as e:
+        instrumentation.count("predict_sensitivity_errors")
+        logger.error(f"Sensitivity endpoint error: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+
+# API: Stored records and rolling-load aggregates of one athlete
+@api.route("/athletes/<athlete_id>/history", methods=["GET"])
+def athlete_history(athlete_id):
+    athlete_store = get_athlete_store()
+    if athlete_store is None:
+        return jsonify({"error": "Athlete history is disabled (set ATHLETE_STORE=1)."}), 404
+    try:
+        summary = athlete_store.summary(athlete_id, as_of=request.args.get("as_of"))
+        if summary is None:
+            return jsonify({"error": f"Unknown athlete: {athlete_id}"}), 404
+        limit = request.args.get("limit", default=28, type=int)
+        return jsonify({"summary": summary, "records": athlete_store.records(athlete_id, limit)})
+    except Exception as e:
+        logger.error(f"Athlete history endpoint error: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+
+# API: Per-stage latency histograms and request counts
+@api.route("/metrics", methods=["GET"])
+def metrics():
+    if request.args.get("format") == "prometheus":
+        return Response(instrumentation.render_prometheus(), mimetype="text/plain")
+    return jsonify(dict(instrumentation.snapshot(), prediction_cache=prediction_cache.stats(), llm=llm.stats(),
+                        chat_cache=dict(chat_cache.stats(), **chat_flights.stats()), micro_batching=batcher_stats(),
+                        model={"version": model_registry.registry.version, "shadow": reloader.status()["shadow"]}))
+
 # API: Chatbot
-@app.route("/chat", methods=["POST"])
+@api.route("/chat", methods=["POST"])
 def chat():
+    instrumentation.count("chat")
     try:
         data = request.get_json()
         logger.debug(f"Received chat request: {data}")
@@ -81,7 +234,14 @@ def chat():
         # Check if the query is about prediction
         if "risk" in user_input or "predict" in user_input or "my" in user_input:
             if user_data:
-                result = predict_injury_risk(user_data)  # Pass only user_data
+                try:
+                    result = predict_injury_risk(user_data)  # Pass only user_data
+                except BatcherFullError as e:
+                    logger.warning(str(e))
+                    return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+                except BatcherTimeoutError as e:
+                    logger.error(str(e))
+                    return jsonify({"error": str(e)}), 504
                 response = (
                     f"Your injury risk is {result['predicted_risk_level']} "
                     f"({result['injury_likelihood_percent']}%). "
@@ -92,46 +252,21 @@ def chat():
             return jsonify({"response": response, "requires_data": not user_data})
 
         # Cohere API call for general injury questions
-        headers = {
-            "Authorization": f"Bearer {COHERE_API_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model": "command",
-            "prompt": f"{SYSTEM_PROMPT}\nUser: {user_input}\nAssistant:",
-            "max_tokens": 100,
-            "temperature": 0.7
-        }
-        logger.debug(f"Sending Cohere API request: {payload}")
-        response = requests.post(COHERE_API_URL, headers=headers, json=payload)
-        logger.debug(f"Cohere API response status: {response.status_code}, content: {response.text}")
-
-        if response.status_code != 200:
-            logger.error(f"Cohere API error: {response.status_code} - {response.text}")
-            return jsonify({"error": f"Cohere API error: {response.status_code} - {response.text}"}), 500
-
         try:
-            answer = response.json()["generations"][0]["text"].strip()
-        except (KeyError, IndexError, TypeError) as e:
-            logger.error(f"Unexpected API response format: {str(response.json())}")
-            return jsonify({"error": f"Unexpected API response format: {str(response.json())}"}), 500
+            answer = answer_question(normalize_question(user_input))
+        except LLMBusyError as e:
+            logger.warning(str(e))
+            return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+        except LLMTimeoutError as e:
+            logger.error(str(e))
+            return jsonify({"error": str(e)}), 504
+        except LLMUpstreamError as e:
+            logger.error(str(e))
+            return jsonify({"error": str(e)}), 500
 
-        # Enhance prevention queries with dynamic recommendations
+        # Enhance prevention queries with recommendations for a typical athlete
         if "prevent" in user_input or "avoid" in user_input:
-            sample_input = {
-                "Fatigue_Level": 5,
-                "Recovery_Time_Between_Sessions": 12,
-                "Total_Weekly_Training_Hours": 10,
-                "High_Intensity_Training_Hours": 3,
-                "Previous_Injury_Count": 0,
-                "Flexibility_Score": 5,
-                "Agility_Score": 5,
-                "Strength_Training_Frequency": 2,
-                "Experience_Level": 1,
-                "Sport_Type": 0
-            }
-            recs = generate_recommendations(sample_input)
-            answer += " Specific tips: " + ", ".join(recs)
+            answer += PREVENTION_TIPS
 
         logger.debug(f"Chat response: {answer}")
         return jsonify({"response": answer, "requires_data": False})
@@ -139,10 +274,132 @@ def chat():
         logger.error(f"Chat endpoint error: {str(e)}")
         return jsonify({"error": str(e)}), 400
 
+# Liveness: the process is up and serving requests
+@api.route("/healthz", methods=["GET"])
+def healthz():
+    return jsonify({"status": "ok"})
+
+# Readiness: all model artifacts are loaded and the server is not shutting down
+@api.route("/readyz", methods=["GET"])
+def readyz():
+    if draining.is_set():
+        return jsonify({"status": "draining"}), 503
+    missing = [name for name in model_registry.ARTIFACT_FILES if not model_registry.registry.is_loaded(name)]
+    if missing:
+        return jsonify({"status": "loading", "missing": missing}), 503
+    try:
+        _check_encoders()
+    except Exception as e:
+        logger.error(f"Readiness check failed: {str(e)}")
+        return jsonify({"status": "error", "error": str(e)}), 503
+    return jsonify({"status": "ready", "models": model_registry.registry.stats()})
+
+def require_admin():
+    """Abort unless admin endpoints are enabled and the request carries ADMIN_TOKEN."""
+    if not ADMIN_TOKEN:
+        abort(404)
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+        abort(401)
+
+# Admin: serving model version, last reload and shadow comparison
+@api.route("/admin/model", methods=["GET"])
+def admin_model():
+    require_admin()
+    return jsonify(reloader.status())
+
+# Admin: load, validate and swap in (or shadow) a model bundle
+@api.route("/admin/model/reload", methods=["POST"])
+def admin_model_reload():
+    require_admin()
+    options = request.get_json(silent=True) or {}
+    try:
+        report = reloader.reload(options.get("path"), mode="shadow" if options.get("shadow") else "swap",
+                                 background=not options.get("wait", False))
+    except ReloadInProgressError as e:
+        return jsonify({"error": str(e)}), 409
+    if report["status"] == "failed":
+        return jsonify(report), 422
+    return jsonify(report), 202 if report["status"] == "started" else 200
+
+# Admin: serve the shadow version
+@api.route("/admin/model/promote", methods=["POST"])
+def admin_model_promote():
+    require_admin()
+    try:
+        return jsonify({"status": "promoted", "version": model_registry.registry.version,
+                        "shadow": reloader.promote()})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+
+# Admin: stop shadow scoring without promoting
+@api.route("/admin/model/shadow", methods=["DELETE"])
+def admin_model_shadow():
+    require_admin()
+    stats = reloader.stop_shadow()
+    if stats is None:
+        return jsonify({"error": "No shadow version is running."}), 404
+    return jsonify({"status": "stopped", "shadow": stats})
+
+@api.before_request
+def limit_request_size():
+    # Reject oversized bodies up front instead of failing inside the JSON parser
+    if request.content_length is not None and request.content_length > MAX_CONTENT_LENGTH:
+        abort(413)
+
+@api.before_request
+def watch_model_bundle():
+    # Started lazily so each forked worker runs its own manifest watch thread
+    reloader.ensure_watching()
+
+def request_too_large(e):
+    instrumentation.count("request_too_large")
+    return jsonify({"error": f"Request body exceeds the limit of {MAX_CONTENT_LENGTH} bytes."}), 413
+
+def create_app(config=None):
+    """
+    Create the Flask application.
+
+    Args:
+        config (dict, optional): Flask config values overriding the defaults.
+
+    Returns:
+        Flask: Application serving the API and, unless SERVE_STATIC=0, the frontend.
+    """
+    app = Flask(__name__, static_folder=None)
+    app.config["MAX_CONTENT_LENGTH"] = MAX_CONTENT_LENGTH
+    app.config.update(config or {})
+    CORS(app)
+    app.register_blueprint(api)
+    if static_assets is not None:
+        app.register_blueprint(frontend)
+    app.register_error_handler(413, request_too_large)
+    return app
+
+def shutdown(timeout=None):
+    """
+    Release background resources before the process exits.
+
+    Marks the instance as draining, runs the predictions still queued in the
+    micro-batcher, stops shadow scoring and closes the chat backend's pooled
+    connections and the athlete store.
+
+    Args:
+        timeout (float, optional): Seconds to wait for queued predictions.
+    """
+    draining.set()
+    close_batcher(timeout)
+    reloader.close()
+    llm.close()
+    close_athlete_store()
+
+app = create_app()
+
 if __name__ == "__main__":
+    # Development server (debugger and reloader); use serve.py in production
     try:
         print("Starting Flask server...")
-        app.run(debug=True, host="127.0.0.1", port=8000)
+        app.run(debug=True, host="127.0.0.1", port=env_int("PORT", 8000), threaded=True)
     except Exception as e:
         print(f"Error starting Flask server: {str(e)}")
         raise
\ No newline at end of file
@@ -0,0 +1,488 @@
+"""
+Per-athlete training history with incremental rolling-load aggregates.
+
+Records submitted with an ``Athlete_Id`` are appended to an embedded SQLite
+database together with one aggregate row per athlete. The aggregate row holds
+the last 28 days as a ring buffer of daily totals (training load, fatigue
+count and sum) plus running sums over it, so adding a record touches one
+slot and a few sums instead of rescanning history:
+
+- 7- and 28-day rolling load (sum of ``Training_Load_Score``) and their
+  acute:chronic workload ratio, 7-day load / (28-day load / 4);
+- exponentially weighted 7- and 28-day load (daily EWMA with
+  ``2 / (N + 1)`` decay) and their ratio;
+- 28-day mean fatigue and its trend (least-squares slope, points per week).
+
+Records may arrive out of order (e.g. backfills): every aggregate is a sum
+over days, so a late record is added to its own day's slot. Records older
+than the 28-day window only update the EWMAs. The summary returned for a
+backdated record is as of its own day, rebuilt from the stored records up to
+that day, so its ratios and trend never include later training.
+
+An athlete has at most one record per day: a record for a day that already
+has one replaces it, and its load and fatigue are taken out of the
+aggregates first, so resending a record (a client retry) changes nothing.
+``preview`` returns the summaries a set of records would produce without
+storing them, so callers can store a record only once its request succeeded.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ID_FIELD = "Athlete_Id"
+DATE_FIELD = "Record_Date"
+LOAD_FIELD = "Training_Load_Score"
+FATIGUE_FIELD = "Fatigue_Level"
+
+WINDOW_DAYS = 28
+ACUTE_DAYS = 7
+ACUTE_DECAY = 2.0 / (ACUTE_DAYS + 1)
+CHRONIC_DECAY = 2.0 / (WINDOW_DAYS + 1)
+
+# History needed before ratios and trends are reported
+ACWR_MIN_DAYS = 21
+TREND_MIN_RECORDS = 3
+
+# Summary values exposed to the recommendation rules, by rule input name
+RULE_FIELDS = {"Acute_Chronic_Workload_Ratio": "acwr", "Fatigue_Trend": "fatigue_trend"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    athlete_id TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    load REAL NOT NULL,
+    fatigue REAL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_athlete_day ON records (athlete_id, day);
+CREATE TABLE IF NOT EXISTS aggregates (
+    athlete_id TEXT PRIMARY KEY,
+    anchor INTEGER NOT NULL,
+    first_day INTEGER NOT NULL,
+    last_day INTEGER NOT NULL,
+    n_records INTEGER NOT NULL,
+    acute REAL NOT NULL,
+    chronic REAL NOT NULL,
+    ewma_acute REAL NOT NULL,
+    ewma_chronic REAL NOT NULL,
+    fatigue_sums BLOB NOT NULL,
+    ring BLOB NOT NULL
+);
+"""
+
+_COLUMNS = ("anchor", "first_day", "last_day", "n_records", "acute", "chronic", "ewma_acute", "ewma_chronic")
+
+def parse_day(value):
+    """
+    Convert a record date to a day number.
+
+    Args:
+        value: ``None`` (today, UTC), a ``date``/``datetime`` or an ISO 8601 string.
+
+    Returns:
+        int: Proleptic Gregorian ordinal of the date.
+
+    Raises:
+        ValueError: If the value is not a date.
+    """
+    if value is None:
+        return datetime.now(timezone.utc).date().toordinal()
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    try:
+        return datetime.fromisoformat(str(value)).date().toordinal()
+    except ValueError:
+        raise ValueError(f"Invalid {DATE_FIELD}: {value!r} (expected YYYY-MM-DD).")
+
+def athlete_key(record):
+    """
+    Return the athlete id of a record as a string, or None if it has none.
+
+    Raises:
+        ValueError: If the id is not a non-empty string or an integer.
+    """
+    value = record.get(ID_FIELD) if isinstance(record, dict) else None
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (str, int)) or str(value).strip() == "":
+        raise ValueError(f"Invalid {ID_FIELD}: {value!r}")
+    return str(value).strip()
+
+def _number(value):
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool) and np.isfinite(value):
+        return float(value)
+    return None
+
+class AthleteState:
+    """
+    Aggregates of one athlete as of ``last_day``.
+
+    ``ring`` has one row per day of the window (slot ``day % WINDOW_DAYS``)
+    with the day's total load, number of fatigue readings and their sum.
+    ``fatigue_sums`` are the window's count, sum(t), sum(t^2), sum(f) and
+    sum(t * f) with ``t = day - anchor``, for the fatigue trend.
+    """
+
+    __slots__ = _COLUMNS + ("fatigue_sums", "ring")
+
+    def __init__(self, day):
+        self.anchor = self.first_day = self.last_day = day
+        self.n_records = 0
+        self.acute = self.chronic = self.ewma_acute = self.ewma_chronic = 0.0
+        self.fatigue_sums = np.zeros(5)
+        self.ring = np.zeros((WINDOW_DAYS, 3))
+
+    @classmethod
+    def from_row(cls, row):
+        state = cls.__new__(cls)
+        for name, value in zip(_COLUMNS, row):
+            setattr(state, name, value)
+        state.fatigue_sums = np.frombuffer(row[len(_COLUMNS)], dtype=np.float64).copy()
+        state.ring = np.frombuffer(row[len(_COLUMNS) + 1], dtype=np.float64).reshape(WINDOW_DAYS, 3).copy()
+        return state
+
+    def to_row(self):
+        return tuple(getattr(self, name) for name in _COLUMNS) + (self.fatigue_sums.tobytes(), self.ring.tobytes())
+
+    def _fatigue_terms(self, day, count, total):
+        t = day - self.anchor
+        return np.array([count, count * t, count * t * t, total, total * t])
+
+    def advance(self, day):
+        """Move the window forward to end on ``day``, dropping the days that leave it."""
+        if day <= self.last_day:
+            return
+        elapsed = day - self.last_day
+        self.ewma_acute *= (1.0 - ACUTE_DECAY) ** elapsed
+        self.ewma_chronic *= (1.0 - CHRONIC_DECAY) ** elapsed
+        if elapsed >= WINDOW_DAYS:
+            self.acute = self.chronic = 0.0
+            self.fatigue_sums[:] = 0.0
+            self.ring[:] = 0.0
+        else:
+            for t in range(self.last_day + 1, day + 1):
+                # Day t - 7 leaves the acute window; slot t % 28 still holds day t - 28
+                self.acute -= self.ring[(t - ACUTE_DAYS) % WINDOW_DAYS, 0]
+                slot = self.ring[t % WINDOW_DAYS]
+                self.chronic -= slot[0]
+                self.fatigue_sums -= self._fatigue_terms(t - WINDOW_DAYS, slot[1], slot[2])
+                slot[:] = 0.0
+        self.last_day = day
+
+    def add(self, day, load, fatigue=None):
+        """
+        Add one record in O(1): at most one window shift, one slot and the running sums.
+
+        Args:
+            day (int): Day number of the record.
+            load (float): Training load.
+            fatigue (float, optional): Fatigue reading.
+        """
+        self.advance(day)
+        self.first_day = min(self.first_day, day)
+        self._apply(day, load, fatigue, 1.0)
+
+    def remove(self, day, load, fatigue=None):
+        """
+        Take back a record previously added with ``add`` (same arguments).
+
+        The day keeps its place in the date range: it is only removed to be
+        replaced by a new record for the same day.
+        """
+        self._apply(day, load, fatigue, -1.0)
+
+    def _apply(self, day, load, fatigue, sign):
+        self.n_records += int(sign)
+        age = self.last_day - day
+        self.ewma_acute += sign * ACUTE_DECAY * (1.0 - ACUTE_DECAY) ** age * load
+        self.ewma_chronic += sign * CHRONIC_DECAY * (1.0 - CHRONIC_DECAY) ** age * load
+        if age >= WINDOW_DAYS:
+            return
+        slot = self.ring[day % WINDOW_DAYS]
+        slot[0] += sign * load
+        self.chronic += sign * load
+        if age < ACUTE_DAYS:
+            self.acute += sign * load
+        if fatigue is not None:
+            slot[1] += sign
+            slot[2] += sign * fatigue
+            self.fatigue_sums += self._fatigue_terms(day, sign, sign * fatigue)
+
+    def summary(self):
+        """
+        Return the athlete's aggregates.
+
+        Returns:
+            dict: Record count, date range, rolling and EWMA loads, workload
+            ratios and fatigue statistics. Ratios are None until the history
+            spans ``ACWR_MIN_DAYS`` days; the trend needs ``TREND_MIN_RECORDS``
+            fatigue readings on at least two days.
+        """
+        established = self.last_day - self.first_day + 1 >= ACWR_MIN_DAYS
+        acwr = self.acute / (self.chronic / 4.0) if established and self.chronic > 0 else None
+        ewma_acwr = self.ewma_acute / self.ewma_chronic if established and self.ewma_chronic > 0 else None
+
+        n, st, stt, sf, stf = self.fatigue_sums
+        n = round(n)
+        fatigue_mean = sf / n if n else None
+        spread = n * stt - st * st
+        trend = None
+        if n >= TREND_MIN_RECORDS and spread > 1e-9:
+            trend = (n * stf - st * sf) / spread * 7
+
+        return {
+            "records": int(self.n_records),
+            "first_date": date.fromordinal(self.first_day).isoformat(),
+            "last_date": date.fromordinal(self.last_day).isoformat(),
+            "acute_load_7d": _round(self.acute),
+            "chronic_load_28d": _round(self.chronic),
+            "acwr": _round(acwr),
+            "ewma_acute_load": _round(self.ewma_acute),
+            "ewma_chronic_load": _round(self.ewma_chronic),
+            "ewma_acwr": _round(ewma_acwr),
+            "fatigue_mean_28d": _round(fatigue_mean),
+            "fatigue_trend": _round(trend),
+        }
+
+def _round(value, digits=4):
+    # Running sums may carry float noise like -1e-14 after a day leaves the window
+    return None if value is None else round(float(value), digits) + 0.0
+
+def rule_fields(summary):
+    """
+    Map an athlete summary to the recommendation rule inputs it provides.
+
+    Args:
+        summary (dict or None): Output of ``AthleteState.summary``.
+
+    Returns:
+        dict: ``Acute_Chronic_Workload_Ratio``/``Fatigue_Trend`` values that are known.
+    """
+    if not summary:
+        return {}
+    return {field: summary[key] for field, key in RULE_FIELDS.items() if summary.get(key) is not None}
+
+class AthleteStore:
+    """
+    SQLite-backed athlete history.
+
+    The database file is created on first use. Each process opens its own
+    connection (shared by its threads under a lock); concurrent writers from
+    several processes are serialized by SQLite.
+
+    Args:
+        path (str): Database file.
+        timeout (float): Seconds to wait for another process's write lock.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = os.path.abspath(path)
+        self.timeout = timeout
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+            logger.info(f"Opened athlete store {self.path}")
+        return self._connection
+
+    def _load(self, connection, athlete_id):
+        row = connection.execute(
+            f"SELECT {', '.join(_COLUMNS)}, fatigue_sums, ring FROM aggregates WHERE athlete_id = ?",
+            (athlete_id,)).fetchone()
+        return None if row is None else AthleteState.from_row(row)
+
+    def _stage(self, connection, records):
+        """
+        Apply records to their athletes' loaded aggregates, in memory.
+
+        Returns:
+            tuple: States by athlete id, the summary as of each record's day, and
+            the record kept for each ``(athlete_id, day)``, with a flag telling
+            whether that day already had stored records.
+        """
+        parsed = []
+        for record in records:
+            athlete_id = athlete_key(record)
+            if athlete_id is None:
+                raise ValueError(f"Missing {ID_FIELD}.")
+            parsed.append((athlete_id, parse_day(record.get(DATE_FIELD)), record))
+
+        states = {}
+        summaries = []
+        days = {}
+        for athlete_id, day, record in parsed:
+            if athlete_id not in states:
+                states[athlete_id] = self._load(connection, athlete_id) or AthleteState(day)
+            state = states[athlete_id]
+            key = (athlete_id, day)
+            if key in days:
+                previous, stored = [days[key][:2]], days[key][3]
+            else:
+                previous = connection.execute(
+                    "SELECT load, fatigue FROM records WHERE athlete_id = ? AND day = ?", key).fetchall()
+                stored = bool(previous)
+            for old_load, old_fatigue in previous:
+                state.remove(day, old_load, old_fatigue)
+            load = _number(record.get(LOAD_FIELD)) or 0.0
+            fatigue = _number(record.get(FATIGUE_FIELD))
+            state.add(day, load, fatigue)
+            days[key] = (load, fatigue, record, stored)
+            if day < state.last_day:
+                summary = self._replay(connection, athlete_id, day, days).summary()
+            else:
+                summary = state.summary()
+            summaries.append(dict(summary, athlete_id=athlete_id))
+        return states, summaries, days
+
+    def _replay(self, connection, athlete_id, day, days):
+        """
+        Rebuild an athlete's aggregates as of ``day`` from the stored records.
+
+        Used for backdated records, whose summary must not include later
+        days. Records staged in ``days`` replace the stored ones of their day.
+
+        Returns:
+            AthleteState: Aggregates over the records up to and including ``day``.
+        """
+        rows = [row for row in connection.execute(
+            "SELECT day, load, fatigue FROM records WHERE athlete_id = ? AND day <= ?", (athlete_id, day))
+            if (athlete_id, row[0]) not in days]
+        rows += [(staged_day, load, fatigue) for (staged_id, staged_day), (load, fatigue, _, _) in days.items()
+                 if staged_id == athlete_id and staged_day <= day]
+        rows.sort(key=lambda row: row[0])
+        state = AthleteState(rows[0][0])
+        for row in rows:
+            state.add(*row)
+        return state
+
+    def preview(self, records):
+        """
+        Return the summaries ``add_many`` would return, without storing anything.
+
+        Args:
+            records (list): Input dicts (see ``add_many``).
+
+        Returns:
+            list: The athlete's summary as of each record's day, in input order.
+
+        Raises:
+            ValueError: If a record has no valid id or date.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN")
+            try:
+                return self._stage(connection, records)[1]
+            finally:
+                connection.execute("ROLLBACK")
+
+    def add_many(self, records):
+        """
+        Store records and update their athletes' aggregates in one transaction.
+
+        A record for an athlete and day that already has one replaces it, so
+        storing the same record twice leaves the aggregates unchanged.
+
+        Args:
+            records (list): Input dicts, each with an ``Athlete_Id`` and
+                optionally a ``Record_Date`` (default today, UTC).
+
+        Returns:
+            list: The athlete's summary as of each record's day, in input order.
+
+        Raises:
+            ValueError: If a record has no valid id or date.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                states, summaries, days = self._stage(connection, records)
+                connection.executemany("DELETE FROM records WHERE athlete_id = ? AND day = ?",
+                                       [key for key, (_, _, _, stored) in days.items() if stored])
+                connection.executemany(
+                    "INSERT INTO records (athlete_id, day, load, fatigue, payload) VALUES (?, ?, ?, ?, ?)",
+                    [(athlete_id, day, load, fatigue, json.dumps(record, default=str))
+                     for (athlete_id, day), (load, fatigue, record, _) in days.items()])
+                connection.executemany(
+                    f"INSERT OR REPLACE INTO aggregates (athlete_id, {', '.join(_COLUMNS)}, fatigue_sums, ring) "
+                    f"VALUES ({', '.join('?' * (len(_COLUMNS) + 3))})",
+                    [(athlete_id,) + state.to_row() for athlete_id, state in states.items()])
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return summaries
+
+    def add(self, record):
+        """
+        Store one record (see ``add_many``).
+
+        Returns:
+            dict: The athlete's summary including this record.
+        """
+        return self.add_many([record])[0]
+
+    def summary(self, athlete_id, as_of=None):
+        """
+        Return an athlete's aggregates without changing them.
+
+        Args:
+            athlete_id: Athlete id.
+            as_of: Date to roll the windows forward to (default: the athlete's
+                last record); earlier dates are ignored.
+
+        Returns:
+            dict or None: Summary, or None for an unknown athlete.
+        """
+        with self._lock:
+            state = self._load(self._connect(), str(athlete_id))
+        if state is None:
+            return None
+        if as_of is not None:
+            state.advance(parse_day(as_of))
+        return dict(state.summary(), athlete_id=str(athlete_id))
+
+    def records(self, athlete_id, limit=WINDOW_DAYS):
+        """
+        Return an athlete's most recent records, newest first.
+
+        Args:
+            athlete_id: Athlete id.
+            limit (int): Maximum number of records.
+
+        Returns:
+            list: ``{"date", "load", "fatigue", "record"}`` dicts.
+        """
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT day, load, fatigue, payload FROM records WHERE athlete_id = ? "
+                "ORDER BY day DESC, rowid DESC LIMIT ?", (str(athlete_id), limit)).fetchall()
+        return [{"date": date.fromordinal(day).isoformat(), "load": load, "fatigue": fatigue,
+                 "record": json.loads(payload)} for day, load, fatigue, payload in rows]
+
+    def close(self):
+        """Close this process's connection."""
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
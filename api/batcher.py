@@ -0,0 +1,206 @@
+"""
+In-process dynamic batching.
+
+Concurrent callers ``submit`` single items; a background thread collects them
+for up to ``max_wait_ms`` after the oldest one arrived (or until
+``max_batch_size`` items are waiting), calls the batch function once on the
+whole list and resolves each caller's future with its own result. Items that
+queued up while the previous batch was running go out immediately, so the
+window only adds latency when traffic is light.
+
+The queue is bounded: when ``max_queue`` items are already waiting,
+``submit`` raises ``BatcherFullError`` at once instead of letting latency grow
+without limit. A caller that stops waiting (``timeout``) cancels its item, so
+it is not scored later for nobody.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import instrumentation
+from instrumentation import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Batch size histogram bucket upper bounds
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+_STOP = object()
+
+class BatcherFullError(Exception):
+    """The batching queue is at capacity."""
+
+class BatcherTimeoutError(Exception):
+    """An item's result was not ready within the caller's timeout."""
+
+class _Item:
+    __slots__ = ("payload", "future", "enqueued")
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+class MicroBatcher:
+    """
+    Queue single calls and execute them in batches on a background thread.
+
+    Args:
+        fn: Callable taking a list of payloads and returning a list of results
+            in the same order.
+        max_batch_size (int): Maximum items per batch.
+        max_wait_ms (float): How long the oldest queued item may wait for
+            others before its batch runs.
+        max_queue (int): Maximum queued items before ``submit`` rejects.
+        name (str): Name used in metrics and the thread name.
+    """
+
+    def __init__(self, fn, max_batch_size=32, max_wait_ms=2.0, max_queue=1024, name="batcher"):
+        if max_batch_size < 1:
+            raise ValueError("Max batch size must be at least 1.")
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self._counts = {"submitted": 0, "rejected": 0, "timed_out": 0, "batches": 0, "failed_batches": 0}
+        self._max_depth = 0
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, payload):
+        """
+        Queue one item.
+
+        Args:
+            payload: Item passed to the batch function.
+
+        Returns:
+            concurrent.futures.Future: Resolves to this item's result.
+
+        Raises:
+            BatcherFullError: The queue already holds ``max_queue`` items.
+        """
+        item = _Item(payload)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self._counts["rejected"] += 1
+            instrumentation.count(f"{self.name}_rejected")
+            raise BatcherFullError(f"Prediction queue is full ({self.max_queue} requests waiting). Try again shortly.")
+        depth = self._queue.qsize()
+        with self._lock:
+            self._counts["submitted"] += 1
+            if depth > self._max_depth:
+                self._max_depth = depth
+        return item.future
+
+    def __call__(self, payload, timeout=None):
+        """
+        Submit one item and wait for its result.
+
+        Args:
+            payload: Item passed to the batch function.
+            timeout (float, optional): Seconds to wait for the result.
+
+        Returns:
+            This item's result (exceptions from the batch function are re-raised).
+
+        Raises:
+            BatcherFullError: The queue already holds ``max_queue`` items.
+            BatcherTimeoutError: No result within ``timeout``; the item is
+                cancelled if its batch has not started yet.
+        """
+        future = self.submit(payload)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self._counts["timed_out"] += 1
+            instrumentation.count(f"{self.name}_timed_out")
+            raise BatcherTimeoutError(f"No prediction result within {timeout}s. Try again shortly.")
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = first.enqueued + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Past the deadline, still take whatever is already queued
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            if self._stopping.is_set() and self._queue.empty():
+                return
+            first = self._queue.get()
+            if first is _STOP:
+                continue
+            # Drop items whose caller already gave up (cancelled futures)
+            batch = [item for item in self._collect(first) if item.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            start = time.perf_counter()
+            for item in batch:
+                instrumentation.observe(f"{self.name}_queue_wait", (start - item.enqueued) * 1000)
+            try:
+                results = self.fn([item.payload for item in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Batch function returned {len(results)} results for {len(batch)} items.")
+            except Exception as e:
+                logger.error(f"{self.name}: batch of {len(batch)} failed: {str(e)}")
+                with self._lock:
+                    self._counts["failed_batches"] += 1
+                for item in batch:
+                    item.future.set_exception(e)
+            else:
+                for item, result in zip(batch, results):
+                    item.future.set_result(result)
+            with self._lock:
+                self._counts["batches"] += 1
+                self._batch_sizes.observe(len(batch))
+
+    def close(self, timeout=None):
+        """Stop the worker thread after the items already queued have run."""
+        self._stopping.set()
+        try:
+            # Wakes an idle worker; a full queue means it is busy and sees the flag
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def stats(self):
+        """
+        Return queue and batch statistics.
+
+        Returns:
+            dict: Limits, current and peak queue depth, counts and the batch size histogram.
+        """
+        with self._lock:
+            batches = self._batch_sizes.to_dict()
+            return dict(
+                self._counts,
+                queue_depth=self._queue.qsize(),
+                max_queue_depth=self._max_depth,
+                max_queue=self.max_queue,
+                max_batch_size=self.max_batch_size,
+                max_wait_ms=self.max_wait * 1000,
+                mean_batch_size=round(batches["sum_ms"] / batches["count"], 2) if batches["count"] else 0.0,
+                batch_sizes=batches["buckets"],
+            )
@@ -0,0 +1,348 @@
+"""
+Score large athlete files offline.
+
+Streams CSV, JSONL (one JSON object per line) or Parquet input in fixed-size
+chunks, runs each chunk through the same validation, encoding, ensemble and
+calibration path as ``/predict/batch`` (``predict.predict_injury_risk_batch``)
+and appends the results to the output file as each chunk finishes, so memory
+stays bounded by ``--chunk-size`` x in-flight chunks whatever the input size.
+With ``--workers N`` chunks are scored in a process pool; output order always
+matches input order.
+
+Usage:
+    python api/bulk_score.py roster.csv -o scores.csv [--chunk-size 5000] [--workers 4]
+        [--keep Athlete_Id] [--recommendations] [--explain] [--impute] [--athlete-store] [--format csv|jsonl]
+
+Output columns: ``row`` (0-based input row), any ``--keep`` input columns,
+``predicted_risk_level``, ``injury_likelihood_percent``,
+``model_class_probability``, ``error`` (set instead of the scores when a row
+cannot be scored), with ``--explain``, ``high_base_value``,
+``high_probability`` and one ``contribution_<feature>`` column per feature
+(see ``predict.explain_features``) and, with ``--recommendations``,
+``recommendations``.
+Bulk scoring leaves the athlete store (see ``athlete_store.py``) alone unless
+``--athlete-store`` is given. Rows with an ``Athlete_Id`` are then added to it
+and get its history in their recommendations, as with ``/predict/batch``. To
+keep the results independent of chunking, the whole file is read and scored
+in ``Record_Date`` order in this process (output stays in input order), so
+``--workers`` does not apply.
+With ``--impute`` missing or empty fields are filled from the persisted
+imputation statistics (see ``features.py``) instead of failing the row.
+"""
+
+import argparse
+import collections
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import model_registry
+import predict
+from athlete_store import DATE_FIELD, AthleteStore, parse_day
+from features import FEATURES
+from predict import MAX_BATCH_SIZE, predict_injury_risk_batch
+
+SCORE_FIELDS = ["predicted_risk_level", "injury_likelihood_percent", "model_class_probability"]
+EXPLAIN_FIELDS = ["high_base_value", "high_probability"] + [f"contribution_{name}" for name in FEATURES]
+INPUT_FORMATS = ("csv", "jsonl", "parquet")
+
+class _BadRecord:
+    """Placeholder for an input line that could not be parsed."""
+
+    def __init__(self, error):
+        self.error = error
+
+def _detect_format(path, explicit=None):
+    if explicit:
+        return explicit
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext in ("json", "ndjson"):
+        return "jsonl"
+    if ext in ("pq", "parq"):
+        return "parquet"
+    return ext if ext in INPUT_FORMATS else "csv"
+
+def _read_csv(path, chunk_size):
+    for df in pd.read_csv(path, chunksize=chunk_size):
+        yield df.to_dict("records")
+
+def _read_jsonl(path, chunk_size):
+    with open(path, encoding="utf-8") as f:
+        lines = (line for line in f if line.strip())
+        while True:
+            chunk = list(itertools.islice(lines, chunk_size))
+            if not chunk:
+                return
+            records = []
+            for line in chunk:
+                try:
+                    records.append(json.loads(line))
+                except ValueError as e:
+                    records.append(_BadRecord(f"Invalid JSON: {str(e)}"))
+            yield records
+
+def _read_parquet(path, chunk_size):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet input requires pyarrow: pip install pyarrow")
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pylist()
+
+READERS = {"csv": _read_csv, "jsonl": _read_jsonl, "parquet": _read_parquet}
+
+def read_chunks(path, chunk_size, fmt=None):
+    """
+    Stream input records in chunks.
+
+    Args:
+        path (str): Input file.
+        chunk_size (int): Records per chunk.
+        fmt (str, optional): "csv", "jsonl" or "parquet"; inferred from the extension if omitted.
+
+    Yields:
+        list: Records (dicts) of one chunk.
+    """
+    return READERS[_detect_format(path, fmt)](path, chunk_size)
+
+def _explanation_fields(explanation):
+    if explanation is None:
+        return dict.fromkeys(EXPLAIN_FIELDS)
+    fields = {"high_base_value": explanation["base_value"], "high_probability": explanation["prediction"]}
+    fields.update((f"contribution_{name}", value) for name, value in explanation["contributions"].items())
+    return fields
+
+def score_chunk(start, records, keep=(), recommendations=False, impute=False, explain=False, history=False):
+    """
+    Score one chunk and build its output rows.
+
+    Args:
+        start (int): Input row number of the first record.
+        records (list): Raw input records.
+        keep (tuple): Input columns to copy into the output.
+        recommendations (bool): Include recommendation texts.
+        impute (bool): Fill missing fields instead of failing the row.
+        explain (bool): Include per-feature contributions to the "High" probability.
+        history (bool): Read and update the athlete store.
+
+    Returns:
+        list: One output dict per input record.
+    """
+    batch = predict_injury_risk_batch(records, impute=impute, explain=explain, history=history)
+    errors = {e["index"]: e["error"] for e in batch["errors"]}
+    rows = []
+    for i, (record, result) in enumerate(zip(records, batch["results"])):
+        row = {"row": start + i}
+        for column in keep:
+            row[column] = record.get(column) if isinstance(record, dict) else None
+        if result is None:
+            error = record.error if isinstance(record, _BadRecord) else errors.get(i)
+            row.update(dict.fromkeys(SCORE_FIELDS), error=error)
+        else:
+            row.update({field: result[field] for field in SCORE_FIELDS}, error=None)
+        if explain:
+            row.update(_explanation_fields(result["explanation"] if result else None))
+        if recommendations:
+            row["recommendations"] = result["recommendations"] if result else []
+        rows.append(row)
+    return rows
+
+def _record_day(record):
+    try:
+        return parse_day(record.get(DATE_FIELD)) if isinstance(record, dict) else 0
+    except ValueError:
+        return 0  # reported as an error when scored
+
+def score_in_date_order(chunks, chunk_size, keep=(), recommendations=False, impute=False, explain=False,
+                        progress=None):
+    """
+    Score all records in ``Record_Date`` order against the athlete store.
+
+    Each athlete's records are added in date order, so the output does not
+    depend on chunking and scoring the file again gives the same results.
+
+    Args:
+        chunks: Iterable of record lists (see ``read_chunks``).
+        chunk_size (int): Records per scoring batch.
+        keep, recommendations, impute, explain: See ``score_chunk``.
+        progress (Progress, optional): Updated after each batch.
+
+    Returns:
+        list: One output dict per input record, in input order.
+    """
+    records = [record for chunk in chunks for record in chunk]
+    order = sorted(range(len(records)), key=lambda i: _record_day(records[i]))
+    output = [None] * len(records)
+    for lo in range(0, len(order), chunk_size):
+        positions = order[lo:lo + chunk_size]
+        rows = score_chunk(0, [records[i] for i in positions], keep, recommendations, impute, explain, history=True)
+        for i, row in zip(positions, rows):
+            row["row"] = i
+            output[i] = row
+        if progress is not None:
+            progress.update(rows)
+    return output
+
+class CsvWriter:
+    """Append output rows to a CSV file (recommendations joined with " | ")."""
+
+    def __init__(self, f, fieldnames):
+        self.f = f
+        self.writer = csv.DictWriter(f, fieldnames=fieldnames)
+        self.writer.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            if "recommendations" in row:
+                row = dict(row, recommendations=" | ".join(row["recommendations"]))
+            self.writer.writerow(row)
+        self.f.flush()
+
+class JsonlWriter:
+    """Append output rows to a JSONL file."""
+
+    def __init__(self, f, fieldnames=None):
+        self.f = f
+
+    def write(self, rows):
+        self.f.write("".join(json.dumps(row, default=str) + "\n" for row in rows))
+        self.f.flush()
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter}
+
+class Progress:
+    """Prints rows scored, errors and throughput to stderr at most every ``interval`` seconds."""
+
+    def __init__(self, interval=2.0, quiet=False):
+        self.interval = interval
+        self.quiet = quiet
+        self.start = self.last = time.perf_counter()
+        self.rows = 0
+        self.errors = 0
+
+    def update(self, rows):
+        self.rows += len(rows)
+        self.errors += sum(row["error"] is not None for row in rows)
+        now = time.perf_counter()
+        if not self.quiet and now - self.last >= self.interval:
+            self.last = now
+            self._print(now)
+
+    def _print(self, now, label="scored"):
+        elapsed = now - self.start
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        print(f"{label} {self.rows:,} rows ({self.errors:,} errors) in {elapsed:.1f}s, {rate:,.0f} rows/s",
+              file=sys.stderr, flush=True)
+
+    def finish(self):
+        self._print(time.perf_counter(), label="done:")
+        return self.rows
+
+def score_file(input_path, output_path, chunk_size=5000, workers=1, input_format=None, output_format=None,
+               keep=(), recommendations=False, impute=False, explain=False, athlete_store=False,
+               progress_interval=2.0, quiet=False):
+    """
+    Score an input file chunk by chunk and write the results incrementally.
+
+    Args:
+        input_path (str): CSV, JSONL or Parquet file.
+        output_path (str): Output file ("-" for stdout).
+        chunk_size (int): Records per chunk (at most ``MAX_BATCH_SIZE``).
+        workers (int): Worker processes; 1 scores in this process.
+        input_format (str, optional): Input format; inferred from the extension if omitted.
+        output_format (str, optional): "csv" or "jsonl"; inferred from the extension if omitted.
+        keep (tuple): Input columns to copy into the output.
+        recommendations (bool): Include recommendation texts.
+        impute (bool): Fill missing fields from the imputation statistics.
+        explain (bool): Include per-feature contributions to the "High" probability.
+        athlete_store (bool): Add rows with an ``Athlete_Id`` to the athlete
+            store, scoring the whole file in date order in this process
+            (see ``score_in_date_order``); ``workers`` must then be 1.
+        progress_interval (float): Seconds between progress lines.
+        quiet (bool): Suppress progress lines (the final summary is still printed).
+
+    Returns:
+        int: Number of rows written.
+    """
+    if not 1 <= chunk_size <= MAX_BATCH_SIZE:
+        raise ValueError(f"Chunk size must be between 1 and {MAX_BATCH_SIZE}.")
+    if athlete_store and workers > 1:
+        raise ValueError("Scoring with the athlete store runs in one process; drop --workers.")
+    if output_format is None:
+        output_format = "csv" if output_path.lower().endswith(".csv") else "jsonl"
+    fieldnames = (["row", *keep, *SCORE_FIELDS, "error"] + (EXPLAIN_FIELDS if explain else [])
+                  + (["recommendations"] if recommendations else []))
+    chunks = read_chunks(input_path, chunk_size, input_format)
+    progress = Progress(progress_interval, quiet)
+
+    out = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8", newline="")
+    try:
+        writer = WRITERS[output_format](out, fieldnames)
+        start = 0
+        if athlete_store:
+            if predict.get_athlete_store() is None:
+                predict.athlete_store = AthleteStore(predict.ATHLETE_STORE_PATH)
+            writer.write(score_in_date_order(chunks, chunk_size, keep, recommendations, impute, explain, progress))
+            return progress.finish()
+        if workers <= 1:
+            for records in chunks:
+                rows = score_chunk(start, records, keep, recommendations, impute, explain)
+                start += len(records)
+                writer.write(rows)
+                progress.update(rows)
+            return progress.finish()
+
+        # Load the models once before forking so workers share them
+        model_registry.preload(freeze=False)
+        pending = collections.deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for records in chunks:
+                pending.append(pool.submit(score_chunk, start, records, keep, recommendations, impute, explain))
+                start += len(records)
+                # Bound in-flight chunks; write in input order
+                while len(pending) >= 2 * workers:
+                    rows = pending.popleft().result()
+                    writer.write(rows)
+                    progress.update(rows)
+            while pending:
+                rows = pending.popleft().result()
+                writer.write(rows)
+                progress.update(rows)
+        return progress.finish()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV, JSONL or Parquet athlete file in streaming chunks.")
+    parser.add_argument("input", help="input file (.csv, .jsonl or .parquet)")
+    parser.add_argument("-o", "--output", default="-", help="output file (.csv or .jsonl); default stdout as JSONL")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="records per chunk")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--input-format", choices=INPUT_FORMATS, help="override input format detection")
+    parser.add_argument("--format", dest="output_format", choices=sorted(WRITERS), help="override output format")
+    parser.add_argument("--keep", action="append", default=[], help="input column to copy to the output (repeatable)")
+    parser.add_argument("--recommendations", action="store_true", help="include recommendation texts")
+    parser.add_argument("--impute", action="store_true", help="fill missing fields instead of failing the row")
+    parser.add_argument("--explain", action="store_true", help="include per-feature contributions to the High probability")
+    parser.add_argument("--athlete-store", action="store_true",
+                        help="add rows with an Athlete_Id to the athlete history (scores in date order, one process)")
+    parser.add_argument("--progress-interval", type=float, default=2.0, help="seconds between progress lines")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print the final summary")
+    args = parser.parse_args(argv)
+    if args.athlete_store and args.workers > 1:
+        parser.error("--athlete-store scores in one process; it cannot be combined with --workers")
+
+    score_file(args.input, args.output, chunk_size=args.chunk_size, workers=args.workers,
+               input_format=args.input_format, output_format=args.output_format, keep=tuple(args.keep),
+               recommendations=args.recommendations, impute=args.impute, explain=args.explain,
+               athlete_store=args.athlete_store, progress_interval=args.progress_interval, quiet=args.quiet)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Bounded, thread-safe LRU cache with per-entry TTL and hit/miss statistics,
+and a single-flight helper that coalesces concurrent identical calls.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+class TTLCache:
+    """
+    Least-recently-used cache whose entries also expire after ``ttl`` seconds.
+
+    Args:
+        maxsize (int): Maximum number of entries; 0 disables caching.
+        ttl (float): Entry lifetime in seconds; 0 or less means no expiry.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """
+        Look up a key.
+
+        Args:
+            key: Hashable cache key.
+
+        Returns:
+            The cached value, or ``MISSING``.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """
+        Store a value, evicting the least recently used entry when full.
+
+        Args:
+            key: Hashable cache key.
+            value: Value to cache.
+        """
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl and self.ttl > 0 else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (statistics are kept)."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """
+        Return cache statistics.
+
+        Returns:
+            dict: Size, limits, hit/miss/eviction counts and hit rate.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one execution.
+
+    While a call for a key is running, later callers with that key wait for
+    it and receive its result (or its exception) instead of running their own.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Run ``fn()`` unless an identical call is already in flight.
+
+        Args:
+            key: Hashable key identifying the call.
+            fn: Zero-argument callable.
+
+        Returns:
+            The result of ``fn()``, possibly from another thread's call.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        """
+        Return coalescing statistics.
+
+        Returns:
+            dict: Executed calls, coalesced callers and calls currently in flight.
+        """
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._flights)}
@@ -0,0 +1,394 @@
+"""
+Schema-driven feature pipeline for the injury risk models.
+
+The model inputs are declared once in ``SCHEMA`` (type, dtype, allowed
+categories, default) and ``DERIVED`` (engineered ratio features). A
+``FeaturePipeline`` compiles that declaration into column positions and lookup
+tables and turns raw athlete dictionaries (single records, batches) or
+DataFrame chunks straight into a contiguous NumPy matrix in model column
+order, without building a pandas DataFrame per request. The encoding of
+complete records is bit-identical to the pandas preprocessing used in the
+notebooks.
+
+Missing values can be imputed with per-feature medians persisted next to the
+models (``imputation_stats.json``, see ``fit_imputation_stats``); without that
+artifact the median of the batch being encoded is used.
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+import model_registry
+
+# Define mappings for categorical variables (consistent with CalibrateLikelihood.ipynb)
+gender_mapping = {"Male": 0, "Female": 1}
+experience_mapping = {"Beginner": 0, "Intermediate": 1, "Advanced": 2, "Professional": 3}
+injury_type_mapping = {"None": 0, "Sprain": 1, "Ligament Tear": 2, "Tendonitis": 3, "Strain": 4, "Fracture": 5}
+sport_type_mapping = {"Football": 0, "Basketball": 1, "Swimming": 2, "Tennis": 3, "Running": 4}
+
+# Raw model inputs in model column order. Categorical values outside
+# ``categories`` encode to the default's code (0), matching
+# ``.map(mapping).fillna(0)`` in the notebooks.
+SCHEMA = {
+    "Age": {"kind": "numeric", "dtype": "int"},
+    "Gender": {"kind": "categorical", "categories": gender_mapping, "default": "Male"},
+    "Sport_Type": {"kind": "categorical", "categories": sport_type_mapping, "default": "Football"},
+    "Experience_Level": {"kind": "categorical", "categories": experience_mapping, "default": "Beginner"},
+    "Flexibility_Score": {"kind": "numeric", "dtype": "float"},
+    "Total_Weekly_Training_Hours": {"kind": "numeric", "dtype": "float", "zero_as": 0.1},
+    "High_Intensity_Training_Hours": {"kind": "numeric", "dtype": "float"},
+    "Strength_Training_Frequency": {"kind": "numeric", "dtype": "int"},
+    "Recovery_Time_Between_Sessions": {"kind": "numeric", "dtype": "float"},
+    "Training_Load_Score": {"kind": "numeric", "dtype": "float"},
+    "Sprint_Speed": {"kind": "numeric", "dtype": "float"},
+    "Endurance_Score": {"kind": "numeric", "dtype": "float"},
+    "Agility_Score": {"kind": "numeric", "dtype": "float"},
+    "Fatigue_Level": {"kind": "numeric", "dtype": "int"},
+    "Previous_Injury_Count": {"kind": "numeric", "dtype": "int"},
+    "Previous_Injury_Type": {"kind": "categorical", "categories": injury_type_mapping, "default": "None"},
+}
+
+# Derived features: name -> (numerator, denominator), appended after the inputs.
+# Denominators have their ``zero_as`` replacement applied first.
+DERIVED = {
+    "Intensity_Ratio": ("High_Intensity_Training_Hours", "Total_Weekly_Training_Hours"),
+    "Recovery_Per_Training": ("Recovery_Time_Between_Sessions", "Total_Weekly_Training_Hours"),
+}
+
+FEATURES = list(SCHEMA) + list(DERIVED)
+
+# Raw input fields by type
+INPUT_FIELDS = list(SCHEMA)
+CATEGORICAL_FIELDS = [f for f, spec in SCHEMA.items() if spec["kind"] == "categorical"]
+NUMERIC_FIELDS = [f for f, spec in SCHEMA.items() if spec["kind"] == "numeric"]
+
+# Persisted per-feature medians used to fill missing values
+IMPUTATION_STATS_FILE = "imputation_stats.json"
+
+_NUMBER_TYPES = (int, float, np.number)
+
+def _is_non_finite(value):
+    return isinstance(value, _NUMBER_TYPES) and not math.isfinite(value)
+
+def _categorical_code(lookup, value, default):
+    # Previous_Injury_Type treats missing as "None", which also encodes to 0
+    try:
+        return lookup.get(value, default)
+    except TypeError:
+        return default
+
+class FeaturePipeline:
+    """
+    Encoder compiled from a feature schema.
+
+    Args:
+        schema (dict): Input field declarations (see ``SCHEMA``).
+        derived (dict): Derived ratio features (see ``DERIVED``).
+        imputation_stats (dict, optional): ``{"medians": {field: value}}``;
+            loaded lazily from the current model directory when omitted.
+    """
+
+    def __init__(self, schema=SCHEMA, derived=DERIVED, imputation_stats=None):
+        self.schema = schema
+        self.derived = derived
+        self.features = list(schema) + list(derived)
+        self.input_fields = list(schema)
+        self.numeric_fields = [f for f, spec in schema.items() if spec["kind"] == "numeric"]
+        self.categorical_fields = [f for f, spec in schema.items() if spec["kind"] == "categorical"]
+
+        # Column positions and category -> float code lookups, resolved once
+        index = {f: i for i, f in enumerate(self.features)}
+        self._n_inputs = len(self.input_fields)
+        self._numeric_cols = np.array([index[f] for f in self.numeric_fields], dtype=np.intp)
+        self._categorical_cols = []
+        for f in self.categorical_fields:
+            lookup = {key: float(code) for key, code in schema[f]["categories"].items()}
+            self._categorical_cols.append((index[f], f, lookup, lookup[schema[f]["default"]]))
+        self._zero_as = [(index[f], spec["zero_as"]) for f, spec in schema.items() if "zero_as" in spec]
+        self._derived_cols = [(index[name], index[num], index[den]) for name, (num, den) in derived.items()]
+        self._index = index
+
+        self._imputation_stats = imputation_stats
+        self._imputation_loaded = imputation_stats is not None
+        self._imputation_from_disk = imputation_stats is None
+
+    def validate(self, record, impute=False):
+        """
+        Check that a single athlete record can be encoded.
+
+        Without ``impute``, non-finite numeric values (e.g. NaN from an empty
+        CSV cell) count as missing. Categorical fields may be NaN: pandas
+        reads the "None" injury type as NaN, and it encodes to the default.
+
+        Args:
+            record: Candidate input record.
+            impute (bool): Allow missing or null fields (they will be imputed).
+
+        Returns:
+            str or None: Error message, or None if the record is valid.
+        """
+        if not isinstance(record, dict):
+            return "Record must be a JSON object."
+        if impute:
+            invalid = [f for f in self.numeric_fields
+                       if record.get(f) is not None and not isinstance(record[f], _NUMBER_TYPES)]
+        else:
+            missing = [f for f in self.input_fields if f not in record]
+            missing += [f for f in self.numeric_fields if f in record and _is_non_finite(record[f])]
+            if missing:
+                return f"Missing required features: {missing}"
+            invalid = [f for f in self.numeric_fields if not isinstance(record[f], _NUMBER_TYPES)]
+        if invalid:
+            return f"Non-numeric values for features: {invalid}"
+        return None
+
+    def _finish(self, X, impute, dtype):
+        if impute:
+            self.impute(X)
+        for col, replacement in self._zero_as:
+            column = X[:, col]
+            column[column == 0] = replacement
+        for col, num, den in self._derived_cols:
+            np.divide(X[:, num], X[:, den], out=X[:, col])
+        return X.astype(dtype, copy=False)
+
+    def encode_records(self, records, dtype=np.float64, impute=False):
+        """
+        Encode athlete records into a model-ready feature matrix.
+
+        Args:
+            records (list): List of input dictionaries (already validated).
+            dtype: Output dtype, ``np.float64`` (default) or ``np.float32``.
+            impute (bool): Fill missing/null values (see ``impute``).
+
+        Returns:
+            np.ndarray: C-contiguous array of shape ``(len(records), len(features))``.
+        """
+        X = np.empty((len(records), len(self.features)), dtype=np.float64)
+        if not len(records):
+            return X.astype(dtype, copy=False)
+
+        if impute:
+            # None -> NaN in the float conversion; categoricals fall back to their default
+            X[:, self._numeric_cols] = [[record.get(f) for f in self.numeric_fields] for record in records]
+            for col, field, lookup, default in self._categorical_cols:
+                X[:, col] = [_categorical_code(lookup, record.get(field), default) for record in records]
+        else:
+            X[:, self._numeric_cols] = [[record[f] for f in self.numeric_fields] for record in records]
+            for col, field, lookup, default in self._categorical_cols:
+                X[:, col] = [_categorical_code(lookup, record[field], default) for record in records]
+        return self._finish(X, impute, dtype)
+
+    def encode_record(self, record, dtype=np.float64, impute=False):
+        """
+        Encode a single athlete record into a ``(1, n_features)`` matrix.
+
+        Args:
+            record (dict): Input dictionary containing athlete data.
+            dtype: Output dtype, ``np.float64`` (default) or ``np.float32``.
+            impute (bool): Fill missing/null values instead of rejecting them.
+
+        Returns:
+            np.ndarray: Encoded features.
+
+        Raises:
+            ValueError: If the record is missing fields or has non-numeric values.
+        """
+        error = self.validate(record, impute=impute)
+        if error:
+            raise ValueError(error)
+        return self.encode_records([record], dtype=dtype, impute=impute)
+
+    def encode_frame(self, df, dtype=np.float64, encoded=False, impute=False):
+        """
+        Encode a DataFrame (e.g. one chunk of a streamed file) column-wise.
+
+        Args:
+            df (pd.DataFrame): Raw input columns; extra columns are ignored.
+            dtype: Output dtype.
+            encoded (bool): Categorical columns already hold integer codes.
+            impute (bool): Fill missing values (see ``impute``).
+
+        Returns:
+            np.ndarray: Feature matrix of shape ``(len(df), len(features))``.
+
+        Raises:
+            ValueError: If required columns are missing.
+        """
+        missing_cols = [col for col in self.input_fields if col not in df.columns]
+        if missing_cols:
+            raise ValueError(f"Missing required columns: {missing_cols}")
+        X = np.empty((len(df), len(self.features)), dtype=np.float64)
+        X[:, self._numeric_cols] = df[self.numeric_fields].to_numpy(dtype=np.float64)
+        for col, field, lookup, default in self._categorical_cols:
+            if encoded:
+                X[:, col] = df[field].to_numpy(dtype=np.float64)
+            else:
+                X[:, col] = df[field].map(lookup).fillna(default).to_numpy(dtype=np.float64)
+        return self._finish(X, impute, dtype)
+
+    def encode_grid(self, base, axes, dtype=np.float64):
+        """
+        Encode every combination of perturbed values for one athlete.
+
+        Starts from the athlete's encoded row and re-encodes only the swept
+        columns and the derived features that depend on them.
+
+        Args:
+            base (np.ndarray): ``(1, n_features)`` encoded athlete (``encode_record``).
+            axes (list): ``(field, values)`` pairs; ``values`` are raw input
+                values (numbers, or category labels for categorical fields).
+            dtype: Output dtype.
+
+        Returns:
+            np.ndarray: Matrix of shape ``(prod(len(values)), n_features)``, the
+            last axis varying fastest (row-major order of the grid).
+
+        Raises:
+            ValueError: If a field is unknown or a value cannot be encoded.
+        """
+        shape = [len(values) for _, values in axes]
+        X = np.repeat(np.asarray(base, dtype=np.float64).reshape(1, -1), int(np.prod(shape)), axis=0)
+        zero_as = {self.features[col]: replacement for col, replacement in self._zero_as}
+        changed = set()
+        for axis, (field, values) in enumerate(axes):
+            spec = self.schema.get(field)
+            if spec is None:
+                raise ValueError(f"Unknown feature: {field}")
+            if spec["kind"] == "categorical":
+                unknown = [v for v in values if v not in spec["categories"]]
+                if unknown:
+                    raise ValueError(f"Unknown {field} values: {unknown}")
+                codes = np.array([spec["categories"][v] for v in values], dtype=np.float64)
+            else:
+                invalid = [v for v in values if isinstance(v, bool) or not isinstance(v, _NUMBER_TYPES)]
+                if invalid:
+                    raise ValueError(f"Non-numeric {field} values: {invalid}")
+                codes = np.array(values, dtype=np.float64)
+                if field in zero_as:
+                    codes[codes == 0] = zero_as[field]
+            # Broadcast this axis over the others, then flatten in row-major order
+            view = [1] * len(shape)
+            view[axis] = len(values)
+            X[:, self._index[field]] = np.broadcast_to(codes.reshape(view), shape).ravel()
+            changed.add(self._index[field])
+        for col, num, den in self._derived_cols:
+            if num in changed or den in changed:
+                np.divide(X[:, num], X[:, den], out=X[:, col])
+        return X.astype(dtype, copy=False)
+
+    def imputation_stats(self):
+        """
+        Return the persisted imputation statistics, loading them on first use.
+
+        Returns:
+            dict or None: Statistics, or None if no artifact is available.
+        """
+        if not self._imputation_loaded:
+            self._imputation_stats = load_imputation_stats()
+            self._imputation_loaded = True
+        return self._imputation_stats
+
+    def reload_imputation_stats(self):
+        """Drop the loaded imputation statistics so the next use reads them again (e.g. after a model swap)."""
+        if self._imputation_from_disk:
+            self._imputation_loaded = False
+
+    def impute(self, X):
+        """
+        Fill NaN input values in place with the persisted medians.
+
+        Columns without a persisted median use the median of ``X`` itself.
+
+        Args:
+            X (np.ndarray): Feature matrix (float64) whose input columns may hold NaN.
+
+        Returns:
+            np.ndarray: ``X``.
+        """
+        inputs = X[:, :self._n_inputs]
+        missing = np.isnan(inputs)
+        if not missing.any():
+            return X
+        medians = (self.imputation_stats() or {}).get("medians", {})
+        for col in np.flatnonzero(missing.any(axis=0)):
+            field = self.input_fields[col]
+            fill = medians.get(field)
+            if fill is None:
+                fill = np.nanmedian(inputs[:, col]) if not missing[:, col].all() else 0.0
+            inputs[missing[:, col], col] = fill
+        return X
+
+    def fit_imputation_stats(self, X):
+        """
+        Compute per-feature medians from encoded training data.
+
+        Args:
+            X (np.ndarray): Feature matrix (as returned by the encoders, without imputation).
+
+        Returns:
+            dict: ``{"n_rows", "medians"}``, ready for ``save_imputation_stats``.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        medians = {}
+        for col, field in enumerate(self.input_fields):
+            values = X[:, col]
+            values = values[~np.isnan(values)]
+            medians[field] = float(np.median(values)) if len(values) else None
+        return {"n_rows": int(len(X)), "medians": medians}
+
+def load_imputation_stats(path=None):
+    """
+    Load persisted imputation statistics.
+
+    Args:
+        path (str, optional): JSON file; defaults to ``IMPUTATION_STATS_FILE``
+            in the directory of the current model version.
+
+    Returns:
+        dict or None: Statistics, or None if the file does not exist.
+    """
+    path = path or os.path.join(model_registry.registry.model_dir, IMPUTATION_STATS_FILE)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_imputation_stats(stats, path=None):
+    """
+    Persist imputation statistics as JSON.
+
+    Args:
+        stats (dict): Output of ``FeaturePipeline.fit_imputation_stats``.
+        path (str, optional): Target file; defaults to ``IMPUTATION_STATS_FILE`` in ``MODEL_DIR``.
+    """
+    path = path or os.path.join(model_registry.MODEL_DIR, IMPUTATION_STATS_FILE)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2)
+
+# Process-wide pipeline compiled from the declared schema
+pipeline = FeaturePipeline()
+
+def validate_record(record, impute=False):
+    """Validate one record with the process-wide pipeline (see ``FeaturePipeline.validate``)."""
+    return pipeline.validate(record, impute=impute)
+
+def encode_records(records, dtype=np.float64, impute=False):
+    """Encode records with the process-wide pipeline (see ``FeaturePipeline.encode_records``)."""
+    return pipeline.encode_records(records, dtype=dtype, impute=impute)
+
+def encode_record(record, dtype=np.float64, impute=False):
+    """Encode one record with the process-wide pipeline (see ``FeaturePipeline.encode_record``)."""
+    return pipeline.encode_record(record, dtype=dtype, impute=impute)
+
+def encode_grid(base, axes, dtype=np.float64):
+    """Encode a perturbation grid with the process-wide pipeline (see ``FeaturePipeline.encode_grid``)."""
+    return pipeline.encode_grid(base, axes, dtype=dtype)
+
+def encode_frame(df, dtype=np.float64, encoded=False, impute=False):
+    """Encode a DataFrame with the process-wide pipeline (see ``FeaturePipeline.encode_frame``)."""
+    return pipeline.encode_frame(df, dtype=dtype, encoded=encoded, impute=impute)
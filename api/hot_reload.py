@@ -0,0 +1,343 @@
+"""
+Hot reload of versioned model bundles without restarting the server.
+
+``ModelReloader.reload`` loads a bundle (see ``model_bundle.py``) into a new
+``ModelRegistry`` on a background thread while the current version keeps
+serving, validates it (artifact hashes, feature list, class order, manifest
+canary and recently scored live rows), warms the compiled tree engine and then
+either swaps it in with ``model_registry.swap`` or runs it as a shadow.
+Predictions take their registry once per call, so requests in flight during a
+swap finish on the old version and later ones use the new one.
+
+A shadow version scores a copy of live traffic on its own thread, off the
+request path, and reports how often it agrees with the version in service;
+``promote()`` then swaps it in.
+
+Reloads are triggered through the admin endpoints of ``app.py`` or, in every
+worker, by a change of ``manifest.json`` in ``MODEL_DIR`` (write it last, e.g.
+with ``python api/model_bundle.py write``).
+
+Configuration (environment variables):
+    MODEL_WATCH_INTERVAL: Seconds between manifest checks (default 5; 0 disables watching).
+    MODEL_RELOAD_MODE: "swap" (default) or "shadow" for watch-triggered reloads.
+    MODEL_MAX_DISAGREEMENT: Reject a bundle whose labels differ from the current
+        version on more than this fraction of live canary rows (default: no limit).
+    SHADOW_QUEUE_SIZE: Scored batches queued for the shadow before new ones are dropped (default 1024).
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import model_bundle
+import model_registry
+import predict
+import tree_engine
+from model_registry import MANIFEST_FILE, ModelRegistry
+from settings import env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+MODEL_WATCH_INTERVAL = env_float("MODEL_WATCH_INTERVAL", 5.0)
+MODEL_RELOAD_MODE = os.environ.get("MODEL_RELOAD_MODE", "swap").strip().lower()
+MODEL_MAX_DISAGREEMENT = env_float("MODEL_MAX_DISAGREEMENT", None)
+SHADOW_QUEUE_SIZE = env_int("SHADOW_QUEUE_SIZE", 1024)
+
+RELOAD_MODES = ("swap", "shadow")
+
+class ReloadInProgressError(RuntimeError):
+    """Raised when a reload is requested while another one is running."""
+
+class ShadowScorer:
+    """
+    Scores a copy of live traffic with a candidate model version.
+
+    ``submit`` only enqueues (and drops when the queue is full), so the
+    request path never waits for the shadow.
+
+    Args:
+        registry (model_registry.ModelRegistry): Candidate version, loaded.
+        max_queue (int): Queued batches before new ones are dropped.
+        batch_rows (int): Rows scored together by the shadow thread.
+    """
+
+    def __init__(self, registry, max_queue=SHADOW_QUEUE_SIZE, batch_rows=256):
+        self.registry = registry
+        self.batch_rows = batch_rows
+        self.started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._rows = 0
+        self._agree = 0
+        self._likelihood_diff_sum = 0.0
+        self._likelihood_diff_max = 0.0
+        self._transitions = {}
+        self._dropped = 0
+        self._errors = 0
+        self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self._thread.start()
+
+    def submit(self, features, labels, likelihoods):
+        """
+        Queue the outputs of the version in service for comparison.
+
+        Args:
+            features (np.ndarray): Encoded features that were scored.
+            labels (np.ndarray): Predicted labels.
+            likelihoods (np.ndarray): Calibrated likelihoods in percent.
+        """
+        try:
+            self._queue.put_nowait((features, labels, likelihoods))
+        except queue.Full:
+            with self._lock:
+                self._dropped += len(features)
+
+    def _next_batch(self):
+        items = [self._queue.get(timeout=0.5)]
+        rows = len(items[0][0])
+        while rows < self.batch_rows:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            rows += len(items[-1][0])
+        return items
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                items = self._next_batch()
+            except queue.Empty:
+                continue
+            X = np.vstack([item[0] for item in items])
+            labels = np.concatenate([item[1] for item in items])
+            likelihoods = np.concatenate([item[2] for item in items])
+            try:
+                _, shadow_labels, shadow_likelihoods = predict._score(X, self.registry, observe=False)
+            except Exception as e:
+                logger.error(f"Shadow scoring with version {self.registry.version} failed: {str(e)}")
+                with self._lock:
+                    self._errors += len(X)
+                continue
+            diff = np.abs(shadow_likelihoods - likelihoods)
+            pairs, counts = np.unique(np.char.add(np.char.add(labels.astype(str), "->"), shadow_labels.astype(str)),
+                                      return_counts=True)
+            with self._lock:
+                self._rows += len(X)
+                self._agree += int(np.sum(labels == shadow_labels))
+                self._likelihood_diff_sum += float(diff.sum())
+                self._likelihood_diff_max = max(self._likelihood_diff_max, float(diff.max()))
+                for pair, count in zip(pairs.tolist(), counts.tolist()):
+                    self._transitions[pair] = self._transitions.get(pair, 0) + count
+
+    def stats(self):
+        """
+        Return the comparison so far.
+
+        Returns:
+            dict: Rows compared, label agreement, likelihood differences,
+            label transitions (``"current->shadow"``), dropped and failed rows.
+        """
+        with self._lock:
+            rows = self._rows
+            return {
+                "version": self.registry.version,
+                "started": self.started,
+                "rows": rows,
+                "label_agreement": round(self._agree / rows, 4) if rows else None,
+                "mean_likelihood_diff": round(self._likelihood_diff_sum / rows, 4) if rows else None,
+                "max_likelihood_diff": round(self._likelihood_diff_max, 4),
+                "transitions": dict(self._transitions),
+                "dropped_rows": self._dropped,
+                "failed_rows": self._errors,
+                "queued_batches": self._queue.qsize(),
+            }
+
+    def close(self, timeout=1.0):
+        """Stop the shadow thread."""
+        self._stopped.set()
+        self._thread.join(timeout)
+
+class ModelReloader:
+    """
+    Loads, validates and installs new model bundles in the background.
+
+    Args:
+        model_dir (str): Bundle directory to watch and reload from by default.
+        watch_interval (float): Seconds between manifest checks; 0 disables watching.
+        mode (str): Action for watch-triggered reloads, "swap" or "shadow".
+        max_disagreement (float, optional): See ``model_bundle.validate``.
+    """
+
+    def __init__(self, model_dir=model_registry.MODEL_DIR, watch_interval=MODEL_WATCH_INTERVAL,
+                 mode=MODEL_RELOAD_MODE, max_disagreement=MODEL_MAX_DISAGREEMENT):
+        if mode not in RELOAD_MODES:
+            raise ValueError(f"Unknown reload mode: {mode!r}. Expected one of {', '.join(RELOAD_MODES)}.")
+        self.model_dir = model_dir
+        self.watch_interval = watch_interval
+        self.mode = mode
+        self.max_disagreement = max_disagreement
+        self.shadow = None
+        self.last_reload = None
+        self._reload_lock = threading.Lock()
+        self._shadow_lock = threading.Lock()
+        self._watch_pid = None
+        self._watch_signature = self._manifest_signature()
+
+    def _manifest_signature(self):
+        try:
+            st = os.stat(os.path.join(self.model_dir, MANIFEST_FILE))
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def ensure_watching(self):
+        """
+        Start the manifest watch thread in this process if it is not running.
+
+        Called per request so that each forked worker starts its own thread.
+        """
+        if self.watch_interval <= 0 or self._watch_pid == os.getpid():
+            return
+        self._watch_pid = os.getpid()
+        threading.Thread(target=self._watch, name="model-watch", daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.watch_interval)
+            signature = self._manifest_signature()
+            if signature is None or signature == self._watch_signature:
+                continue
+            self._watch_signature = signature
+            try:
+                self.reload(mode=self.mode)
+            except ReloadInProgressError:
+                self._watch_signature = None  # retry on the next check
+
+    def reload(self, model_dir=None, mode="swap", background=False):
+        """
+        Load, validate and install a bundle.
+
+        Args:
+            model_dir (str, optional): Bundle directory; the watched one by default.
+            mode (str): "swap" to serve the bundle, "shadow" to compare it on live traffic.
+            background (bool): Return at once instead of waiting for the result.
+
+        Returns:
+            dict: Reload report (``{"status": "started"}`` in the background).
+
+        Raises:
+            ReloadInProgressError: If another reload is running.
+        """
+        if mode not in RELOAD_MODES:
+            raise ValueError(f"Unknown reload mode: {mode!r}. Expected one of {', '.join(RELOAD_MODES)}.")
+        if not self._reload_lock.acquire(blocking=False):
+            raise ReloadInProgressError("A model reload is already running.")
+        model_dir = model_dir or self.model_dir
+        if background:
+            threading.Thread(target=self._reload, args=(model_dir, mode), name="model-reload", daemon=True).start()
+            return {"status": "started", "model_dir": model_dir, "mode": mode}
+        return self._reload(model_dir, mode)
+
+    def _reload(self, model_dir, mode):
+        start = time.perf_counter()
+        current = model_registry.registry
+        report = {"status": "failed", "model_dir": model_dir, "mode": mode, "previous_version": current.version,
+                  "started": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+        try:
+            candidate = ModelRegistry(model_dir, mmap=current.mmap)
+            report["version"] = candidate.version
+            if mode == "swap" and candidate.manifest is not None and candidate.version == current.version:
+                report["status"] = "unchanged"
+                return report
+            candidate.preload(freeze=False)
+            report["validation"] = model_bundle.validate(candidate, current, list(predict.recent_rows),
+                                                         self.max_disagreement)
+            if predict.INFERENCE_BACKEND == "compiled":
+                tree_engine.get_engine(candidate)
+            if mode == "shadow":
+                self._start_shadow(candidate)
+                report["status"] = "shadowing"
+            else:
+                model_registry.swap(candidate)
+                report["status"] = "swapped"
+        except Exception as e:
+            report["error"] = str(e)
+            logger.error(f"Reload of {model_dir} failed, keeping version {current.version}: {str(e)}")
+        finally:
+            report["seconds"] = round(time.perf_counter() - start, 3)
+            self.last_reload = report
+            self._reload_lock.release()
+        return report
+
+    def _start_shadow(self, registry):
+        with self._shadow_lock:
+            previous, self.shadow = self.shadow, ShadowScorer(registry)
+            predict.shadow = self.shadow
+        if previous is not None:
+            previous.close()
+        logger.info(f"Shadow scoring with version {registry.version}")
+
+    def stop_shadow(self):
+        """
+        Stop shadow scoring.
+
+        Returns:
+            dict or None: Final shadow statistics, or None if no shadow was running.
+        """
+        with self._shadow_lock:
+            scorer, self.shadow = self.shadow, None
+            predict.shadow = None
+        if scorer is None:
+            return None
+        scorer.close()
+        return scorer.stats()
+
+    def promote(self):
+        """
+        Serve the shadow version and stop shadow scoring.
+
+        Returns:
+            dict: Final shadow statistics.
+
+        Raises:
+            ValueError: If no shadow is running.
+        """
+        scorer = self.shadow
+        if scorer is None:
+            raise ValueError("No shadow version to promote.")
+        model_registry.swap(scorer.registry)
+        return self.stop_shadow()
+
+    def status(self):
+        """
+        Return the serving version, watch state, last reload and shadow statistics.
+
+        Returns:
+            dict: Status report.
+        """
+        current = model_registry.registry
+        manifest = current.manifest or {}
+        scorer = self.shadow
+        return {
+            "version": current.version,
+            "model_dir": current.model_dir,
+            "created": manifest.get("created"),
+            "classes": manifest.get("classes"),
+            "watching": self._watch_pid == os.getpid(),
+            "reloading": self._reload_lock.locked(),
+            "last_reload": self.last_reload,
+            "shadow": None if scorer is None else scorer.stats(),
+        }
+
+    def close(self):
+        """Stop shadow scoring (the watch thread is a daemon and ends with the process)."""
+        self.stop_shadow()
+
+reloader = ModelReloader()
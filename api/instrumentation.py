@@ -0,0 +1,199 @@
+"""
+Opt-in instrumentation for the prediction service.
+
+Per-stage latency histograms, request counters and sampled payload logging.
+Everything is disabled by default; while disabled ``stage`` returns a shared
+no-op context manager and the other hooks return immediately, so the hot path
+pays only a flag check.
+
+Configuration (environment variables):
+    INSTRUMENTATION_ENABLED: "1"/"true" to record timings and counters.
+    PAYLOAD_LOG_SAMPLE_RATE: Fraction (0.0–1.0) of requests whose payloads are logged.
+"""
+
+import bisect
+import contextlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+
+from settings import env_flag, env_float
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+_NULL_STAGE = contextlib.nullcontext()
+
+class Histogram:
+    """Fixed-bucket latency histogram (non-cumulative counts, Prometheus-style export)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value_ms):
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+
+    def to_dict(self):
+        cumulative = 0
+        buckets = {}
+        for bound, n in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += n
+            buckets[str(bound)] = cumulative
+        return {"count": self.count, "sum_ms": round(self.total, 4), "buckets": buckets}
+
+class _StageTimer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _observe(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+
+enabled = env_flag("INSTRUMENTATION_ENABLED")
+payload_sample_rate = env_float("PAYLOAD_LOG_SAMPLE_RATE", 0.0)
+
+def configure(enable=None, sample_rate=None):
+    """
+    Change instrumentation settings at runtime.
+
+    Args:
+        enable (bool, optional): Turn timing and counters on or off.
+        sample_rate (float, optional): Fraction of payloads to log.
+    """
+    global enabled, payload_sample_rate
+    if enable is not None:
+        enabled = bool(enable)
+    if sample_rate is not None:
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("Payload sample rate must be between 0 and 1.")
+        payload_sample_rate = float(sample_rate)
+
+def reset():
+    """Clear all recorded histograms and counters."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+def _observe(name, value_ms):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(value_ms)
+
+def stage(name):
+    """
+    Time a pipeline stage.
+
+    Args:
+        name (str): Stage name, e.g. "preprocess", "rf", "xgb", "calibrate", "recommend".
+
+    Returns:
+        A context manager; a shared no-op one while instrumentation is disabled.
+    """
+    if not enabled:
+        return _NULL_STAGE
+    return _StageTimer(name)
+
+def observe(name, value_ms):
+    """
+    Record a latency measured by the caller (e.g. time spent queued).
+
+    Args:
+        name (str): Histogram name.
+        value_ms (float): Value in milliseconds.
+    """
+    if enabled:
+        _observe(name, value_ms)
+
+def count(name, n=1):
+    """
+    Increment a named counter (e.g. requests per endpoint).
+
+    Args:
+        name (str): Counter name.
+        n (int): Amount to add.
+    """
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def should_log_payload():
+    """Return True if the current request's payload should be logged."""
+    return payload_sample_rate > 0.0 and random.random() < payload_sample_rate
+
+def log_payload(event, **fields):
+    """
+    Emit a structured log line for a request.
+
+    Callers check ``should_log_payload()`` first so unsampled requests never
+    build the payload.
+
+    Args:
+        event (str): Event name.
+        **fields: JSON-serializable fields to include.
+    """
+    logger.info(json.dumps({"event": event, **fields}, default=str))
+
+def snapshot():
+    """
+    Return the recorded metrics.
+
+    Returns:
+        dict: ``enabled`` flag, per-stage latency histograms and counters.
+    """
+    with _lock:
+        return {
+            "enabled": enabled,
+            "stages": {name: h.to_dict() for name, h in _histograms.items()},
+            "counters": dict(_counters),
+        }
+
+def _metric_name(name):
+    """Turn a counter name into a valid Prometheus metric name."""
+    metric = re.sub(r"[^a-zA-Z0-9_]", "_", name)
+    return metric if re.match(r"[a-zA-Z_]", metric) else f"_{metric}"
+
+def render_prometheus():
+    """
+    Render the recorded metrics in the Prometheus text exposition format.
+
+    Each counter becomes its own ``<name>_total`` counter metric (e.g.
+    ``prediction_cache_hits_total``), since most of them do not count requests.
+
+    Returns:
+        str: Metrics text.
+    """
+    data = snapshot()
+    lines = ["# TYPE stage_latency_ms histogram"]
+    for name, h in sorted(data["stages"].items()):
+        for bound, n in h["buckets"].items():
+            lines.append(f'stage_latency_ms_bucket{{stage="{name}",le="{bound}"}} {n}')
+        lines.append(f'stage_latency_ms_sum{{stage="{name}"}} {h["sum_ms"]}')
+        lines.append(f'stage_latency_ms_count{{stage="{name}"}} {h["count"]}')
+    for name, n in sorted(data["counters"].items()):
+        metric = f"{_metric_name(name)}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {n}")
+    return "\n".join(lines) + "\n"
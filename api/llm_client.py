@@ -0,0 +1,168 @@
+"""
+Pooled, timeout-bounded client for the text-generation backend used by ``/chat``.
+
+One ``requests.Session`` is shared by all request threads, so connections
+(and their TLS sessions) are kept alive and reused instead of being opened per
+call. Every call has connect and read timeouts, and at most
+``LLM_MAX_CONCURRENCY`` calls are in flight at once: when all slots are taken
+a new call waits at most ``LLM_QUEUE_TIMEOUT`` seconds and then fails fast
+with ``LLMBusyError`` instead of pinning another worker thread.
+
+Configuration (environment variables):
+    COHERE_API_URL: Generation endpoint (default Cohere's ``/v1/generate``).
+    COHERE_API_TOKEN: Bearer token.
+    LLM_CONNECT_TIMEOUT: Seconds to establish a connection (default 3.05).
+    LLM_READ_TIMEOUT: Seconds to wait for the response (default 20).
+    LLM_MAX_CONCURRENCY: Maximum concurrent upstream calls (default 8).
+    LLM_QUEUE_TIMEOUT: Seconds to wait for a free slot before failing (default 0).
+"""
+
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import instrumentation
+from settings import env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+COHERE_API_URL = os.environ.get("COHERE_API_URL") or "https://api.cohere.ai/v1/generate"
+COHERE_API_TOKEN = os.environ.get("COHERE_API_TOKEN", "")  # Replace with your Cohere API token
+LLM_CONNECT_TIMEOUT = env_float("LLM_CONNECT_TIMEOUT", 3.05)
+LLM_READ_TIMEOUT = env_float("LLM_READ_TIMEOUT", 20.0)
+LLM_MAX_CONCURRENCY = env_int("LLM_MAX_CONCURRENCY", 8)
+LLM_QUEUE_TIMEOUT = env_float("LLM_QUEUE_TIMEOUT", 0.0)
+
+class LLMError(Exception):
+    """Base class for generation backend failures."""
+
+class LLMBusyError(LLMError):
+    """All concurrency slots are taken."""
+
+class LLMTimeoutError(LLMError):
+    """The backend did not connect or answer within the configured timeouts."""
+
+class LLMUpstreamError(LLMError):
+    """The backend answered with an error status or an unexpected body."""
+
+class LLMClient:
+    """
+    Thread-safe generation client with a keep-alive connection pool.
+
+    Args:
+        url (str): Generation endpoint.
+        token (str): Bearer token.
+        connect_timeout (float): Connection timeout in seconds.
+        read_timeout (float): Response timeout in seconds.
+        max_concurrency (int): Maximum concurrent calls (also the pool size).
+        queue_timeout (float): Seconds to wait for a free slot; 0 fails immediately.
+    """
+
+    def __init__(self, url=COHERE_API_URL, token=COHERE_API_TOKEN, connect_timeout=LLM_CONNECT_TIMEOUT,
+                 read_timeout=LLM_READ_TIMEOUT, max_concurrency=LLM_MAX_CONCURRENCY, queue_timeout=LLM_QUEUE_TIMEOUT):
+        if max_concurrency < 1:
+            raise ValueError("LLM max concurrency must be at least 1.")
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counts = {"requests": 0, "rejected": 0, "timeouts": 0, "errors": 0}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        })
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+        instrumentation.count(f"llm_{name}")
+
+    def generate(self, prompt, max_tokens=100, temperature=0.7, model="command"):
+        """
+        Generate a completion.
+
+        Args:
+            prompt (str): Full prompt text.
+            max_tokens (int): Maximum tokens to generate.
+            temperature (float): Sampling temperature.
+            model (str): Backend model name.
+
+        Returns:
+            str: Generated text, stripped.
+
+        Raises:
+            LLMBusyError: No concurrency slot became free in time.
+            LLMTimeoutError: The backend timed out.
+            LLMUpstreamError: The backend failed or returned an unexpected body.
+        """
+        acquired = self._slots.acquire(timeout=self.queue_timeout) if self.queue_timeout > 0 \
+            else self._slots.acquire(blocking=False)
+        if not acquired:
+            self._count("rejected")
+            raise LLMBusyError(f"Chat backend is busy ({self.max_concurrency} requests in flight). Try again shortly.")
+        with self._lock:
+            self._in_flight += 1
+        try:
+            self._count("requests")
+            payload = {
+                "model": model,
+                "prompt": prompt,
+                "max_tokens": max_tokens,
+                "temperature": temperature
+            }
+            start = time.perf_counter()
+            try:
+                with instrumentation.stage("llm"):
+                    response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except requests.Timeout as e:
+                self._count("timeouts")
+                raise LLMTimeoutError(f"Chat backend timed out: {str(e)}")
+            except requests.RequestException as e:
+                self._count("errors")
+                raise LLMUpstreamError(f"Chat backend request failed: {str(e)}")
+            logger.debug(f"LLM response status: {response.status_code} in {time.perf_counter() - start:.3f}s")
+
+            if response.status_code != 200:
+                self._count("errors")
+                raise LLMUpstreamError(f"Cohere API error: {response.status_code} - {response.text}")
+            try:
+                return response.json()["generations"][0]["text"].strip()
+            except (KeyError, IndexError, TypeError, ValueError):
+                self._count("errors")
+                raise LLMUpstreamError(f"Unexpected API response format: {response.text}")
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def stats(self):
+        """
+        Return client statistics.
+
+        Returns:
+            dict: Limits, current in-flight calls and request/rejection/timeout/error counts.
+        """
+        with self._lock:
+            return dict(
+                self._counts,
+                in_flight=self._in_flight,
+                max_concurrency=self.max_concurrency,
+                connect_timeout=self.timeout[0],
+                read_timeout=self.timeout[1],
+            )
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
@@ -0,0 +1,259 @@
+"""
+Versioned model bundles: manifest, integrity checks and canary validation.
+
+A bundle is a model directory holding the artifacts of
+``model_registry.ARTIFACT_FILES`` (and optionally ``imputation_stats.json``)
+plus a ``manifest.json`` describing them:
+
+- ``version``: bundle version (UTC timestamp and content hash by default);
+- ``features``: model input columns, in order (``features.FEATURES``);
+- ``classes``: class order of ``rf_encoder.classes_``;
+- ``low_threshold``: the Low-risk override threshold;
+- ``artifacts``: file name, size and SHA-256 of every artifact;
+- ``libraries``: scikit-learn, xgboost and NumPy versions that wrote it;
+- ``canary``: synthetic feature rows with the probabilities, labels and
+  likelihoods the bundle produced when the manifest was written.
+
+``model_registry`` checks each artifact against its hash before unpickling
+it, and ``validate`` replays the canary (plus recent live rows) before a
+hot-reloaded bundle serves traffic (see ``hot_reload.py``). Write the
+manifest last after retraining, since a changed manifest triggers the reload:
+
+Usage:
+    python api/model_bundle.py write [MODEL_DIR] [--version VERSION]
+    python api/model_bundle.py verify [MODEL_DIR]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+from datetime import datetime, timezone
+
+import numpy as np
+
+import model_registry
+from model_registry import ARTIFACT_FILES, MANIFEST_FILE, ModelRegistry, file_sha256, read_manifest
+
+FORMAT = 1
+
+# Synthetic rows replayed on every reload, and the tolerance of the replay
+CANARY_ROWS = 64
+CANARY_TOLERANCE = 1e-6
+
+# Artifacts hashed when present but not required
+OPTIONAL_FILES = {"imputation_stats": "imputation_stats.json"}
+
+class BundleError(ValueError):
+    """Raised when a bundle is incomplete, inconsistent or fails its canary."""
+
+def canary_records(n=CANARY_ROWS, seed=0):
+    """
+    Deterministic synthetic athlete records covering every category.
+
+    Args:
+        n (int): Number of records.
+        seed (int): Random seed.
+
+    Returns:
+        list: Raw input records.
+    """
+    from features import SCHEMA
+    rng = np.random.default_rng(seed)
+    records = []
+    for i in range(n):
+        record = {}
+        for field, spec in SCHEMA.items():
+            if spec["kind"] == "categorical":
+                categories = list(spec["categories"])
+                record[field] = categories[i % len(categories)]
+            elif spec["dtype"] == "int":
+                record[field] = int(rng.integers(0, 60))
+            else:
+                record[field] = round(float(rng.uniform(0, 60)), 2)
+        records.append(record)
+    return records
+
+def _file_entries(model_dir):
+    entries = {}
+    for name, filename in {**ARTIFACT_FILES, **OPTIONAL_FILES}.items():
+        path = os.path.join(model_dir, filename)
+        if name in OPTIONAL_FILES and not os.path.exists(path):
+            continue
+        entries[name] = {"file": filename, "bytes": os.path.getsize(path), "sha256": file_sha256(path)}
+    return entries
+
+def _library_versions():
+    import sklearn
+    import xgboost
+    return {"python": platform.python_version(), "numpy": np.__version__,
+            "scikit-learn": sklearn.__version__, "xgboost": xgboost.__version__}
+
+def build_manifest(model_dir, version=None):
+    """
+    Describe the artifacts in a model directory.
+
+    Args:
+        model_dir (str): Directory holding the artifacts.
+        version (str, optional): Bundle version; defaults to the UTC time and
+            a hash of the artifact hashes.
+
+    Returns:
+        dict: The manifest (not yet written).
+    """
+    from features import FEATURES, encode_records
+    from predict import _score
+
+    artifacts = _file_entries(model_dir)
+    if version is None:
+        content = hashlib.sha256("".join(e["sha256"] for e in artifacts.values()).encode()).hexdigest()
+        version = f"{datetime.now(timezone.utc):%Y%m%d-%H%M%S}-{content[:8]}"
+    manifest = {"format": FORMAT, "version": version, "artifacts": artifacts}
+
+    # Load exactly the files just hashed
+    registry = ModelRegistry(model_dir)
+    registry.manifest, registry.version = manifest, version
+    X = encode_records(canary_records())
+    avg_probs, labels, likelihoods = _score(X, registry, observe=False)
+    manifest.update({
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "features": list(FEATURES),
+        "classes": registry.get("rf_encoder").classes_.tolist(),
+        "low_threshold": float(registry.get("low_threshold")),
+        "libraries": _library_versions(),
+        "canary": {"features": X.tolist(), "probabilities": avg_probs.tolist(),
+                   "labels": labels.tolist(), "likelihoods": likelihoods.tolist()},
+    })
+    return manifest
+
+def write_manifest(model_dir, version=None):
+    """
+    Write ``manifest.json`` into a model directory, atomically.
+
+    Args:
+        model_dir (str): Directory holding the artifacts.
+        version (str, optional): Bundle version (see ``build_manifest``).
+
+    Returns:
+        dict: The manifest written.
+    """
+    manifest = build_manifest(model_dir, version)
+    path = os.path.join(model_dir, MANIFEST_FILE)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+    return manifest
+
+def verify_files(model_dir, manifest):
+    """
+    Check every artifact file in a directory against the manifest.
+
+    Args:
+        model_dir (str): Bundle directory.
+        manifest (dict): Its manifest.
+
+    Raises:
+        BundleError: If the manifest is unsupported or a file is missing or differs.
+    """
+    if manifest.get("format") != FORMAT:
+        raise BundleError(f"Unsupported manifest format: {manifest.get('format')!r}")
+    missing = [name for name in ARTIFACT_FILES if name not in manifest.get("artifacts", {})]
+    if missing:
+        raise BundleError(f"Manifest lists no hash for: {', '.join(missing)}")
+    for name, entry in manifest["artifacts"].items():
+        path = os.path.join(model_dir, entry["file"])
+        if not os.path.exists(path):
+            raise BundleError(f"Missing artifact: {entry['file']}")
+        if file_sha256(path) != entry["sha256"]:
+            raise BundleError(f"{entry['file']} does not match manifest version {manifest['version']}.")
+
+def validate(registry, current=None, live_rows=None, max_disagreement=None):
+    """
+    Check a loaded bundle before it serves traffic.
+
+    Verifies the files against the manifest, the feature list, class order and
+    threshold against the loaded objects, and replays the manifest's canary
+    rows, which must reproduce the recorded outputs. Recent live rows, when
+    given, must score to valid probabilities; their labels are compared with
+    the ``current`` version.
+
+    Args:
+        registry (model_registry.ModelRegistry): Candidate, already loaded.
+        current (model_registry.ModelRegistry, optional): Version in service.
+        live_rows (list, optional): Recently scored feature rows.
+        max_disagreement (float, optional): Highest tolerated fraction of
+            live rows whose label differs from ``current``.
+
+    Returns:
+        dict: Validation report.
+
+    Raises:
+        BundleError: If any check fails.
+    """
+    from features import FEATURES
+    from predict import _score
+
+    manifest = registry.manifest
+    if manifest is None:
+        raise BundleError(f"{registry.model_dir} has no {MANIFEST_FILE}; write one with model_bundle.py.")
+    verify_files(registry.model_dir, manifest)
+    if manifest["features"] != list(FEATURES):
+        raise BundleError("Bundle was trained on different features than this service encodes.")
+    classes = registry.get("rf_encoder").classes_.tolist()
+    if classes != manifest["classes"] or registry.get("xgb_encoder").classes_.tolist() != classes:
+        raise BundleError(f"Class order {classes} does not match the manifest {manifest['classes']}.")
+    if float(registry.get("low_threshold")) != manifest["low_threshold"]:
+        raise BundleError("low_threshold does not match the manifest.")
+
+    canary = manifest["canary"]
+    avg_probs, labels, likelihoods = _score(np.asarray(canary["features"]), registry, observe=False)
+    diff = max(np.abs(avg_probs - np.asarray(canary["probabilities"])).max(),
+               np.abs(likelihoods - np.asarray(canary["likelihoods"])).max() / 100)
+    if diff > CANARY_TOLERANCE or labels.tolist() != canary["labels"]:
+        raise BundleError(f"Canary outputs differ from the manifest by {diff:.2e}; "
+                          f"check library versions ({manifest.get('libraries')}).")
+    report = {"version": registry.version, "canary_rows": len(labels), "canary_max_diff": float(diff)}
+
+    if live_rows:
+        X = np.vstack(live_rows)
+        avg_probs, labels, likelihoods = _score(X, registry, observe=False)
+        if not (np.isfinite(avg_probs).all() and np.allclose(avg_probs.sum(axis=1), 1.0)
+                and np.isfinite(likelihoods).all()):
+            raise BundleError("Candidate produced invalid probabilities on live rows.")
+        report["live_rows"] = len(X)
+        if current is not None:
+            _, current_labels, current_likelihoods = _score(X, current, observe=False)
+            disagreement = float(np.mean(labels != current_labels))
+            report.update(live_label_agreement=round(1.0 - disagreement, 4),
+                          live_max_likelihood_diff=round(float(np.abs(likelihoods - current_likelihoods).max()), 4))
+            if max_disagreement is not None and disagreement > max_disagreement:
+                raise BundleError(f"Labels differ from version {current.version} on {disagreement:.1%} of live rows "
+                                  f"(limit {max_disagreement:.1%}).")
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write or verify a model bundle manifest.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    write = subparsers.add_parser("write", help="hash the artifacts and record a canary batch")
+    write.add_argument("model_dir", nargs="?", default=model_registry.MODEL_DIR)
+    write.add_argument("--version", help="bundle version (default: UTC time and content hash)")
+    verify = subparsers.add_parser("verify", help="check the artifacts and replay the canary")
+    verify.add_argument("model_dir", nargs="?", default=model_registry.MODEL_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "write":
+        manifest = write_manifest(args.model_dir, args.version)
+        print(f"Wrote {MANIFEST_FILE} for version {manifest['version']} ({len(manifest['artifacts'])} artifacts)")
+        return
+    if read_manifest(args.model_dir) is None:
+        raise SystemExit(f"No {MANIFEST_FILE} in {args.model_dir}")
+    registry = ModelRegistry(args.model_dir)
+    registry.preload(freeze=False)
+    report = validate(registry)
+    print(f"Version {report['version']} OK: artifacts match, canary reproduced "
+          f"(max diff {report['canary_max_diff']:.1e} on {report['canary_rows']} rows)")
+
+if __name__ == "__main__":
+    main()
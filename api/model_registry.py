@@ -0,0 +1,300 @@
+"""
+Lazy, shareable loading of the model artifacts in ``model/``.
+
+Artifacts are loaded on first use instead of at import time. For multi-worker
+deployments call ``preload()`` in the master process before forking: the
+loaded objects are then moved out of the garbage collector's reach
+(``gc.freeze``) so forked workers keep sharing their pages copy-on-write.
+With ``MODEL_MMAP=1`` the RandomForest pickle is opened with joblib's
+``mmap_mode="r"``. This only spares the copy of arrays that stay NumPy arrays
+after unpickling; sklearn copies each tree's node and value arrays into its
+own buffers, so the trees themselves are not shared between workers that load
+independently (use ``preload()`` for that).
+
+A model directory holding a ``manifest.json`` (see ``model_bundle.py``) is a
+versioned bundle: every artifact is checked against the manifest's SHA-256
+before it is unpickled. ``swap()`` replaces the process-wide registry with
+another (e.g. a hot-reloaded bundle) in one assignment; callers that took a
+reference to the previous registry keep using it until they finish.
+
+Configuration (environment variables):
+    MODEL_DIR: Directory containing the ``.pkl`` artifacts (default ``../model``).
+    MODEL_MMAP: "1" to open the RandomForest pickle memory-mapped.
+"""
+
+import gc
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+
+import joblib
+
+from settings import env_flag
+
+logger = logging.getLogger(__name__)
+
+# Define model directory using relative path
+MODEL_DIR = os.environ.get("MODEL_DIR") or os.path.join(os.path.dirname(__file__), "..", "model")
+
+# Artifact name -> file in MODEL_DIR
+ARTIFACT_FILES = {
+    "rf_model": "rf_injury_model.pkl",
+    "xgb_model": "xgboost_injury_model.pkl",
+    "calibrator": "likelihood_calibrator.pkl",
+    "rf_encoder": "rf_target_encoder.pkl",
+    "xgb_encoder": "xgb_target_encoder.pkl",
+    "low_threshold": "calibration_threshold.pkl",
+}
+
+# Artifacts whose arrays may be memory-mapped (large, read-only tree arrays)
+MMAP_ARTIFACTS = ("rf_model",)
+
+# Bundle manifest written by ``model_bundle.py``
+MANIFEST_FILE = "manifest.json"
+
+class ArtifactIntegrityError(ValueError):
+    """Raised when an artifact file does not match its bundle manifest."""
+
+@contextmanager
+def unnamed_features():
+    """
+    Score NumPy matrices with models fitted on DataFrames, without warnings.
+
+    The models and calibrator were fitted with column names, so scikit-learn
+    warns on every call with the encoder's unnamed matrices; the columns are
+    already in model order. Only the calls inside the block are silenced.
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+        yield
+
+def file_sha256(path):
+    """Return the hex SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def read_manifest(model_dir):
+    """
+    Read a bundle manifest.
+
+    Args:
+        model_dir (str): Model directory.
+
+    Returns:
+        dict or None: The manifest, or None for a directory without one.
+    """
+    try:
+        with open(os.path.join(model_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def current_rss_mb():
+    """
+    Return the resident set size of this process in MB.
+
+    Returns:
+        float or None: RSS, or None where /proc is unavailable.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class ModelRegistry:
+    """
+    Loads model artifacts on first access and keeps them for the process lifetime.
+
+    Args:
+        model_dir (str): Directory containing the artifacts.
+        mmap (bool): Memory-map the arrays of ``MMAP_ARTIFACTS``.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, mmap=False):
+        self.model_dir = model_dir
+        self.mmap = mmap
+        self.manifest = read_manifest(model_dir)
+        self.version = self.manifest["version"] if self.manifest else "unversioned"
+        self._artifacts = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _expected_sha256(self, name):
+        if self.manifest is None:
+            return None
+        return self.manifest["artifacts"].get(name, {}).get("sha256")
+
+    def _load(self, name):
+        path = os.path.join(self.model_dir, ARTIFACT_FILES[name])
+        mmap_mode = "r" if self.mmap and name in MMAP_ARTIFACTS else None
+        expected = self._expected_sha256(name)
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        try:
+            if expected is None:
+                artifact = joblib.load(path, mmap_mode=mmap_mode)
+            elif mmap_mode is None:
+                # Unpickle exactly the bytes that were checked
+                with open(path, "rb") as f:
+                    data = f.read()
+                if hashlib.sha256(data).hexdigest() != expected:
+                    raise ArtifactIntegrityError(f"{ARTIFACT_FILES[name]} does not match manifest version {self.version}.")
+                artifact = joblib.load(io.BytesIO(data))
+            else:
+                if file_sha256(path) != expected:
+                    raise ArtifactIntegrityError(f"{ARTIFACT_FILES[name]} does not match manifest version {self.version}.")
+                artifact = joblib.load(path, mmap_mode=mmap_mode)
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"Model file not found: {str(e)}. Ensure all model files are in {self.model_dir}.")
+        rss_after = current_rss_mb()
+        self._stats[name] = {
+            "file": ARTIFACT_FILES[name],
+            "load_seconds": round(time.perf_counter() - start, 4),
+            "rss_delta_mb": None if rss_before is None else round(rss_after - rss_before, 2),
+            "mmap": mmap_mode is not None,
+            "verified": expected is not None,
+        }
+        logger.info(f"Loaded {name} from {path} in {self._stats[name]['load_seconds']}s "
+                    f"(RSS +{self._stats[name]['rss_delta_mb']} MB, mmap={mmap_mode is not None})")
+        return artifact
+
+    def get(self, name):
+        """
+        Return an artifact, loading it on first access.
+
+        Args:
+            name (str): One of ``ARTIFACT_FILES``.
+
+        Returns:
+            The loaded object.
+        """
+        artifact = self._artifacts.get(name)
+        if artifact is not None:
+            return artifact
+        if name not in ARTIFACT_FILES:
+            raise KeyError(f"Unknown model artifact: {name}")
+        with self._lock:
+            if name not in self._artifacts:
+                self._artifacts[name] = self._load(name)
+            return self._artifacts[name]
+
+    def is_loaded(self, name=None):
+        """
+        Check whether one artifact (or all of them) has been loaded.
+
+        Args:
+            name (str, optional): Artifact name; all artifacts if omitted.
+
+        Returns:
+            bool: Load state.
+        """
+        if name is None:
+            return all(n in self._artifacts for n in ARTIFACT_FILES)
+        return name in self._artifacts
+
+    def preload(self, freeze=True):
+        """
+        Load every artifact now, e.g. in the master process before forking workers.
+
+        Args:
+            freeze (bool): Call ``gc.freeze()`` afterwards so the garbage
+                collector does not touch (and un-share) the loaded objects.
+
+        Returns:
+            dict: Per-artifact load time and RSS delta, plus totals.
+        """
+        start = time.perf_counter()
+        for name in ARTIFACT_FILES:
+            self.get(name)
+        if freeze and hasattr(gc, "freeze"):
+            gc.collect()
+            gc.freeze()
+        report = self.stats()
+        logger.info(f"Preloaded {len(ARTIFACT_FILES)} model artifacts in {report['total_seconds']}s, "
+                    f"RSS {report['rss_mb']} MB (total load {round(time.perf_counter() - start, 4)}s)")
+        return report
+
+    def fingerprint(self):
+        """
+        Identify the artifact files currently on disk.
+
+        Returns:
+            tuple: ``(file, mtime_ns, size)`` per artifact (``None`` stats if missing).
+        """
+        result = []
+        for filename in ARTIFACT_FILES.values():
+            try:
+                st = os.stat(os.path.join(self.model_dir, filename))
+                result.append((filename, st.st_mtime_ns, st.st_size))
+            except OSError:
+                result.append((filename, None, None))
+        return tuple(result)
+
+    def stats(self):
+        """
+        Return load statistics for the artifacts loaded so far.
+
+        Returns:
+            dict: ``version``, ``artifacts`` (per-artifact stats), ``total_seconds`` and current ``rss_mb``.
+        """
+        rss = current_rss_mb()
+        return {
+            "version": self.version,
+            "artifacts": dict(self._stats),
+            "total_seconds": round(sum(s["load_seconds"] for s in self._stats.values()), 4),
+            "rss_mb": None if rss is None else round(rss, 2),
+        }
+
+registry = ModelRegistry(MODEL_DIR, mmap=env_flag("MODEL_MMAP"))
+
+_swap_lock = threading.Lock()
+_swap_listeners = []
+
+def on_swap(callback):
+    """
+    Register ``callback(old, new)`` to run after every ``swap``.
+
+    Args:
+        callback: Called with the previous and the new registry.
+    """
+    _swap_listeners.append(callback)
+
+def swap(new_registry):
+    """
+    Make ``new_registry`` the process-wide registry.
+
+    The assignment is atomic: requests that already took the previous
+    registry finish on it, later ones get the new one.
+
+    Args:
+        new_registry (ModelRegistry): Fully loaded and validated registry.
+
+    Returns:
+        ModelRegistry: The previous registry.
+    """
+    global registry
+    with _swap_lock:
+        old, registry = registry, new_registry
+        for callback in _swap_listeners:
+            callback(old, new_registry)
+    logger.info(f"Model version {old.version} replaced by {new_registry.version}")
+    return old
+
+def get(name):
+    """Return an artifact from the process-wide registry."""
+    return registry.get(name)
+
+def preload(freeze=True):
+    """Preload all artifacts into the process-wide registry."""
+    return registry.preload(freeze=freeze)
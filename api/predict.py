@@ -1,37 +1,173 @@
 import pandas as pd
 import numpy as np
-import joblib
+import collections
+import math
 import os
-from recommendation import generate_recommendations
+import time
+import threading
+import weakref
+import logging
+import instrumentation
+import model_registry
+import tree_engine
+from athlete_store import DATE_FIELD, AthleteStore, RULE_FIELDS, athlete_key, parse_day, rule_fields
+from batcher import MicroBatcher
+from cache import MISSING, TTLCache
+from settings import env_flag, env_float, env_int
+from recommendation import generate_recommendations, generate_recommendations_batch
+from features import FEATURES, SCHEMA, pipeline, validate_record, encode_grid, encode_record, encode_records
+
+logger = logging.getLogger(__name__)
 
-# Define mappings for categorical variables (consistent with CalibrateLikelihood.ipynb)
-gender_mapping = {"Male": 0, "Female": 1}
-experience_mapping = {"Beginner": 0, "Intermediate": 1, "Advanced": 2, "Professional": 3}
-injury_type_mapping = {"None": 0, "Sprain": 1, "Ligament Tear": 2, "Tendonitis": 3, "Strain": 4, "Fracture": 5}
-sport_type_mapping = {"Football": 0, "Basketball": 1, "Swimming": 2, "Tennis": 3, "Running": 4}
 risk_level_mapping = {0: "High", 1: "Low", 2: "Medium"}
 
-# Define model directory using relative path
-MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "model")
+# Model artifacts are loaded lazily through the shared registry
+MODEL_DIR = model_registry.MODEL_DIR
+
+_encoders_checked = weakref.WeakSet()
+
+def _check_encoders(registry=None):
+    """Verify encoder consistency once per model version, on first use of the models."""
+    registry = registry or model_registry.registry
+    if registry not in _encoders_checked:
+        rf_encoder = registry.get("rf_encoder")
+        xgb_encoder = registry.get("xgb_encoder")
+        if not (rf_encoder.classes_ == xgb_encoder.classes_).all():
+            raise ValueError("RandomForest and XGBoost encoders have inconsistent class mappings.")
+        _encoders_checked.add(registry)
+
+def __getattr__(name):
+    # Keep ``predict.rf_model`` etc. working without loading at import time
+    if name in model_registry.ARTIFACT_FILES:
+        return model_registry.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Upper bound on records accepted by a single batch call
+MAX_BATCH_SIZE = 10000
+
+# Athlete history (see athlete_store.py), opt-in: with ATHLETE_STORE=1 records
+# with an ``Athlete_Id`` are stored and their rolling-load aggregates feed the
+# recommendations. The store is opened on first use (``get_athlete_store``).
+ATHLETE_STORE = env_flag("ATHLETE_STORE", False)
+ATHLETE_STORE_PATH = os.environ.get("ATHLETE_STORE_PATH") or os.path.join(os.path.dirname(__file__), "..", "data", "athletes.sqlite3")
+athlete_store = None
+_athlete_store_lock = threading.Lock()
+
+def get_athlete_store():
+    """
+    Return the athlete store, opening it on first use.
+
+    Returns:
+        AthleteStore or None: The store, or None if ``ATHLETE_STORE`` is off
+        and none was assigned to ``athlete_store``.
+    """
+    global athlete_store
+    if athlete_store is None and ATHLETE_STORE:
+        with _athlete_store_lock:
+            if athlete_store is None:
+                athlete_store = AthleteStore(ATHLETE_STORE_PATH)
+    return athlete_store
+
+def close_athlete_store():
+    """Close this process's athlete store connection, if the store was opened."""
+    if athlete_store is not None:
+        athlete_store.close()
+
+# Class whose ensemble probability explanations break down by feature
+EXPLAIN_CLASS = "High"
+
+# Inference backend: "sklearn" (the libraries) or "compiled" (tree_engine).
+# The compiled engine wins on small batches; larger ones go to the libraries.
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "sklearn").lower()
+COMPILED_MAX_BATCH = env_int("COMPILED_MAX_BATCH", 256)
+
+# Cache of full /predict responses keyed on the encoded feature vector
+# (PREDICTION_CACHE_SIZE=0 disables it)
+PREDICTION_CACHE_SIZE = env_int("PREDICTION_CACHE_SIZE", 1024)
+PREDICTION_CACHE_TTL = env_float("PREDICTION_CACHE_TTL", 300.0)
+# How often (seconds) to check model/ for changed artifacts
+ARTIFACT_CHECK_INTERVAL = env_float("ARTIFACT_CHECK_INTERVAL", 1.0)
+
+# Micro-batching: concurrent /predict calls are scored together on a
+# background thread (MICRO_BATCHING=1)
+MICRO_BATCHING = env_flag("MICRO_BATCHING")
+BATCH_MAX_SIZE = env_int("BATCH_MAX_SIZE", 32)
+BATCH_MAX_WAIT_MS = env_float("BATCH_MAX_WAIT_MS", 2.0)
+BATCH_MAX_QUEUE = env_int("BATCH_MAX_QUEUE", 1024)
+BATCH_TIMEOUT = env_float("BATCH_TIMEOUT", 30.0)
+
+# Recently scored feature rows, replayed as a canary batch before a new model
+# version is swapped in (see hot_reload.py)
+LIVE_CANARY_ROWS = env_int("LIVE_CANARY_ROWS", 256)
+recent_rows = collections.deque(maxlen=LIVE_CANARY_ROWS)
+
+# Shadow scorer comparing a candidate model version on live traffic; set by
+# hot_reload.ModelReloader
+shadow = None
 
-# Load models, encoders, and calibration threshold
-try:
-    rf_model = joblib.load(os.path.join(MODEL_DIR, "rf_injury_model.pkl"))
-    xgb_model = joblib.load(os.path.join(MODEL_DIR, "xgboost_injury_model.pkl"))
-    calibrator = joblib.load(os.path.join(MODEL_DIR, "likelihood_calibrator.pkl"))
-    rf_encoder = joblib.load(os.path.join(MODEL_DIR, "rf_target_encoder.pkl"))
-    xgb_encoder = joblib.load(os.path.join(MODEL_DIR, "xgb_target_encoder.pkl"))
-    low_threshold = joblib.load(os.path.join(MODEL_DIR, "calibration_threshold.pkl"))
-except FileNotFoundError as e:
-    raise FileNotFoundError(f"Model file not found: {str(e)}. Ensure all model files are in {MODEL_DIR}.")
+prediction_cache = TTLCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+_artifact_fingerprint = None
+_artifacts_checked_at = 0.0
 
-# Verify encoder consistency
-if not (rf_encoder.classes_ == xgb_encoder.classes_).all():
-    raise ValueError("RandomForest and XGBoost encoders have inconsistent class mappings.")
+def _invalidate_on_artifact_change():
+    """Clear the prediction cache when the files in the model directory change."""
+    global _artifact_fingerprint, _artifacts_checked_at
+    now = time.monotonic()
+    if now - _artifacts_checked_at < ARTIFACT_CHECK_INTERVAL:
+        return
+    _artifacts_checked_at = now
+    fingerprint = model_registry.registry.fingerprint()
+    if fingerprint != _artifact_fingerprint:
+        if _artifact_fingerprint is not None:
+            logger.info("Model artifacts changed on disk; clearing prediction cache.")
+            prediction_cache.clear()
+        _artifact_fingerprint = fingerprint
+
+def _prediction_cache_key(features, user_input):
+    """
+    Build the cache key for one request.
+
+    The encoded vector determines the model outputs, and every numeric field
+    the recommendations read. The raw Gender and Sport_Type values are added
+    because the recommendation rules compare them before encoding, and the
+    athlete-history rule inputs because they are not model features. The
+    model version keeps a result computed just before a hot swap from being
+    served after it.
+
+    Returns:
+        tuple or None: Hashable key, or None if the request is not cacheable.
+    """
+    key = (model_registry.registry.version, features.tobytes(), user_input.get("Gender"),
+           user_input.get("Sport_Type"), tuple(user_input.get(field) for field in RULE_FIELDS))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+def _copy_result(result):
+    return dict(result, recommendations=list(result["recommendations"]))
+
+def _annotate(result, features, history, explain):
+    """Add the per-request parts that are never cached: athlete history and explanation."""
+    if history is not None:
+        result["history"] = history
+    if explain:
+        result["explanation"] = explain_features(features)[0]
+    return result
+
+def _store_history(result, record):
+    """Store the record of a successful prediction that returned athlete history."""
+    if "history" in result:
+        with instrumentation.stage("history"):
+            result["history"] = get_athlete_store().add(record)
+    return result
 
 def preprocess_data(data_dict):
     """
     Preprocess the input data consistently with CalibrateLikelihood.ipynb.
+
+    DataFrame view of ``features.encode_record``, the encoder used for serving.
     
     Args:
         data_dict (dict): Input dictionary containing athlete data.
@@ -40,88 +176,479 @@ def preprocess_data(data_dict):
         pd.DataFrame: Preprocessed features ready for prediction.
     """
     try:
-        df = pd.DataFrame([data_dict])
+        return pd.DataFrame(encode_record(data_dict), columns=FEATURES)
+    except Exception as e:
+        raise Exception(f"Error in preprocessing data: {str(e)}")
 
-        df["Gender"] = df["Gender"].map(gender_mapping).fillna(0).astype(int)
-        df["Sport_Type"] = df["Sport_Type"].map(sport_type_mapping).fillna(0).astype(int)
-        df["Experience_Level"] = df["Experience_Level"].map(experience_mapping).fillna(0).astype(int)
-        df["Previous_Injury_Type"] = df["Previous_Injury_Type"].fillna("None")
-        df["Previous_Injury_Type"] = df["Previous_Injury_Type"].map(injury_type_mapping).fillna(0).astype(int)
+def preprocess_batch(records, impute=False):
+    """
+    Preprocess many athlete records in a single pass.
 
-        df["Total_Weekly_Training_Hours"] = df["Total_Weekly_Training_Hours"].replace(0, 0.1)
+    Invalid records are skipped and reported instead of failing the batch.
 
-        df["Intensity_Ratio"] = df["High_Intensity_Training_Hours"] / df["Total_Weekly_Training_Hours"]
-        df["Recovery_Per_Training"] = df["Recovery_Time_Between_Sessions"] / df["Total_Weekly_Training_Hours"]
+    Args:
+        records (list): List of input dictionaries.
+        impute (bool): Fill missing or null fields from the imputation
+            statistics instead of rejecting the record.
 
-        features = [
-            "Age", "Gender", "Sport_Type", "Experience_Level", "Flexibility_Score",
-            "Total_Weekly_Training_Hours", "High_Intensity_Training_Hours", "Strength_Training_Frequency",
-            "Recovery_Time_Between_Sessions", "Training_Load_Score", "Sprint_Speed", "Endurance_Score",
-            "Agility_Score", "Fatigue_Level", "Previous_Injury_Count", "Previous_Injury_Type",
-            "Intensity_Ratio", "Recovery_Per_Training"
-        ]
+    Returns:
+        tuple: (np.ndarray of features for valid records, list of their
+        indices in ``records``, dict mapping invalid index to error message).
+    """
+    valid_idx = []
+    errors = {}
+    for i, record in enumerate(records):
+        error = validate_record(record, impute=impute)
+        if error:
+            errors[i] = error
+        else:
+            valid_idx.append(i)
 
-        missing_features = [f for f in features if f not in df.columns]
-        if missing_features:
-            raise ValueError(f"Missing required features: {missing_features}")
+    return encode_records([records[i] for i in valid_idx], impute=impute), valid_idx, errors
 
-        X = df[features]
-        return X
-    except Exception as e:
-        raise Exception(f"Error in preprocessing data: {str(e)}")
+def _on_model_swap(old, new):
+    # Cached responses and imputation medians belong to the previous version
+    prediction_cache.clear()
+    pipeline.reload_imputation_stats()
+
+model_registry.on_swap(_on_model_swap)
+
+def _ensemble_proba(features, registry=None):
+    """
+    Average the RandomForest and XGBoost class probabilities.
+
+    Args:
+        features (np.ndarray): Encoded features, one row per athlete.
+        registry (model_registry.ModelRegistry, optional): Model version to
+            use; the process-wide registry when omitted.
+
+    Returns:
+        np.ndarray: Ensemble probabilities (High, Low, Medium).
+    """
+    registry = registry or model_registry.registry
+    if INFERENCE_BACKEND == "compiled" and len(features) <= COMPILED_MAX_BATCH:
+        engine = tree_engine.get_engine(registry)
+        if engine is not None and engine.supports(features):
+            with instrumentation.stage("ensemble"):
+                return engine.predict_proba(features)
+
+    with instrumentation.stage("rf"), model_registry.unnamed_features():
+        rf_probs = registry.get("rf_model").predict_proba(features)
+    with instrumentation.stage("xgb"), model_registry.unnamed_features():
+        xgb_probs = registry.get("xgb_model").predict_proba(features)
+    return (rf_probs + xgb_probs) / 2
+
+def _score(features, registry=None, observe=True):
+    """
+    Run the ensemble and calibrator on preprocessed features.
+
+    Every artifact comes from one registry, taken once per call, so a model
+    version swapped in meanwhile never mixes into a running prediction.
+
+    Args:
+        features (np.ndarray): Encoded features, one row per athlete.
+        registry (model_registry.ModelRegistry, optional): Model version to
+            use; the process-wide registry when omitted.
+        observe (bool): Keep rows for the live canary and pass the outputs
+            to the shadow scorer, if one is running.
+
+    Returns:
+        tuple: (ensemble probabilities, predicted labels, calibrated likelihoods in percent).
+    """
+    registry = registry or model_registry.registry
+    _check_encoders(registry)
+    avg_probs = _ensemble_proba(features, registry)
 
-def predict_injury_risk(user_input: dict) -> dict:
+    predicted_labels = registry.get("rf_encoder").classes_[np.argmax(avg_probs, axis=1)]
+
+    # Columns are already in the calibrator's (prob_high, prob_low, prob_medium) order
+    with instrumentation.stage("calibrate"), model_registry.unnamed_features():
+        likelihoods = registry.get("calibrator").predict_proba(avg_probs)[:, 1] * 100
+
+    # Adjust prediction using dynamic threshold based on raw prob_low
+    override = (avg_probs[:, 1] > registry.get("low_threshold")) & (predicted_labels != "Low")
+    predicted_labels = np.where(override, "Low", predicted_labels)
+
+    if observe:
+        recent_rows.extend(features[:8].copy())
+        if shadow is not None:
+            shadow.submit(features, predicted_labels, likelihoods)
+    return avg_probs, predicted_labels, likelihoods
+
+def _score_rows(rows):
+    """
+    Batch function for the micro-batcher: score stacked single-row feature matrices.
+
+    Args:
+        rows (list): ``(1, n_features)`` arrays, one per caller.
+
+    Returns:
+        list: ``_score`` output for each caller, as ``(1, ...)`` slices.
+    """
+    avg_probs, predicted_labels, likelihoods = _score(np.vstack(rows))
+    return [(avg_probs[i:i + 1], predicted_labels[i:i + 1], likelihoods[i:i + 1]) for i in range(len(rows))]
+
+_batcher = None
+_batcher_pid = None
+_batcher_lock = threading.Lock()
+
+def get_batcher():
+    """
+    Return the process-wide micro-batcher, starting it on first use.
+
+    Created lazily (and again after a fork) because its worker thread does not
+    survive ``fork``.
+
+    Returns:
+        MicroBatcher: The batcher.
+    """
+    global _batcher, _batcher_pid
+    if _batcher is None or _batcher_pid != os.getpid():
+        with _batcher_lock:
+            if _batcher is None or _batcher_pid != os.getpid():
+                _batcher = MicroBatcher(_score_rows, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS,
+                                        max_queue=BATCH_MAX_QUEUE, name="predict_batcher")
+                _batcher_pid = os.getpid()
+    return _batcher
+
+def close_batcher(timeout=None):
+    """
+    Stop the micro-batcher after the predictions already queued have run.
+
+    Args:
+        timeout (float, optional): Seconds to wait for the queue to drain.
+    """
+    global _batcher
+    with _batcher_lock:
+        if _batcher is not None and _batcher_pid == os.getpid():
+            _batcher.close(timeout)
+        _batcher = None
+
+def batcher_stats():
+    """
+    Return micro-batching statistics.
+
+    Returns:
+        dict or None: Batcher statistics, or None if micro-batching is off or unused.
+    """
+    if not MICRO_BATCHING or _batcher is None or _batcher_pid != os.getpid():
+        return None
+    return _batcher.stats()
+
+def explain_features(features, registry=None):
+    """
+    Per-feature contributions to the averaged RF + XGBoost "High" probability.
+
+    Computed on the compiled tree engine whatever ``INFERENCE_BACKEND`` is
+    (see ``tree_engine.CompiledEnsemble.explain``); ``prediction`` matches the
+    libraries' probability to within ``tree_engine.PARITY_TOLERANCE``.
+
+    Args:
+        features (np.ndarray): Encoded features, one row per athlete.
+        registry (model_registry.ModelRegistry, optional): Model version to
+            explain; the process-wide registry when omitted.
+
+    Returns:
+        list: One ``{"target", "base_value", "prediction", "contributions"}``
+        dict per row, with contributions keyed by feature name.
+
+    Raises:
+        ValueError: If the models cannot be compiled or a row has missing values.
+    """
+    registry = registry or model_registry.registry
+    engine = tree_engine.get_engine(registry)
+    if engine is None:
+        raise ValueError("Explanations are unavailable: the models could not be compiled.")
+    if not engine.supports(features):
+        raise ValueError("Explanations are unavailable for records with missing values.")
+    target = int(np.flatnonzero(registry.get("rf_encoder").classes_ == EXPLAIN_CLASS)[0])
+    with instrumentation.stage("explain"):
+        base, contributions = engine.explain(features, target)
+    return [{
+        "target": EXPLAIN_CLASS,
+        "base_value": round(base, 6),
+        "prediction": round(base + float(row.sum()), 6),
+        "contributions": {name: round(float(value), 6) for name, value in zip(FEATURES, row)},
+    } for row in contributions]
+
+def predict_injury_risk(user_input: dict, explain: bool = False) -> dict:
     """
     Predict injury risk using the ensemble of RandomForest and XGBoost models with calibrated probabilities.
     Uses a data-driven threshold from calibration to classify Low vs. Medium risks.
     
     Args:
         user_input (dict): Input dictionary containing athlete data.
+        explain (bool): Add per-feature contributions to the "High" probability (see ``explain_features``).
     
     Returns:
-        dict: Prediction results including risk level, likelihood, and recommendations.
+        dict: Prediction results including risk level, likelihood, and recommendations;
+        with an ``Athlete_Id`` in the input, also the athlete's ``history`` aggregates.
+        The record is stored in the athlete history only if the prediction succeeds.
     """
-    print("User Input Received:\n", user_input)
-
     # Preprocess input
-    features = preprocess_data(user_input)
-    print("FINAL Features After Preprocessing:", list(features.columns))
-    print("Preprocessed Input:\n", features)
-
-    # Predict probabilities from both models
-    rf_probs = rf_model.predict_proba(features)
-    xgb_probs = xgb_model.predict_proba(features)
-    print("RandomForest Probabilities (High, Low, Medium):", rf_probs)
-    print("XGBoost Probabilities (High, Low, Medium):", xgb_probs)
-
-    # Ensemble average
-    avg_probs = (rf_probs + xgb_probs) / 2
-    predicted_class = np.argmax(avg_probs, axis=1)[0]
-    confidence = np.max(avg_probs, axis=1)[0]
-    predicted_label = rf_encoder.inverse_transform([predicted_class])[0]
-    print("Ensemble Probabilities (High, Low, Medium):", avg_probs)
-    print("Predicted Class:", predicted_class, "Label:", predicted_label, "Confidence:", confidence)
-
-    # Calibrate the probability using the likelihood calibrator
-    calib_data = pd.DataFrame({
-        "prob_high": [avg_probs[0][0]],
-        "prob_low": [avg_probs[0][1]],
-        "prob_medium": [avg_probs[0][2]]
-    })
-    injury_likelihood = calibrator.predict_proba(calib_data)[:, 1][0] * 100
-    print("Calibrated Injury Likelihood (%):", injury_likelihood)
+    with instrumentation.stage("preprocess"):
+        try:
+            features = encode_record(user_input)
+        except Exception as e:
+            raise Exception(f"Error in preprocessing data: {str(e)}")
 
-    # Adjust prediction using dynamic threshold based on raw prob_low
-    if avg_probs[0][1] > low_threshold and predicted_label != "Low":
-        print(f"⚠️ Calibration adjustment: Low probability ({avg_probs[0][1]:.2f}) above threshold ({low_threshold:.2f}) — classifying as Low.")
-        predicted_label = "Low"
+    # Aggregates including this record; it is stored once the prediction succeeded
+    record, history = user_input, None
+    store = get_athlete_store()
+    if store is not None and athlete_key(user_input) is not None:
+        with instrumentation.stage("history"):
+            history = store.preview([record])[0]
+        user_input = dict(user_input, **rule_fields(history))
+
+    cache_key = None
+    if PREDICTION_CACHE_SIZE > 0:
+        _invalidate_on_artifact_change()
+        cache_key = _prediction_cache_key(features, user_input)
+        if cache_key is not None:
+            cached = prediction_cache.get(cache_key)
+            if cached is not MISSING:
+                instrumentation.count("prediction_cache_hits")
+                return _store_history(_annotate(_copy_result(cached), features, history, explain), record)
+            instrumentation.count("prediction_cache_misses")
+
+    if MICRO_BATCHING:
+        avg_probs, predicted_labels, likelihoods = get_batcher()(features, timeout=BATCH_TIMEOUT)
+    else:
+        avg_probs, predicted_labels, likelihoods = _score(features)
+    predicted_label = predicted_labels[0]
+    injury_likelihood = likelihoods[0]
+    confidence = avg_probs[0].max()
 
     # Generate recommendations
-    recommendations = generate_recommendations(user_input)
+    with instrumentation.stage("recommend"):
+        recommendations = generate_recommendations(user_input)
 
-    return {
+    if instrumentation.should_log_payload():
+        instrumentation.log_payload(
+            "predict",
+            input=user_input,
+            features=features[0].tolist(),
+            probabilities=dict(zip(model_registry.get("rf_encoder").classes_.tolist(), avg_probs[0].tolist())),
+            predicted_risk_level=predicted_label,
+            injury_likelihood_percent=injury_likelihood,
+        )
+
+    result = {
         "predicted_risk_level": predicted_label,
         "injury_likelihood_percent": round(injury_likelihood, 2),
         "model_class_probability": round(confidence * 100, 2),
         "recommendations": recommendations
-    }
\ No newline at end of file
+    }
+    if cache_key is not None:
+        prediction_cache.set(cache_key, _copy_result(result))
+    return _store_history(_annotate(result, features, history, explain), record)
+
+def _drop_failed(valid_idx, errors, *arrays):
+    """
+    Remove the rows whose record has an error since the arrays were built.
+
+    Args:
+        valid_idx (list): Record index of each array row.
+        errors (dict): Record index -> error message.
+        *arrays (np.ndarray): Row-aligned arrays.
+
+    Returns:
+        tuple: (remaining record indices, tuple of the subset arrays).
+    """
+    keep = [row for row, i in enumerate(valid_idx) if i not in errors]
+    if len(keep) == len(valid_idx):
+        return valid_idx, arrays
+    return [valid_idx[row] for row in keep], tuple(a[keep] for a in arrays)
+
+def predict_injury_risk_batch(records: list, impute: bool = False, explain: bool = False, history: bool = True) -> dict:
+    """
+    Predict injury risk for many athletes with one pass through the pipeline.
+
+    Records that fail validation or scoring are reported in ``errors`` and
+    leave a ``None`` in ``results`` at their position; the rest of the batch
+    is still scored. Records with an ``Athlete_Id`` get their ``history``
+    aggregates and are added to the athlete store, in input order, once the
+    rest of their row succeeded; records reported in ``errors`` are not stored.
+
+    Args:
+        records (list): List of input dictionaries containing athlete data.
+        impute (bool): Fill missing or null fields instead of rejecting the record.
+        explain (bool): Add per-feature contributions to each result (see ``explain_features``).
+        history (bool): Read and update the athlete store (see ``get_athlete_store``);
+            False scores every record without it.
+
+    Returns:
+        dict: ``results`` aligned with ``records`` and ``errors`` as a list of
+        ``{"index", "error"}`` entries.
+    """
+    if not isinstance(records, list):
+        raise ValueError("Batch input must be a list of records.")
+    if len(records) > MAX_BATCH_SIZE:
+        raise ValueError(f"Batch size {len(records)} exceeds the limit of {MAX_BATCH_SIZE}.")
+
+    results = [None] * len(records)
+    with instrumentation.stage("preprocess"):
+        features, valid_idx, errors = preprocess_batch(records, impute=impute)
+
+    if valid_idx:
+        try:
+            avg_probs, predicted_labels, likelihoods = _score(features)
+        except Exception as e:
+            for i in valid_idx:
+                errors[i] = f"Error in scoring data: {str(e)}"
+            valid_idx = []
+
+    histories = {}
+    store = get_athlete_store() if history else None
+    if store is not None and valid_idx:
+        tracked = []
+        for i in valid_idx:
+            try:
+                if athlete_key(records[i]) is not None:
+                    parse_day(records[i].get(DATE_FIELD))
+                    tracked.append(i)
+            except ValueError as e:
+                errors[i] = str(e)
+        if tracked:
+            try:
+                with instrumentation.stage("history"):
+                    histories = dict(zip(tracked, store.preview([records[i] for i in tracked])))
+            except Exception as e:
+                for i in tracked:
+                    errors[i] = f"Error recording athlete history: {str(e)}"
+        valid_idx, (features, avg_probs, predicted_labels, likelihoods) = _drop_failed(
+            valid_idx, errors, features, avg_probs, predicted_labels, likelihoods)
+
+    explanations = None
+    if explain and valid_idx:
+        # Rows with missing values cannot be explained; the others still are
+        explainable = np.isfinite(features).all(axis=1)
+        for row in np.flatnonzero(~explainable):
+            errors[valid_idx[row]] = "Explanations are unavailable for records with missing values."
+        rows = np.flatnonzero(explainable)
+        try:
+            explained = explain_features(features[rows]) if len(rows) else []
+        except Exception as e:
+            for row in rows:
+                errors[valid_idx[row]] = f"Error explaining prediction: {str(e)}"
+            explained = []
+        explanations = np.empty(len(valid_idx), dtype=object)
+        for row, explanation in zip(rows, explained):
+            explanations[row] = explanation
+        valid_idx, (features, avg_probs, predicted_labels, likelihoods, explanations) = _drop_failed(
+            valid_idx, errors, features, avg_probs, predicted_labels, likelihoods, explanations)
+
+    with instrumentation.stage("recommend"):
+        try:
+            batch_recommendations = generate_recommendations_batch(
+                [dict(records[i], **rule_fields(histories[i])) if i in histories else records[i] for i in valid_idx])
+        except Exception as e:
+            for i in valid_idx:
+                errors[i] = f"Error generating recommendations: {str(e)}"
+            valid_idx = []
+        for row, i in enumerate(valid_idx):
+            results[i] = {
+                "predicted_risk_level": predicted_labels[row],
+                "injury_likelihood_percent": round(likelihoods[row], 2),
+                "model_class_probability": round(avg_probs[row].max() * 100, 2),
+                "recommendations": batch_recommendations[row]
+            }
+            if i in histories:
+                results[i]["history"] = histories[i]
+            if explanations is not None:
+                results[i]["explanation"] = explanations[row]
+
+    # Only the records of rows that succeeded are stored
+    stored = [i for i in valid_idx if i in histories]
+    if stored:
+        try:
+            with instrumentation.stage("history"):
+                for i, summary in zip(stored, store.add_many([records[i] for i in stored])):
+                    results[i]["history"] = summary
+        except Exception as e:
+            for i in stored:
+                errors[i] = f"Error recording athlete history: {str(e)}"
+                results[i] = None
+
+    return {
+        "results": results,
+        "errors": [{"index": i, "error": errors[i]} for i in sorted(errors)]
+    }
+
+def _sweep_values(field, sweep):
+    """
+    Expand one grid axis into its list of values.
+
+    Args:
+        field (str): Input field being swept.
+        sweep: List of values, or ``{"start", "stop", "steps"}`` for evenly
+            spaced numeric values (rounded and de-duplicated for integer fields).
+
+    Returns:
+        list: Values for the axis.
+    """
+    if isinstance(sweep, dict):
+        try:
+            start, stop, steps = float(sweep["start"]), float(sweep["stop"]), int(sweep.get("steps", 10))
+        except (KeyError, TypeError, ValueError, OverflowError):
+            raise ValueError(f"Sweep for {field} needs numeric 'start', 'stop' and optional 'steps'.")
+        # Bounded before linspace allocates anything
+        if not 1 <= steps <= MAX_BATCH_SIZE:
+            raise ValueError(f"Sweep for {field} needs 1 to {MAX_BATCH_SIZE} steps, got {steps}.")
+        values = np.linspace(start, stop, steps)
+        if SCHEMA.get(field, {}).get("dtype") == "int":
+            return [int(v) for v in dict.fromkeys(np.round(values).astype(int))]
+        return values.tolist()
+    if not isinstance(sweep, list) or not sweep:
+        raise ValueError(f"Sweep for {field} must be a non-empty list of values or a start/stop/steps object.")
+    return sweep
+
+def predict_sensitivity(user_input: dict, grid: dict) -> dict:
+    """
+    Score one athlete over a grid of what-if perturbations in a single batch.
+
+    The athlete is encoded once; each grid point only re-encodes the swept
+    columns and the ratios derived from them, and the whole grid (plus the
+    unchanged athlete) goes through the ensemble and calibrator together.
+
+    Args:
+        user_input (dict): Input dictionary containing athlete data.
+        grid (dict): Field -> values to sweep (see ``_sweep_values``), e.g.
+            ``{"Fatigue_Level": [3, 5, 7], "Recovery_Time_Between_Sessions": {"start": 6, "stop": 48, "steps": 8}}``.
+
+    Returns:
+        dict: ``baseline`` prediction, ``axes`` (feature and values), ``shape``
+        and, as nested lists of that shape, ``predicted_risk_level``,
+        ``injury_likelihood_percent`` and ``model_class_probability``.
+    """
+    if not isinstance(grid, dict) or not grid:
+        raise ValueError("Grid must be an object mapping features to the values to sweep.")
+    axes = [(field, _sweep_values(field, sweep)) for field, sweep in grid.items()]
+    shape = [len(values) for _, values in axes]
+    points = math.prod(shape)
+    if points > MAX_BATCH_SIZE:
+        raise ValueError(f"Grid of {points} points exceeds the limit of {MAX_BATCH_SIZE}.")
+
+    with instrumentation.stage("preprocess"):
+        try:
+            base = encode_record(user_input)
+        except Exception as e:
+            raise Exception(f"Error in preprocessing data: {str(e)}")
+        features = np.vstack([base, encode_grid(base, axes)])
+
+    avg_probs, predicted_labels, likelihoods = _score(features)
+    likelihoods = np.round(likelihoods, 2)
+    confidence = np.round(avg_probs.max(axis=1) * 100, 2)
+
+    return {
+        "baseline": {
+            "predicted_risk_level": predicted_labels[0],
+            "injury_likelihood_percent": likelihoods[0],
+            "model_class_probability": confidence[0],
+        },
+        "axes": [{"feature": field, "values": values} for field, values in axes],
+        "shape": shape,
+        "predicted_risk_level": predicted_labels[1:].reshape(shape).tolist(),
+        "injury_likelihood_percent": likelihoods[1:].reshape(shape).tolist(),
+        "model_class_probability": confidence[1:].reshape(shape).tolist(),
+    }
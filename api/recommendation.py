@@ -3,200 +3,358 @@
 Generates evidence-based, personalized injury prevention recommendations for athletes.
 Aligned with the injury prediction model and integrated with the frontend.
 Recommendations include actionable advice, priorities, detailed explanations, and credible sources.
+
+Recommendations are declared as a rule table (``RULES``). Each rule names the
+input field(s) it tests, a comparator and threshold, a priority formula, and
+its text. The same table is evaluated either for one athlete with plain Python
+comparisons or for a whole roster at once with NumPy masks.
 """
 
 from typing import List, Dict, Any
+import operator
 import uuid
 
-def generate_recommendations(user_input: Dict[str, Any]) -> List[str]:
+import numpy as np
+
+# Output order of categories (recommendations are flattened in this order)
+CATEGORIES = [
+    "Recovery Strategies",
+    "Training Adjustments",
+    "Injury Prevention",
+    "Nutrition",
+    "Mental Health",
+    "Sport-Specific Warm-Ups"
+]
+
+# Values assumed for fields missing from the input
+DEFAULTS = {
+    "Fatigue_Level": 5,
+    "Recovery_Time_Between_Sessions": 12,
+    "Total_Weekly_Training_Hours": 1,
+    "High_Intensity_Training_Hours": 0,
+    "Previous_Injury_Count": 0,
+    "Flexibility_Score": 5,
+    "Agility_Score": 5,
+    "Strength_Training_Frequency": 0,
+    "Sport_Type": 0,
+    "Age": 30,
+    "Gender": 0,
+    # Athlete history (athlete_store.rule_fields); neutral when there is none
+    "Acute_Chronic_Workload_Ratio": 1.0,
+    "Fatigue_Trend": 0.0,
+}
+
+# Derived quantities: name -> (function of the input fields, works on scalars and arrays)
+DERIVED = {
+    "Intensity_Ratio": lambda f: f["High_Intensity_Training_Hours"] / _maximum(f["Total_Weekly_Training_Hours"], 1),
+    "Recovery_Deficit": lambda f: 8 - f["Recovery_Time_Between_Sessions"],
+    "Flexibility_Deficit": lambda f: 5 - f["Flexibility_Score"],
+    "Agility_Deficit": lambda f: 5 - f["Agility_Score"],
+    "Strength_Deficit": lambda f: 2 - f["Strength_Training_Frequency"],
+    "Nutrition_Need": lambda f: _maximum(f["Fatigue_Level"], 12 - f["Recovery_Time_Between_Sessions"]),
+    "Years_Over_40": lambda f: f["Age"] - 40,
+}
+
+COMPARATORS = {
+    ">=": (operator.ge, np.greater_equal),
+    ">": (operator.gt, np.greater),
+    "<": (operator.lt, np.less),
+    "<=": (operator.le, np.less_equal),
+    "==": (operator.eq, np.equal),
+}
+
+# Each rule: category, conditions ("when", combined with "match": "all"/"any"),
+# priority as (field, threshold, weight) -> clip(value / threshold * weight, 0, 1)
+# or a constant, and the recommendation text, details and source.
+RULES = [
+    # Fatigue Management
+    {
+        "category": "Recovery Strategies",
+        "when": [("Fatigue_Level", ">=", 8)],
+        "priority": ("Fatigue_Level", 10, 0.9),
+        "text": "High fatigue detected. Prioritize 48–72 hours of active recovery with hydration and 8+ hours of sleep nightly.",
+        "details": "Incorporate light stretching and 2–3L of water daily. Monitor sleep quality with a tracker for optimal recovery.",
+        "source": "https://www.mayoclinic.org/healthy-lifestyle/fitness/in-depth/recovery/art-20057777",
+    },
+    {
+        "category": "Recovery Strategies",
+        "when": [("Fatigue_Level", ">=", 6), ("Fatigue_Level", "<", 8)],
+        "priority": ("Fatigue_Level", 10, 0.7),
+        "text": "Elevated fatigue: Reduce high-intensity sessions by 20% this week and monitor soreness.",
+        "details": "Use foam rolling for 10–15 minutes post-session to alleviate muscle tension and promote circulation.",
+        "source": "https://www.nsca.com/education/articles/recovery-techniques-for-athletes/",
+    },
+    # Fatigue Trend (athlete history)
+    {
+        "category": "Recovery Strategies",
+        "when": [("Fatigue_Trend", ">=", 1)],
+        "priority": ("Fatigue_Trend", 2, 0.7),
+        "text": "Fatigue has been rising over the past 4 weeks. Plan a lighter recovery week before it builds further.",
+        "details": "Cut session volume by 30–40% for one week while keeping some intensity, and track fatigue and sleep daily until the trend levels off.",
+        "source": "https://pubmed.ncbi.nlm.nih.gov/25200666/",
+    },
+    # Recovery Time Optimization
+    {
+        "category": "Recovery Strategies",
+        "when": [("Recovery_Time_Between_Sessions", "<", 8)],
+        "priority": ("Recovery_Deficit", 8, 0.8),
+        "text": "Insufficient recovery time. Increase rest to 12–24 hours between sessions.",
+        "details": "Schedule sessions to allow muscle repair, especially after high-intensity workouts, to reduce injury risk.",
+        "source": "https://pubmed.ncbi.nlm.nih.gov/28933711/",
+    },
+    # Intensity Ratio Check
+    {
+        "category": "Training Adjustments",
+        "when": [("Intensity_Ratio", ">", 0.7)],
+        "priority": ("Intensity_Ratio", 1, 0.75),
+        "text": "High-intensity training exceeds 70%. Shift to 60% low-intensity/technical work.",
+        "details": "Incorporate drills focusing on technique or endurance to balance training load and prevent overtraining.",
+        "source": "https://www.acsm.org/docs/default-source/files-for-resource-library/overtraining.pdf",
+    },
+    # Acute:Chronic Workload Ratio (athlete history)
+    {
+        "category": "Training Adjustments",
+        "when": [("Acute_Chronic_Workload_Ratio", ">", 1.5)],
+        "priority": ("Acute_Chronic_Workload_Ratio", 1.5, 0.8),
+        "text": "Training load spike: this week's load is more than 1.5x your 4-week average. Hold next week at or below that average.",
+        "details": "Sharp rises in acute load relative to chronic load are linked to higher injury risk. Build weekly load by no more than about 10%.",
+        "source": "https://bjsm.bmj.com/content/50/5/273",
+    },
+    {
+        "category": "Training Adjustments",
+        "when": [("Acute_Chronic_Workload_Ratio", "<", 0.8)],
+        "priority": 0.5,
+        "text": "Training load has dropped well below your 4-week average. Rebuild gradually instead of returning straight to full load.",
+        "details": "A low acute:chronic ratio leaves the athlete underprepared for a sudden return to high load; ramp up over 2–3 weeks.",
+        "source": "https://bjsm.bmj.com/content/50/5/273",
+    },
+    # Agility
+    {
+        "category": "Training Adjustments",
+        "when": [("Agility_Score", "<", 5)],
+        "priority": ("Agility_Deficit", 5, 0.6),
+        "text": "Improve agility with cone drills and ladder exercises twice weekly.",
+        "details": "Perform 3 sets of 10 reps for drills like lateral shuffles or T-drills to enhance quickness and coordination.",
+        "source": "https://www.nsca.com/education/articles/agility-and-quickness-training/",
+    },
+    # Strength Training Frequency
+    {
+        "category": "Training Adjustments",
+        "when": [("Strength_Training_Frequency", "<", 2)],
+        "priority": ("Strength_Deficit", 2, 0.7),
+        "text": "Increase strength training to 2–3 sessions/week for joint stability.",
+        "details": "Include compound lifts like squats and deadlifts with moderate weights to build resilience.",
+        "source": "https://www.acsm.org/docs/default-source/files-for-resource-library/strength-training.pdf",
+    },
+    # Previous Injury Consideration
+    {
+        "category": "Injury Prevention",
+        "when": [("Previous_Injury_Count", ">=", 2)],
+        "priority": ("Previous_Injury_Count", 5, 0.85),
+        "text": "Multiple injuries noted. Add daily mobility and strength balance exercises.",
+        "details": "Perform exercises like single-leg squats and hip bridges for 15 minutes daily to enhance joint stability.",
+        "source": "https://www.physio-pedia.com/Injury_Prevention_in_Sports",
+    },
+    # Flexibility
+    {
+        "category": "Injury Prevention",
+        "when": [("Flexibility_Score", "<", 5)],
+        "priority": ("Flexibility_Deficit", 5, 0.65),
+        "text": "Low flexibility. Include 10–15 minutes of dynamic warm-ups and static stretching daily.",
+        "details": "Focus on hamstrings, hip flexors, and shoulders with stretches like lunges and arm circles to improve range of motion.",
+        "source": "https://www.mayoclinic.org/healthy-lifestyle/fitness/in-depth/stretching/art-20047931",
+    },
+    # Age-Based Recommendations
+    {
+        "category": "Injury Prevention",
+        "when": [("Age", ">", 40)],
+        "priority": ("Years_Over_40", 40, 0.6),
+        "text": "Age over 40: Add low-impact cross-training (e.g., swimming, yoga) twice weekly.",
+        "details": "Low-impact activities reduce joint stress while maintaining fitness.",
+        "source": "https://www.arthritis.org/health-wellness/healthy-living/physical-activity/other-activities/low-impact-exercises",
+    },
+    # Gender-Specific Recommendations
+    {
+        "category": "Injury Prevention",
+        "when": [("Gender", "==", 1)],  # Female
+        "priority": 0.65,
+        "text": "Female athletes: Include pelvic floor exercises 3 times/week to support core stability.",
+        "details": "Exercises like Kegels strengthen the pelvic floor, reducing injury risk during high-impact activities.",
+        "source": "https://www.womenshealthmag.com/fitness/a20709126/pelvic-floor-exercises/",
+    },
+    # Nutrition for Recovery
+    {
+        "category": "Nutrition",
+        "when": [("Fatigue_Level", ">=", 6), ("Recovery_Time_Between_Sessions", "<", 12)],
+        "match": "any",
+        "priority": ("Nutrition_Need", 10, 0.6),
+        "text": "Optimize nutrition with 1.2–2.0g/kg body weight protein daily for recovery.",
+        "details": "Consume protein-rich meals within 2 hours post-workout (e.g., chicken, eggs, or whey) to support muscle repair.",
+        "source": "https://jissn.biomedcentral.com/articles/10.1186/s12970-017-0177-8",
+    },
+    # Mental Health
+    {
+        "category": "Mental Health",
+        "when": [("Fatigue_Level", ">=", 7)],
+        "priority": ("Fatigue_Level", 10, 0.55),
+        "text": "Address mental fatigue with 10–15 minutes of mindfulness or meditation daily.",
+        "details": "Use guided meditation apps or breathing exercises to reduce stress and improve focus.",
+        "source": "https://www.mayoclinic.org/tests-procedures/meditation/in-depth/meditation/art-20045858",
+    },
+    # Sport-Specific Warm-Ups
+    {
+        "category": "Sport-Specific Warm-Ups",
+        "when": [("Sport_Type", "==", 0)],  # Football
+        "priority": 0.6,
+        "text": "Football: Perform dynamic warm-ups with high-knee sprints and lateral cuts for 10 minutes.",
+        "details": "Focus on explosive movements to prepare for sprinting and tackling demands.",
+        "source": "https://www.nsca.com/education/articles/warm-ups-for-soccer/",
+    },
+    {
+        "category": "Sport-Specific Warm-Ups",
+        "when": [("Sport_Type", "==", 3)],  # Running
+        "priority": 0.6,
+        "text": "Running: Include 10-minute warm-ups with leg swings and walking lunges.",
+        "details": "Emphasize hip mobility and gradual pace increases to prevent shin splints and strains.",
+        "source": "https://www.runnersworld.com/training/a20787998/dynamic-warmup/",
+    },
+]
+
+# Rules in output order (by category, then table order)
+RULES = sorted(RULES, key=lambda rule: CATEGORIES.index(rule["category"]))
+RULE_TEXTS = [rule["text"] for rule in RULES]
+
+def _maximum(a, b):
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.maximum(a, b)
+    return max(a, b)
+
+def calculate_priority(factor_value: float, threshold: float, weight: float) -> float:
+    return min(1.0, max(0.0, (factor_value / threshold) * weight))
+
+def _rich(rule: Dict[str, Any], priority: float) -> Dict[str, Any]:
+    return {
+        "id": str(uuid.uuid4()),
+        "text": rule["text"],
+        "priority": priority,
+        "details": rule["details"],
+        "source": rule["source"],
+        "category": rule["category"]
+    }
+
+def generate_recommendations(user_input: Dict[str, Any], rich: bool = False) -> List[Any]:
     """
     Generate professional, targeted injury prevention strategies.
 
     Args:
         user_input: Dictionary with fields like Age, Gender, Fatigue_Level, etc.
+        rich: Return full recommendation dicts (id, text, priority, details,
+            source, category) instead of just the text.
 
     Returns:
-        List of recommendation strings (simplified for compatibility with existing frontend).
+        List of recommendation strings (simplified for compatibility with existing frontend),
+        or of recommendation dicts when ``rich`` is set.
     """
-    # Internal structure for recommendations with categories
-    internal_recs = {
-        "Recovery Strategies": [],
-        "Training Adjustments": [],
-        "Injury Prevention": [],
-        "Nutrition": [],
-        "Mental Health": [],
-        "Sport-Specific Warm-Ups": []
-    }
+    fields = {name: user_input.get(name, default) for name, default in DEFAULTS.items()}
+    derived = {}
 
-    # Helper function to calculate priority
-    def calculate_priority(factor_value: float, threshold: float, weight: float) -> float:
-        return min(1.0, max(0.0, (factor_value / threshold) * weight))
+    def value(name):
+        if name in fields:
+            return fields[name]
+        if name not in derived:
+            derived[name] = DERIVED[name](fields)
+        return derived[name]
 
-    # Fatigue Management
-    fatigue = user_input.get("Fatigue_Level", 5)
-    if fatigue >= 8:
-        internal_recs["Recovery Strategies"].append({
-            "id": str(uuid.uuid4()),
-            "text": "High fatigue detected. Prioritize 48–72 hours of active recovery with hydration and 8+ hours of sleep nightly.",
-            "priority": calculate_priority(fatigue, 10, 0.9),
-            "details": "Incorporate light stretching and 2–3L of water daily. Monitor sleep quality with a tracker for optimal recovery.",
-            "source": "https://www.mayoclinic.org/healthy-lifestyle/fitness/in-depth/recovery/art-20057777",
-            "category": "Recovery Strategies"
-        })
-    elif fatigue >= 6:
-        internal_recs["Recovery Strategies"].append({
-            "id": str(uuid.uuid4()),
-            "text": "Elevated fatigue: Reduce high-intensity sessions by 20% this week and monitor soreness.",
-            "priority": calculate_priority(fatigue, 10, 0.7),
-            "details": "Use foam rolling for 10–15 minutes post-session to alleviate muscle tension and promote circulation.",
-            "source": "https://www.nsca.com/education/articles/recovery-techniques-for-athletes/",
-            "category": "Recovery Strategies"
-        })
+    recommendations = []
+    for rule in RULES:
+        checks = (COMPARATORS[op][0](value(field), threshold) for field, op, threshold in rule["when"])
+        if not (any(checks) if rule.get("match") == "any" else all(checks)):
+            continue
+        if not rich:
+            recommendations.append(rule["text"])
+            continue
+        priority = rule["priority"]
+        if isinstance(priority, tuple):
+            factor, threshold, weight = priority
+            priority = calculate_priority(value(factor), threshold, weight)
+        recommendations.append(_rich(rule, priority))
+    return recommendations
 
-    # Recovery Time Optimization
-    recovery = user_input.get("Recovery_Time_Between_Sessions", 12)
-    if recovery < 8:
-        internal_recs["Recovery Strategies"].append({
-            "id": str(uuid.uuid4()),
-            "text": "Insufficient recovery time. Increase rest to 12–24 hours between sessions.",
-            "priority": calculate_priority(8 - recovery, 8, 0.8),
-            "details": "Schedule sessions to allow muscle repair, especially after high-intensity workouts, to reduce injury risk.",
-            "source": "https://pubmed.ncbi.nlm.nih.gov/28933711/",
-            "category": "Recovery Strategies"
-        })
+def _numeric_column(values: List[Any]) -> np.ndarray:
+    column = np.array(values)
+    if column.dtype.kind in "biuf":
+        return column.astype(np.float64)
+    # Non-numeric values (e.g. "Female") never satisfy a numeric comparison
+    return np.array([v if isinstance(v, (int, float, np.number)) else np.nan for v in values], dtype=np.float64)
 
-    # Intensity Ratio Check
-    total_hours = max(user_input.get("Total_Weekly_Training_Hours", 1), 1)
-    hi_hours = user_input.get("High_Intensity_Training_Hours", 0)
-    intensity_ratio = hi_hours / total_hours
-    if intensity_ratio > 0.7:
-        internal_recs["Training Adjustments"].append({
-            "id": str(uuid.uuid4()),
-            "text": "High-intensity training exceeds 70%. Shift to 60% low-intensity/technical work.",
-            "priority": calculate_priority(intensity_ratio, 1, 0.75),
-            "details": "Incorporate drills focusing on technique or endurance to balance training load and prevent overtraining.",
-            "source": "https://www.acsm.org/docs/default-source/files-for-resource-library/overtraining.pdf",
-            "category": "Training Adjustments"
-        })
+def _evaluate(columns):
+    n = len(next(iter(columns.values()))) if columns else 0
+    fields = {name: np.asarray(columns[name], dtype=np.float64) if name in columns else np.full(n, float(default))
+              for name, default in DEFAULTS.items()}
+    derived = {}
 
-    # Previous Injury Consideration
-    injury_count = user_input.get("Previous_Injury_Count", 0)
-    if injury_count >= 2:
-        internal_recs["Injury Prevention"].append({
-            "id": str(uuid.uuid4()),
-            "text": "Multiple injuries noted. Add daily mobility and strength balance exercises.",
-            "priority": calculate_priority(injury_count, 5, 0.85),
-            "details": "Perform exercises like single-leg squats and hip bridges for 15 minutes daily to enhance joint stability.",
-            "source": "https://www.physio-pedia.com/Injury_Prevention_in_Sports",
-            "category": "Injury Prevention"
-        })
-
-    # Flexibility and Agility
-    flexibility = user_input.get("Flexibility_Score", 5)
-    if flexibility < 5:
-        internal_recs["Injury Prevention"].append({
-            "id": str(uuid.uuid4()),
-            "text": "Low flexibility. Include 10–15 minutes of dynamic warm-ups and static stretching daily.",
-            "priority": calculate_priority(5 - flexibility, 5, 0.65),
-            "details": "Focus on hamstrings, hip flexors, and shoulders with stretches like lunges and arm circles to improve range of motion.",
-            "source": "https://www.mayoclinic.org/healthy-lifestyle/fitness/in-depth/stretching/art-20047931",
-            "category": "Injury Prevention"
-        })
-
-    agility = user_input.get("Agility_Score", 5)
-    if agility < 5:
-        internal_recs["Training Adjustments"].append({
-            "id": str(uuid.uuid4()),
-            "text": "Improve agility with cone drills and ladder exercises twice weekly.",
-            "priority": calculate_priority(5 - agility, 5, 0.6),
-            "details": "Perform 3 sets of 10 reps for drills like lateral shuffles or T-drills to enhance quickness and coordination.",
-            "source": "https://www.nsca.com/education/articles/agility-and-quickness-training/",
-            "category": "Training Adjustments"
-        })
+    def value(name):
+        if name in fields:
+            return fields[name]
+        if name not in derived:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                derived[name] = DERIVED[name](fields)
+        return derived[name]
 
-    # Strength Training Frequency
-    strength_freq = user_input.get("Strength_Training_Frequency", 0)
-    if strength_freq < 2:
-        internal_recs["Training Adjustments"].append({
-            "id": str(uuid.uuid4()),
-            "text": "Increase strength training to 2–3 sessions/week for joint stability.",
-            "priority": calculate_priority(2 - strength_freq, 2, 0.7),
-            "details": "Include compound lifts like squats and deadlifts with moderate weights to build resilience.",
-            "source": "https://www.acsm.org/docs/default-source/files-for-resource-library/strength-training.pdf",
-            "category": "Training Adjustments"
-        })
+    mask = np.empty((len(RULES), n), dtype=bool)
+    with np.errstate(invalid="ignore"):
+        for i, rule in enumerate(RULES):
+            checks = [COMPARATORS[op][1](value(field), threshold) for field, op, threshold in rule["when"]]
+            mask[i] = np.logical_or.reduce(checks) if rule.get("match") == "any" else np.logical_and.reduce(checks)
+    return mask, value
 
-    # Nutrition for Recovery
-    if fatigue >= 6 or recovery < 12:
-        internal_recs["Nutrition"].append({
-            "id": str(uuid.uuid4()),
-            "text": "Optimize nutrition with 1.2–2.0g/kg body weight protein daily for recovery.",
-            "priority": calculate_priority(max(fatigue, 12 - recovery), 10, 0.6),
-            "details": "Consume protein-rich meals within 2 hours post-workout (e.g., chicken, eggs, or whey) to support muscle repair.",
-            "source": "https://jissn.biomedcentral.com/articles/10.1186/s12970-017-0177-8",
-            "category": "Nutrition"
-        })
+def evaluate_rules(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Evaluate every rule against a batch of athletes.
 
-    # Mental Health
-    if fatigue >= 7:
-        internal_recs["Mental Health"].append({
-            "id": str(uuid.uuid4()),
-            "text": "Address mental fatigue with 10–15 minutes of mindfulness or meditation daily.",
-            "priority": calculate_priority(fatigue, 10, 0.55),
-            "details": "Use guided meditation apps or breathing exercises to reduce stress and improve focus.",
-            "source": "https://www.mayoclinic.org/tests-procedures/meditation/in-depth/meditation/art-20045858",
-            "category": "Mental Health"
-        })
+    Args:
+        columns: Field name -> float array (one value per athlete). Missing
+            fields take their ``DEFAULTS`` value.
 
-    # Sport-Specific Warm-Ups
-    sport_type = user_input.get("Sport_Type", 0)
-    if sport_type == 0:  # Football
-        internal_recs["Sport-Specific Warm-Ups"].append({
-            "id": str(uuid.uuid4()),
-            "text": "Football: Perform dynamic warm-ups with high-knee sprints and lateral cuts for 10 minutes.",
-            "priority": 0.6,
-            "details": "Focus on explosive movements to prepare for sprinting and tackling demands.",
-            "source": "https://www.nsca.com/education/articles/warm-ups-for-soccer/",
-            "category": "Sport-Specific Warm-Ups"
-        })
-    elif sport_type == 3:  # Running
-        internal_recs["Sport-Specific Warm-Ups"].append({
-            "id": str(uuid.uuid4()),
-            "text": "Running: Include 10-minute warm-ups with leg swings and walking lunges.",
-            "priority": 0.6,
-            "details": "Emphasize hip mobility and gradual pace increases to prevent shin splints and strains.",
-            "source": "https://www.runnersworld.com/training/a20787998/dynamic-warmup/",
-            "category": "Sport-Specific Warm-Ups"
-        })
+    Returns:
+        np.ndarray: Boolean mask of shape ``(len(RULES), n_athletes)``.
+    """
+    return _evaluate(columns)[0]
 
-    # Age-Based Recommendations
-    age = user_input.get("Age", 30)
-    if age > 40:
-        internal_recs["Injury Prevention"].append({
-            "id": str(uuid.uuid4()),
-            "text": "Age over 40: Add low-impact cross-training (e.g., swimming, yoga) twice weekly.",
-            "priority": calculate_priority(age - 40, 40, 0.6),
-            "details": "Low-impact activities reduce joint stress while maintaining fitness.",
-            "source": "https://www.arthritis.org/health-wellness/healthy-living/physical-activity/other-activities/low-impact-exercises",
-            "category": "Injury Prevention"
-        })
+def generate_recommendations_batch(records: List[Dict[str, Any]], rich: bool = False) -> List[List[Any]]:
+    """
+    Generate recommendations for many athletes at once.
 
-    # Gender-Specific Recommendations
-    gender = user_input.get("Gender", 0)
-    if gender == 1:  # Female
-        internal_recs["Injury Prevention"].append({
-            "id": str(uuid.uuid4()),
-            "text": "Female athletes: Include pelvic floor exercises 3 times/week to support core stability.",
-            "priority": 0.65,
-            "details": "Exercises like Kegels strengthen the pelvic floor, reducing injury risk during high-impact activities.",
-            "source": "https://www.womenshealthmag.com/fitness/a20709126/pelvic-floor-exercises/",
-            "category": "Injury Prevention"
-        })
-
-    # Flatten recommendations for compatibility with existing frontend
-    flat_recommendations = []
-    for category in internal_recs:
-        for rec in internal_recs[category]:
-            flat_recommendations.append(rec["text"])
-
-    return flat_recommendations
\ No newline at end of file
+    Produces the same output as calling ``generate_recommendations`` on each
+    record, but evaluates each rule once over the whole batch.
+
+    Args:
+        records: List of input dictionaries.
+        rich: Return full recommendation dicts instead of just the text.
+
+    Returns:
+        One list of recommendations per record.
+    """
+    if not records:
+        return []
+    columns = {name: _numeric_column([r.get(name, default) for r in records]) for name, default in DEFAULTS.items()}
+    mask, value = _evaluate(columns)
+
+    # Pairs (athlete, rule) in athlete order, rules in output order
+    athletes, rules = np.nonzero(mask.T)
+    bounds = np.searchsorted(athletes, np.arange(len(records) + 1))
+    if not rich:
+        texts = np.array(RULE_TEXTS, dtype=object)[rules].tolist()
+        return [texts[bounds[i]:bounds[i + 1]] for i in range(len(records))]
+
+    priorities = np.empty(len(rules))
+    for r in np.unique(rules):
+        priority = RULES[r]["priority"]
+        selected = rules == r
+        if isinstance(priority, tuple):
+            factor, threshold, weight = priority
+            priorities[selected] = np.clip(value(factor)[athletes[selected]] / threshold * weight, 0.0, 1.0)
+        else:
+            priorities[selected] = priority
+    recs = [_rich(RULES[r], float(p)) for r, p in zip(rules.tolist(), priorities.tolist())]
+    return [recs[bounds[i]:bounds[i + 1]] for i in range(len(records))]
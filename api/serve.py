@@ -0,0 +1,193 @@
+"""
+Production entry point for the web service.
+
+Runs ``app.create_app()`` under gunicorn (Linux/macOS, ``pip install
+gunicorn``) with ``--workers`` processes of ``--threads`` threads each. The
+model artifacts are loaded in the master before it forks, so every worker
+shares them copy-on-write and is ready as soon as it starts. On SIGTERM the
+workers stop accepting connections, finish the requests in flight (for up to
+``--graceful-timeout`` seconds), run the predictions still queued in the
+micro-batcher and close the chat backend's connections.
+
+Without gunicorn (e.g. on Windows) or with ``--server werkzeug`` it falls
+back to a single-process threaded werkzeug server with the same preloading
+and graceful shutdown, minus the debugger and reloader of ``python app.py``.
+
+Usage:
+    python api/serve.py [--host 0.0.0.0] [--port 8000] [--workers 4] [--threads 4]
+        [--timeout 60] [--graceful-timeout 30] [--server auto|gunicorn|werkzeug]
+
+Every option defaults to an environment variable: ``HOST``, ``PORT``,
+``WEB_CONCURRENCY``, ``WEB_THREADS``, ``WEB_TIMEOUT``, ``GRACEFUL_TIMEOUT``,
+``WEB_SERVER``. Request bodies are limited by ``MAX_CONTENT_LENGTH`` (see
+``app.py``) and the log level by ``LOG_LEVEL``.
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socketserver
+import threading
+import time
+
+import model_registry
+from settings import env_int
+
+logger = logging.getLogger(__name__)
+
+SERVERS = ("auto", "gunicorn", "werkzeug")
+
+def load_app():
+    """
+    Preload the model artifacts, then build the application.
+
+    Returns:
+        Flask: The application.
+    """
+    model_registry.preload()
+    from app import create_app
+    return create_app()
+
+def _shutdown_app(timeout):
+    import app
+    app.shutdown(timeout)
+
+def run_gunicorn(host, port, workers, threads, timeout, graceful_timeout):
+    """
+    Serve with gunicorn: preloaded app, ``workers`` processes of ``threads`` threads.
+
+    Args:
+        host (str): Bind address.
+        port (int): Bind port.
+        workers (int): Worker processes.
+        threads (int): Threads per worker.
+        timeout (int): Seconds before a silent worker is killed and restarted.
+        graceful_timeout (int): Seconds workers get to finish requests on shutdown.
+    """
+    from gunicorn.app.base import BaseApplication
+
+    def post_worker_init(worker):
+        # Fail /readyz as soon as the worker is told to stop, then let gunicorn drain it
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def on_term(signum, frame):
+            import app
+            app.draining.set()
+            previous(signum, frame)
+
+        signal.signal(signal.SIGTERM, on_term)
+
+    def worker_exit(server, worker):
+        _shutdown_app(graceful_timeout)
+
+    class Server(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{host}:{port}",
+                "workers": workers,
+                "threads": threads,
+                "worker_class": "gthread",
+                "preload_app": True,
+                "timeout": timeout,
+                "graceful_timeout": graceful_timeout,
+                "keepalive": 5,
+                "accesslog": None,
+                "post_worker_init": post_worker_init,
+                "worker_exit": worker_exit,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app()
+
+    Server().run()
+
+def run_werkzeug(host, port, graceful_timeout):
+    """
+    Serve with werkzeug's threaded server (one thread per connection) in this process.
+
+    Args:
+        host (str): Bind address.
+        port (int): Bind port.
+        graceful_timeout (float): Seconds to finish requests in flight on shutdown.
+    """
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, load_app(), threaded=True)
+    # Keep track of connection threads so server_close() waits for them
+    server.daemon_threads = False
+    server.block_on_close = True
+
+    def on_signal(signum, frame):
+        import app
+        logger.info(f"Received signal {signum}; shutting down")
+        app.draining.set()
+        # shutdown() waits for serve_forever to return, so it cannot run on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+    logger.info(f"Serving on http://{host}:{server.server_port} (werkzeug, threaded)")
+    # socketserver's loop rather than werkzeug's, which closes the listening
+    # socket and joins the connection threads itself, without a timeout
+    socketserver.BaseServer.serve_forever(server)
+
+    # Take on the connections still waiting in the listen backlog as well
+    server.socket.setblocking(False)
+    while True:
+        try:
+            connection, address = server.get_request()
+        except OSError:
+            break
+        connection.setblocking(True)
+        server.process_request(connection, address)
+
+    # Finish the connections already accepted, for up to graceful_timeout seconds
+    deadline = time.monotonic() + graceful_timeout
+    closer = threading.Thread(target=server.server_close, daemon=True)
+    closer.start()
+    closer.join(graceful_timeout)
+    _shutdown_app(max(deadline - time.monotonic(), 0))
+    if closer.is_alive():
+        logger.warning(f"Requests still running after {graceful_timeout}s; exiting anyway")
+        # Connection threads are not daemonic, so a normal exit would wait for them
+        os._exit(1)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the injury prediction API in production.")
+    parser.add_argument("--host", default=os.environ.get("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=env_int("PORT", 8000))
+    parser.add_argument("--workers", type=int, default=env_int("WEB_CONCURRENCY", os.cpu_count() or 1),
+                        help="worker processes (gunicorn)")
+    parser.add_argument("--threads", type=int, default=env_int("WEB_THREADS", 4), help="threads per worker (gunicorn)")
+    parser.add_argument("--timeout", type=int, default=env_int("WEB_TIMEOUT", 60),
+                        help="seconds before a stuck worker is restarted (gunicorn)")
+    parser.add_argument("--graceful-timeout", type=int, default=env_int("GRACEFUL_TIMEOUT", 30),
+                        help="seconds to finish requests in flight on shutdown")
+    parser.add_argument("--server", choices=SERVERS, default=os.environ.get("WEB_SERVER", "auto"))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
+    if args.workers < 1 or args.threads < 1:
+        raise ValueError("Workers and threads must be at least 1.")
+
+    server = args.server
+    if server != "werkzeug":
+        try:
+            import gunicorn  # noqa: F401
+            server = "gunicorn"
+        except ImportError:
+            if server == "gunicorn":
+                raise ImportError("The gunicorn server requires gunicorn: pip install gunicorn")
+            server = "werkzeug"
+
+    if server == "gunicorn":
+        run_gunicorn(args.host, args.port, args.workers, args.threads, args.timeout, args.graceful_timeout)
+    else:
+        if args.workers > 1:
+            logger.warning("gunicorn is not installed; serving from a single process")
+        run_werkzeug(args.host, args.port, args.graceful_timeout)
+
+if __name__ == "__main__":
+    main()
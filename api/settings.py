@@ -0,0 +1,49 @@
+"""
+Helpers for reading service configuration from environment variables.
+"""
+
+import os
+
+def env_flag(name, default=False):
+    """
+    Read a boolean flag ("1", "true", "yes", "on" are true).
+
+    Args:
+        name (str): Environment variable name.
+        default (bool): Value when the variable is unset.
+
+    Returns:
+        bool: Parsed flag.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def env_int(name, default):
+    """
+    Read an integer setting.
+
+    Args:
+        name (str): Environment variable name.
+        default (int): Value when the variable is unset.
+
+    Returns:
+        int: Parsed value.
+    """
+    value = os.environ.get(name)
+    return default if value in (None, "") else int(value)
+
+def env_float(name, default):
+    """
+    Read a float setting.
+
+    Args:
+        name (str): Environment variable name.
+        default (float): Value when the variable is unset.
+
+    Returns:
+        float: Parsed value.
+    """
+    value = os.environ.get(name)
+    return default if value in (None, "") else float(value)
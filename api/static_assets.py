@@ -0,0 +1,270 @@
+"""
+Static frontend assets, prepared once instead of on every request.
+
+At startup every file in the frontend folder is read into memory. CSS, JS
+and other non-HTML assets get a content fingerprint in their name
+(``style.css`` -> ``style.3f9c2a7b.css``), and the references to them in the
+HTML pages are rewritten to the fingerprinted names. Text assets are
+compressed ahead of time with gzip and, when the ``brotli`` package is
+installed, brotli. Requests are then answered from memory with the best
+encoding the client accepts, an ETag, and either a one-year ``immutable``
+cache lifetime (fingerprinted names) or ``no-cache`` (HTML pages and the
+original names, which clients revalidate cheaply with ``If-None-Match``).
+
+The same output can be written to a directory for a front proxy (e.g. nginx
+with ``gzip_static``/``brotli_static``), with the app's own static serving
+switched off (``SERVE_STATIC=0``, see ``app.py``):
+
+Usage:
+    python api/static_assets.py build OUT_DIR [--root UI] [--no-compress]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Cache-Control for fingerprinted names (content never changes) and everything else
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Extensions that are compressed ahead of time
+COMPRESSIBLE = (".html", ".css", ".js", ".json", ".svg", ".txt", ".map", ".xml")
+# Extensions served under their own name only (entry points linked by URL)
+NOT_FINGERPRINTED = (".html",)
+# Smaller files are not worth compressing
+MIN_COMPRESS_SIZE = 256
+
+# File suffix of each precompressed variant, in order of preference
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+MANIFEST_FILE = "manifest.json"
+
+_REFERENCE = re.compile(r"""(?P<prefix>\b(?:src|href)\s*=\s*)(?P<quote>["'])(?P<url>[^"'#?:]+)(?P<suffix>[^"']*)(?P=quote)""")
+
+class Asset:
+    """One servable file: its encodings, ETag and cache policy."""
+
+    __slots__ = ("mimetype", "etag", "cache_control", "variants")
+
+    def __init__(self, variants, mimetype, cache_control):
+        self.variants = variants
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(variants["identity"]).hexdigest()[:16]
+        self.cache_control = cache_control
+
+def compress_variants(body):
+    """
+    Compress a file with every available encoding, keeping only variants that are smaller.
+
+    Args:
+        body (bytes): File contents.
+
+    Returns:
+        dict: Encoding name -> compressed bytes.
+    """
+    if len(body) < MIN_COMPRESS_SIZE:
+        return {}
+    variants = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+def fingerprint_name(path, body):
+    """
+    Return ``path`` with a content hash before its extension.
+
+    Args:
+        path (str): Relative path, e.g. ``"style.css"``.
+        body (bytes): File contents.
+
+    Returns:
+        str: e.g. ``"style.3f9c2a7b.css"``.
+    """
+    stem, ext = posixpath.splitext(path)
+    return f"{stem}.{hashlib.sha256(body).hexdigest()[:8]}{ext}"
+
+def rewrite_references(html, page, manifest):
+    """
+    Point ``src``/``href`` attributes of a page at fingerprinted names.
+
+    Args:
+        html (str): Page source.
+        page (str): Relative path of the page (references are relative to it).
+        manifest (dict): Original relative path -> fingerprinted path.
+
+    Returns:
+        str: Rewritten page.
+    """
+    base = posixpath.dirname(page)
+
+    def replace(match):
+        url = match.group("url")
+        target = posixpath.normpath(posixpath.join(base, url))
+        if target not in manifest:
+            return match.group(0)
+        new_url = posixpath.join(posixpath.dirname(url), posixpath.basename(manifest[target]))
+        return f"{match.group('prefix')}{match.group('quote')}{new_url}{match.group('suffix')}{match.group('quote')}"
+
+    return _REFERENCE.sub(replace, html)
+
+class StaticAssets:
+    """
+    In-memory, fingerprinted and precompressed copy of a frontend folder.
+
+    Args:
+        root (str): Frontend folder.
+        compress (bool): Prepare gzip/brotli variants of text assets.
+    """
+
+    def __init__(self, root, compress=True):
+        self.root = os.path.abspath(root)
+        self.compress = compress
+        self.manifest = {}
+        self.assets = {}
+        self._build()
+
+    def _files(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for filename in sorted(filenames):
+                if not filename.startswith("."):
+                    path = os.path.join(dirpath, filename)
+                    yield os.path.relpath(path, self.root).replace(os.sep, "/"), path
+
+    def _add(self, name, variants, cache_control):
+        mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.assets[name] = Asset(variants, mimetype, cache_control)
+
+    def _variants(self, name, body):
+        variants = {"identity": body}
+        if self.compress and name.lower().endswith(COMPRESSIBLE):
+            variants.update(compress_variants(body))
+        return variants
+
+    def _build(self):
+        if not os.path.isdir(self.root):
+            logger.warning(f"Frontend folder not found: {self.root}; no static assets will be served.")
+            return
+        pages = {}
+        for name, path in self._files():
+            with open(path, "rb") as f:
+                body = f.read()
+            if name.lower().endswith(NOT_FINGERPRINTED):
+                pages[name] = body
+                continue
+            # Same content under both names; only the fingerprinted one is cached for good
+            variants = self._variants(name, body)
+            self.manifest[name] = fingerprint_name(name, body)
+            self._add(self.manifest[name], variants, IMMUTABLE)
+            self._add(name, variants, REVALIDATE)
+        for name, body in pages.items():
+            html = rewrite_references(body.decode("utf-8"), name, self.manifest).encode("utf-8")
+            self._add(name, self._variants(name, html), REVALIDATE)
+        logger.info(f"Prepared {len(self.assets)} static assets from {self.root} "
+                    f"(encodings: {', '.join(self.encodings())})")
+
+    def encodings(self):
+        """Return the content encodings prepared for compressible assets."""
+        if not self.compress:
+            return ["identity"]
+        return ["identity", "gzip"] + (["br"] if brotli is not None else [])
+
+    def response(self, name, request):
+        """
+        Build the response for one asset.
+
+        Args:
+            name (str): Relative path requested.
+            request (flask.Request): Current request (Accept-Encoding, If-None-Match, Range).
+
+        Returns:
+            flask.Response or None: The response (``304`` when the client's
+            copy is current), or None if there is no such asset.
+        """
+        asset = self.assets.get(name)
+        if asset is None:
+            return None
+        encoding = "identity"
+        for candidate in ENCODINGS:
+            if candidate in asset.variants and request.accept_encodings.quality(candidate) > 0:
+                encoding = candidate
+                break
+        response = Response(asset.variants[encoding], mimetype=asset.mimetype)
+        response.headers["Cache-Control"] = asset.cache_control
+        if len(asset.variants) > 1:
+            response.headers["Vary"] = "Accept-Encoding"
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+        # Each representation gets its own validator
+        response.set_etag(asset.etag if encoding == "identity" else f"{asset.etag}-{encoding}")
+        return response.make_conditional(request)
+
+    def write(self, out_dir):
+        """
+        Write every asset, its precompressed variants and ``manifest.json`` to a directory.
+
+        Args:
+            out_dir (str): Output directory, e.g. the document root of a front proxy.
+
+        Returns:
+            int: Number of files written.
+        """
+        written = 0
+        for name, asset in self.assets.items():
+            path = os.path.join(out_dir, *name.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            for encoding, body in asset.variants.items():
+                with open(path + ENCODINGS.get(encoding, ""), "wb") as f:
+                    f.write(body)
+                written += 1
+        with open(os.path.join(out_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        return written + 1
+
+    def stats(self):
+        """
+        Return the number of assets and their total size per encoding.
+
+        Returns:
+            dict: ``assets``, ``fingerprinted`` and bytes per encoding.
+        """
+        sizes = {}
+        # Fingerprinted and original names share their variants; count them once
+        unique = {id(asset.variants): asset.variants for asset in self.assets.values()}
+        for variants in unique.values():
+            for encoding, body in variants.items():
+                sizes[encoding] = sizes.get(encoding, 0) + len(body)
+        return {"assets": len(self.assets), "fingerprinted": len(self.manifest), "bytes": sizes}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed frontend assets.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="write the assets to a directory for a front proxy")
+    build.add_argument("out_dir", help="output directory")
+    build.add_argument("--root", default=os.path.join(os.path.dirname(__file__), "..", "UI"), help="frontend folder")
+    build.add_argument("--no-compress", action="store_true", help="skip the gzip/brotli variants")
+    args = parser.parse_args(argv)
+
+    assets = StaticAssets(args.root, compress=not args.no_compress)
+    if brotli is None and not args.no_compress:
+        print("brotli is not installed; writing gzip variants only (pip install brotli)")
+    count = assets.write(args.out_dir)
+    print(f"Wrote {count} files for {len(assets.assets)} assets to {args.out_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,581 @@
+"""
+Train and calibrate the serving models from the refined dataset.
+
+Scripted, reproducible version of RandomForest.ipynb, XGBOOST.ipynb and
+CalibrateLikelihood.ipynb. It writes exactly the artifacts ``model_registry``
+loads, plus ``imputation_stats.json`` and the bundle ``manifest.json`` (see
+``model_bundle.py``). The manifest is written last, so servers watching the
+output directory hot-reload the new version only once it is complete.
+
+Stages:
+    encode     encode features with ``features.encode_frame`` (the serving
+               encoder, so categories are coded exactly as at prediction time)
+               and the target with a LabelEncoder; draw the Injury_Occurred
+               outcome where the dataset has none; stratified train/test split
+    smote      SMOTE oversampling of the training split
+    rf         RandomizedSearchCV over ``RF_PARAMS``, then the best forest
+               wrapped in a sigmoid CalibratedClassifierCV
+    xgb        GridSearchCV over ``XGB_PARAMS``, then a sigmoid CalibratedClassifierCV
+    oof        out-of-fold ensemble probabilities on the training split, with
+               SMOTE and both models refit inside each fold
+    calibrate  logistic calibrator from the out-of-fold probabilities to the
+               outcome, and the Low-risk override threshold
+    evaluate   held-out test metrics of the complete serving pipeline
+    write      artifacts and manifest
+
+Stage outputs are cached in ``TRAIN_CACHE_DIR`` under a hash of the dataset
+contents, the stage's parameters, the keys of the stages it reads and the
+library versions, so a rerun recomputes only the stages whose inputs changed.
+Searches, calibration folds and out-of-fold folds run on ``--jobs`` cores
+(default: all). Wall time per stage is printed at the end.
+
+Usage:
+    python api/train.py Refined_Sports_Injury_Dataset.csv [-o model/] [--version V]
+        [--jobs -1] [--quick] [--no-cache] [--report report.json]
+
+Requires ``imbalanced-learn`` for SMOTE (``pip install imbalanced-learn``).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import model_registry
+from features import FEATURES, INPUT_FIELDS, IMPUTATION_STATS_FILE, encode_frame, pipeline, save_imputation_stats
+from model_registry import ARTIFACT_FILES, file_sha256
+
+TARGET = "Injury_Risk_Level"
+OUTCOME = "Injury_Occurred"
+SEED = 42
+TEST_SIZE = 0.2
+
+# Bump to invalidate every cached stage after changing stage code
+PIPELINE_VERSION = 1
+
+TRAIN_CACHE_DIR = os.environ.get("TRAIN_CACHE_DIR") or os.path.join(os.path.dirname(__file__), "..", "data", "train_cache")
+
+# Probability of an injury per risk level, used to draw the outcome the
+# likelihood calibrator is fitted to when the dataset does not record one
+OUTCOME_PROBABILITIES = {"High": 0.95, "Medium": 0.5, "Low": 0.05}
+
+# Hyperparameter spaces and fold counts of the notebooks
+RF_PARAMS = {
+    "n_estimators": [100, 200, 300],
+    "max_depth": [15, 20, 25],
+    "min_samples_split": [2, 5],
+    "min_samples_leaf": [1, 2],
+}
+RF_SEARCH_ITERATIONS = 15
+RF_CLASS_WEIGHTS = {"High": 2.0}
+RF_CALIBRATION_FOLDS = 3
+XGB_PARAMS = {
+    "n_estimators": [100, 200, 300],
+    "max_depth": [5, 10, 15],
+    "learning_rate": [0.01, 0.1, 0.3],
+    "subsample": [0.8, 1.0],
+}
+XGB_CALIBRATION_FOLDS = 5
+SEARCH_FOLDS = 5
+OOF_FOLDS = 5
+
+# Small spaces for --quick smoke runs
+QUICK_RF_PARAMS = {"n_estimators": [50], "max_depth": [15], "min_samples_split": [2], "min_samples_leaf": [1]}
+QUICK_XGB_PARAMS = {"n_estimators": [50], "max_depth": [5], "learning_rate": [0.1], "subsample": [1.0]}
+
+# Logistic calibration, as in CalibrateLikelihood.ipynb
+CALIBRATOR_MAX_ITER = 1000
+CALIBRATOR_C = 1.0
+
+def library_versions():
+    """Return the versions that determine the fitted models."""
+    import sklearn
+    import xgboost
+    try:
+        import imblearn
+    except ImportError:
+        imblearn = None
+    return {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "scikit-learn": sklearn.__version__, "xgboost": xgboost.__version__,
+            "imbalanced-learn": getattr(imblearn, "__version__", None)}
+
+class StageCache:
+    """
+    Stage outputs stored as joblib files keyed by a content hash.
+
+    Args:
+        directory (str): Cache directory (created on first save).
+        enabled (bool): Read cached outputs; outputs are saved either way.
+    """
+
+    def __init__(self, directory=TRAIN_CACHE_DIR, enabled=True):
+        self.directory = directory
+        self.enabled = enabled
+        self._versions = library_versions()
+
+    def key(self, stage, params, *inputs):
+        """
+        Hash everything a stage's output depends on.
+
+        Args:
+            stage (str): Stage name.
+            params (dict): Stage parameters (JSON-serializable).
+            *inputs (str): Dataset hash or keys of the stages it reads.
+
+        Returns:
+            str: Hex SHA-256.
+        """
+        payload = json.dumps([PIPELINE_VERSION, stage, params, inputs, self._versions], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, stage, key):
+        return os.path.join(self.directory, f"{stage}-{key[:20]}.joblib")
+
+    def load(self, stage, key):
+        """Return the cached output, or None if there is none (or caching is off)."""
+        path = self._path(stage, key)
+        if not self.enabled or not os.path.exists(path):
+            return None
+        return joblib.load(path)
+
+    def save(self, stage, key, value):
+        """Store a stage output atomically."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(stage, key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(value, tmp)
+        os.replace(tmp, path)
+
+class TrainingRun:
+    """
+    Runs stages through the cache and records their wall time.
+
+    Args:
+        cache (StageCache): Stage cache.
+        log (callable): Progress output.
+    """
+
+    def __init__(self, cache, log=print):
+        self.cache = cache
+        self.log = log
+        self.timings = []
+
+    def stage(self, name, params, inputs, compute, cached=True):
+        """
+        Return a stage's output, from the cache when its inputs are unchanged.
+
+        Args:
+            name (str): Stage name.
+            params (dict): Stage parameters, part of the cache key.
+            inputs (list): Dataset hash or keys of the stages it reads.
+            compute (callable): Produces the output.
+            cached (bool): Store and reuse the output (off for cheap stages).
+
+        Returns:
+            tuple: (output, cache key).
+        """
+        key = self.cache.key(name, params, *inputs)
+        start = time.perf_counter()
+        value = self.cache.load(name, key) if cached else None
+        hit = value is not None
+        if not hit:
+            self.log(f"[{name}] running")
+            value = compute()
+            if cached:
+                self.cache.save(name, key, value)
+        seconds = time.perf_counter() - start
+        self.timings.append({"stage": name, "seconds": round(seconds, 3), "cached": hit})
+        self.log(f"[{name}] {'cached' if hit else 'done'} in {seconds:.2f}s")
+        return value, key
+
+def load_dataset(path):
+    """
+    Read the training CSV and check its columns.
+
+    Args:
+        path (str): CSV with the input fields and ``Injury_Risk_Level``.
+
+    Returns:
+        pd.DataFrame: The dataset.
+
+    Raises:
+        ValueError: If required columns are missing.
+    """
+    df = pd.read_csv(path)
+    missing_cols = [col for col in INPUT_FIELDS + [TARGET] if col not in df.columns]
+    if missing_cols:
+        raise ValueError(f"Dataset is missing required columns: {missing_cols}")
+    return df
+
+def encode_dataset(df, test_size=TEST_SIZE, seed=SEED):
+    """
+    Encode features and targets and split off the test set.
+
+    Args:
+        df (pd.DataFrame): Raw dataset.
+        test_size (float): Fraction held out for evaluation.
+        seed (int): Random seed for the outcome draw and the split.
+
+    Returns:
+        dict: Train/test features, labels and outcomes, the label encoder and
+        imputation statistics of the training split.
+
+    Raises:
+        ValueError: If numeric features have missing values.
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import LabelEncoder
+
+    X = encode_frame(df)
+    if np.isnan(X).any():
+        bad = [FEATURES[col] for col in np.flatnonzero(np.isnan(X).any(axis=0))]
+        raise ValueError(f"Missing values in: {bad}. Clean the dataset before training.")
+    encoder = LabelEncoder()
+    y = encoder.fit_transform(df[TARGET].astype(str))
+    if OUTCOME in df.columns:
+        outcome = df[OUTCOME].to_numpy(dtype=int)
+    else:
+        p = df[TARGET].astype(str).map(OUTCOME_PROBABILITIES).to_numpy(dtype=float)
+        outcome = np.random.RandomState(seed).binomial(1, p)
+    X_train, X_test, y_train, y_test, outcome_train, outcome_test = train_test_split(
+        X, y, outcome, test_size=test_size, stratify=y, random_state=seed)
+    return {"X_train": X_train, "X_test": X_test, "y_train": y_train, "y_test": y_test,
+            "outcome_train": outcome_train, "outcome_test": outcome_test, "encoder": encoder,
+            "imputation_stats": pipeline.fit_imputation_stats(X_train)}
+
+def resample(X, y, seed=SEED):
+    """
+    Balance the classes with SMOTE.
+
+    Args:
+        X (np.ndarray): Features.
+        y (np.ndarray): Encoded labels.
+        seed (int): Random seed.
+
+    Returns:
+        tuple: Resampled (X, y).
+    """
+    try:
+        from imblearn.over_sampling import SMOTE
+    except ImportError:
+        raise ImportError("Training requires imbalanced-learn: pip install imbalanced-learn")
+    return SMOTE(random_state=seed).fit_resample(X, y)
+
+def _rf_class_weight(classes):
+    return {i: RF_CLASS_WEIGHTS.get(label, 1.0) for i, label in enumerate(classes)}
+
+def make_rf(classes, params=None, seed=SEED):
+    """RandomForest with the notebook's class weights ("High" counts double)."""
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(random_state=seed, class_weight=_rf_class_weight(classes), **(params or {}))
+
+def make_xgb(classes, params=None, seed=SEED, n_jobs=None):
+    """Multi-class XGBoost classifier as in XGBOOST.ipynb."""
+    import xgboost as xgb
+    return xgb.XGBClassifier(objective="multi:softprob", eval_metric="mlogloss", num_class=len(classes),
+                             random_state=seed, n_jobs=n_jobs, **(params or {}))
+
+def calibrated(estimator, folds, n_jobs=None):
+    """Wrap an estimator in sigmoid CalibratedClassifierCV, the form ``predict.py`` loads."""
+    from sklearn.calibration import CalibratedClassifierCV
+    return CalibratedClassifierCV(estimator, method="sigmoid", cv=folds, ensemble=True, n_jobs=n_jobs)
+
+def train_rf(X, y, classes, space, iterations, jobs, seed=SEED):
+    """
+    Tune the RandomForest by randomized search and fit the calibrated model.
+
+    Args:
+        X (np.ndarray): Resampled training features.
+        y (np.ndarray): Resampled labels.
+        classes (list): Class names in encoder order.
+        space (dict): Hyperparameter lists.
+        iterations (int): Candidates drawn.
+        jobs (int): Parallel jobs (-1: all cores).
+        seed (int): Random seed.
+
+    Returns:
+        dict: ``model``, ``params`` and the best ``cv_f1_macro``.
+    """
+    from sklearn.model_selection import RandomizedSearchCV, StratifiedKFold
+    cv = StratifiedKFold(n_splits=SEARCH_FOLDS, shuffle=True, random_state=seed)
+    n_candidates = int(np.prod([len(values) for values in space.values()]))
+    search = RandomizedSearchCV(make_rf(classes, seed=seed), space, n_iter=min(iterations, n_candidates), cv=cv,
+                                scoring="f1_macro", n_jobs=jobs, random_state=seed)
+    search.fit(X, y)
+    model = calibrated(make_rf(classes, search.best_params_, seed), RF_CALIBRATION_FOLDS, n_jobs=jobs)
+    model.fit(X, y)
+    return {"model": model, "params": search.best_params_, "cv_f1_macro": float(search.best_score_)}
+
+def train_xgb(X, y, classes, space, jobs, seed=SEED):
+    """
+    Tune XGBoost by grid search and fit the calibrated model.
+
+    Each search candidate trains single-threaded so the candidates can run
+    on all cores at once without oversubscribing them.
+
+    Args:
+        X (np.ndarray): Resampled training features.
+        y (np.ndarray): Resampled labels.
+        classes (list): Class names in encoder order.
+        space (dict): Hyperparameter grid.
+        jobs (int): Parallel jobs (-1: all cores).
+        seed (int): Random seed.
+
+    Returns:
+        dict: ``model``, ``params`` and the best ``cv_f1_macro``.
+    """
+    from sklearn.model_selection import GridSearchCV
+    search = GridSearchCV(make_xgb(classes, seed=seed, n_jobs=1), space, cv=SEARCH_FOLDS,
+                          scoring="f1_macro", n_jobs=jobs)
+    search.fit(X, y)
+    model = calibrated(make_xgb(classes, search.best_params_, seed), XGB_CALIBRATION_FOLDS, n_jobs=jobs)
+    model.fit(X, y)
+    return {"model": model, "params": search.best_params_, "cv_f1_macro": float(search.best_score_)}
+
+def _oof_fold(X, y, train_idx, test_idx, classes, rf_params, xgb_params, seed):
+    X_res, y_res = resample(X[train_idx], y[train_idx], seed)
+    rf = calibrated(make_rf(classes, rf_params, seed), RF_CALIBRATION_FOLDS).fit(X_res, y_res)
+    xgb = calibrated(make_xgb(classes, xgb_params, seed, n_jobs=1), XGB_CALIBRATION_FOLDS).fit(X_res, y_res)
+    return test_idx, (rf.predict_proba(X[test_idx]) + xgb.predict_proba(X[test_idx])) / 2
+
+def out_of_fold_probabilities(X, y, classes, rf_params, xgb_params, folds, jobs, seed=SEED):
+    """
+    Ensemble probabilities for every training row from models that never saw it.
+
+    The calibrator is fitted on these instead of on predictions for rows the
+    models were trained on, which are overconfident.
+
+    Args:
+        X (np.ndarray): Training features (not resampled).
+        y (np.ndarray): Training labels.
+        classes (list): Class names in encoder order.
+        rf_params (dict): Selected RandomForest hyperparameters.
+        xgb_params (dict): Selected XGBoost hyperparameters.
+        folds (int): Number of folds, fitted in parallel.
+        jobs (int): Parallel jobs (-1: all cores).
+        seed (int): Random seed.
+
+    Returns:
+        np.ndarray: ``(len(X), n_classes)`` averaged probabilities.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    results = Parallel(n_jobs=jobs)(
+        delayed(_oof_fold)(X, y, train_idx, test_idx, classes, rf_params, xgb_params, seed)
+        for train_idx, test_idx in cv.split(X, y))
+    probs = np.empty((len(X), len(classes)))
+    for test_idx, fold_probs in results:
+        probs[test_idx] = fold_probs
+    return probs
+
+def apply_low_threshold(probs, classes, threshold):
+    """Predicted labels after the serving Low-risk override (see ``predict._score``)."""
+    labels = np.asarray(classes)[np.argmax(probs, axis=1)]
+    low = list(classes).index("Low")
+    return np.where((probs[:, low] > threshold) & (labels != "Low"), "Low", labels)
+
+def select_low_threshold(probs, y, classes):
+    """
+    Choose the Low-risk override threshold that maximizes macro F1.
+
+    Args:
+        probs (np.ndarray): Out-of-fold ensemble probabilities.
+        y (np.ndarray): Encoded true labels.
+        classes (list): Class names in encoder order.
+
+    Returns:
+        tuple: (threshold, macro F1 with it, macro F1 without override).
+    """
+    from sklearn.metrics import f1_score
+    truth = np.asarray(classes)[y]
+    low = list(classes).index("Low")
+    # Candidates: quantiles of prob_low; 1.0 disables the override, and wins ties
+    candidates = np.unique(np.concatenate([np.quantile(probs[:, low], np.linspace(0, 1, 201)), [1.0]]))[::-1]
+    scores = [f1_score(truth, apply_low_threshold(probs, classes, t), average="macro") for t in candidates]
+    best = int(np.argmax(scores))
+    return float(candidates[best]), float(scores[best]), float(scores[0])
+
+def calibrator_columns(classes):
+    """Calibrator input names, ``prob_<class>`` in encoder order (as ``predict.py`` passes them)."""
+    return [f"prob_{label.lower()}" for label in classes]
+
+def fit_calibration(probs, y, outcome, classes):
+    """
+    Fit the likelihood calibrator and the Low-risk threshold.
+
+    Args:
+        probs (np.ndarray): Out-of-fold ensemble probabilities.
+        y (np.ndarray): Encoded true labels.
+        outcome (np.ndarray): Injury outcome (0/1).
+        classes (list): Class names in encoder order.
+
+    Returns:
+        dict: ``calibrator``, ``low_threshold`` and out-of-fold metrics.
+    """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import brier_score_loss
+    if len(np.unique(outcome)) < 2:
+        raise ValueError(f"{OUTCOME} has a single class; the calibrator needs both.")
+    calib_data = pd.DataFrame(probs, columns=calibrator_columns(classes))
+    calibrator = LogisticRegression(max_iter=CALIBRATOR_MAX_ITER, C=CALIBRATOR_C).fit(calib_data, outcome)
+    threshold, f1, f1_no_override = select_low_threshold(probs, y, classes)
+    return {"calibrator": calibrator, "low_threshold": threshold,
+            "oof_brier": float(brier_score_loss(outcome, calibrator.predict_proba(calib_data)[:, 1])),
+            "oof_f1_macro": f1, "oof_f1_macro_no_override": f1_no_override}
+
+def evaluate(rf, xgb, calibration, data):
+    """
+    Score the held-out test split with the complete serving pipeline.
+
+    Returns:
+        dict: Macro F1 and accuracy of each model and the final labels, and
+        the Brier score of the calibrated likelihood.
+    """
+    from sklearn.metrics import accuracy_score, brier_score_loss, f1_score
+    classes = data["encoder"].classes_
+    X, truth = data["X_test"], classes[data["y_test"]]
+    rf_probs, xgb_probs = rf.predict_proba(X), xgb.predict_proba(X)
+    avg_probs = (rf_probs + xgb_probs) / 2
+    final = apply_low_threshold(avg_probs, classes, calibration["low_threshold"])
+    likelihood = calibration["calibrator"].predict_proba(
+        pd.DataFrame(avg_probs, columns=calibrator_columns(classes)))[:, 1]
+    report = {"test_rows": int(len(X))}
+    for name, labels in (("rf", classes[rf_probs.argmax(axis=1)]), ("xgb", classes[xgb_probs.argmax(axis=1)]),
+                         ("ensemble", classes[avg_probs.argmax(axis=1)]), ("final", final)):
+        report[f"{name}_f1_macro"] = round(float(f1_score(truth, labels, average="macro")), 4)
+        report[f"{name}_accuracy"] = round(float(accuracy_score(truth, labels)), 4)
+    report["likelihood_brier"] = round(float(brier_score_loss(data["outcome_test"], likelihood)), 4)
+    return report
+
+def _dump(value, path):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(value, tmp)
+    os.replace(tmp, path)
+
+def write_artifacts(output, rf, xgb, calibration, data, version=None):
+    """
+    Write the serving artifacts, imputation statistics and manifest.
+
+    Args:
+        output (str): Model directory.
+        rf: Calibrated RandomForest.
+        xgb: Calibrated XGBoost.
+        calibration (dict): Output of ``fit_calibration``.
+        data (dict): Output of ``encode_dataset``.
+        version (str, optional): Bundle version (see ``model_bundle.write_manifest``).
+
+    Returns:
+        dict: The manifest.
+    """
+    import model_bundle
+    os.makedirs(output, exist_ok=True)
+    artifacts = {
+        "rf_model": rf,
+        "xgb_model": xgb,
+        "calibrator": calibration["calibrator"],
+        "rf_encoder": data["encoder"],
+        "xgb_encoder": data["encoder"],
+        "low_threshold": calibration["low_threshold"],
+    }
+    for name, value in artifacts.items():
+        _dump(value, os.path.join(output, ARTIFACT_FILES[name]))
+    save_imputation_stats(data["imputation_stats"], os.path.join(output, IMPUTATION_STATS_FILE))
+    return model_bundle.write_manifest(output, version)
+
+def train(dataset, output=model_registry.MODEL_DIR, jobs=-1, quick=False, cache=None, version=None, log=print):
+    """
+    Run the whole pipeline.
+
+    Args:
+        dataset (str): Training CSV.
+        output (str): Model directory to write.
+        jobs (int): Parallel jobs (-1: all cores).
+        quick (bool): Tiny hyperparameter spaces, for smoke runs.
+        cache (StageCache, optional): Stage cache; the default directory if omitted.
+        version (str, optional): Bundle version.
+        log (callable): Progress output.
+
+    Returns:
+        dict: Report with per-stage ``timings``, selected hyperparameters,
+        calibration and test metrics and the bundle ``version``.
+    """
+    run = TrainingRun(cache or StageCache(), log)
+    rf_space, xgb_space = (QUICK_RF_PARAMS, QUICK_XGB_PARAMS) if quick else (RF_PARAMS, XGB_PARAMS)
+    oof_folds = 3 if quick else OOF_FOLDS
+    dataset_hash = file_sha256(dataset)
+
+    data, encode_key = run.stage("encode", {"test_size": TEST_SIZE, "seed": SEED, "features": FEATURES,
+                                            "outcome": OUTCOME_PROBABILITIES},
+                                 [dataset_hash], lambda: encode_dataset(load_dataset(dataset)))
+    classes = data["encoder"].classes_.tolist()
+    (X_res, y_res), smote_key = run.stage("smote", {"seed": SEED}, [encode_key],
+                                          lambda: resample(data["X_train"], data["y_train"]))
+    rf, rf_key = run.stage("rf", {"space": rf_space, "iterations": RF_SEARCH_ITERATIONS, "weights": RF_CLASS_WEIGHTS},
+                           [smote_key], lambda: train_rf(X_res, y_res, classes, rf_space, RF_SEARCH_ITERATIONS, jobs))
+    xgb, xgb_key = run.stage("xgb", {"space": xgb_space}, [smote_key],
+                             lambda: train_xgb(X_res, y_res, classes, xgb_space, jobs))
+    oof, oof_key = run.stage("oof", {"folds": oof_folds, "rf": rf["params"], "xgb": xgb["params"]}, [encode_key],
+                             lambda: out_of_fold_probabilities(data["X_train"], data["y_train"], classes,
+                                                               rf["params"], xgb["params"], oof_folds, jobs))
+    calibration, _ = run.stage("calibrate", {"c": CALIBRATOR_C}, [oof_key],
+                               lambda: fit_calibration(oof, data["y_train"], data["outcome_train"], classes),
+                               cached=False)
+    metrics, _ = run.stage("evaluate", {}, [rf_key, xgb_key],
+                           lambda: evaluate(rf["model"], xgb["model"], calibration, data), cached=False)
+    manifest, _ = run.stage("write", {"output": output}, [],
+                            lambda: write_artifacts(output, rf["model"], xgb["model"], calibration, data, version),
+                            cached=False)
+    return {
+        "version": manifest["version"],
+        "output": output,
+        "dataset": {"path": dataset, "sha256": dataset_hash, "train_rows": int(len(data["X_train"])),
+                    "resampled_rows": int(len(X_res))},
+        "rf": {"params": rf["params"], "cv_f1_macro": round(rf["cv_f1_macro"], 4)},
+        "xgb": {"params": xgb["params"], "cv_f1_macro": round(xgb["cv_f1_macro"], 4)},
+        "calibration": {k: round(v, 4) if isinstance(v, float) else v
+                        for k, v in calibration.items() if k != "calibrator"},
+        "test": metrics,
+        "timings": run.timings,
+        "total_seconds": round(sum(t["seconds"] for t in run.timings), 3),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train and calibrate the serving models and write a model bundle.")
+    parser.add_argument("dataset", help="training CSV (Refined_Sports_Injury_Dataset.csv)")
+    parser.add_argument("-o", "--output", default=model_registry.MODEL_DIR, help="model directory to write")
+    parser.add_argument("--version", help="bundle version (default: UTC time and content hash)")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel jobs for searches and folds (-1: all cores)")
+    parser.add_argument("--quick", action="store_true", help="tiny hyperparameter spaces, for smoke runs")
+    parser.add_argument("--cache-dir", default=TRAIN_CACHE_DIR, help="stage cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="recompute every stage (results are still cached)")
+    parser.add_argument("--report", help="also write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    log = lambda message: print(message, file=sys.stderr)
+    report = train(args.dataset, args.output, jobs=args.jobs, quick=args.quick, version=args.version,
+                   cache=StageCache(args.cache_dir, enabled=not args.no_cache), log=log)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    print(f"{'stage':<10} {'seconds':>9}  cached")
+    for timing in report["timings"]:
+        print(f"{timing['stage']:<10} {timing['seconds']:>9.2f}  {'yes' if timing['cached'] else 'no'}")
+    print(f"{'total':<10} {report['total_seconds']:>9.2f}")
+    print(f"RF {report['rf']['params']} (CV F1 {report['rf']['cv_f1_macro']}); "
+          f"XGB {report['xgb']['params']} (CV F1 {report['xgb']['cv_f1_macro']})")
+    print(f"low_threshold {report['calibration']['low_threshold']}, OOF Brier {report['calibration']['oof_brier']}; "
+          f"test F1 {report['test']['final_f1_macro']}, accuracy {report['test']['final_accuracy']}, "
+          f"likelihood Brier {report['test']['likelihood_brier']}")
+    print(f"Wrote version {report['version']} to {report['output']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,505 @@
+"""
+Compiled tree-inference engine for the RandomForest + XGBoost ensemble.
+
+Both models (including the ``CalibratedClassifierCV`` wrappers produced by the
+training notebooks) are flattened into one set of node arrays: split feature,
+threshold, left/right child and per-class leaf value. A batch is scored by
+walking every tree of both models level by level with NumPy fancy indexing,
+then applying each member's output transform (tree averaging or softmax) and
+sigmoid calibration, and finally averaging the two models as in
+``predict._score``.
+
+The sklearn/xgboost libraries stay the reference: ``compile_ensemble`` checks
+the engine against them on probe rows and refuses to build an engine that
+does not match.
+"""
+
+import json
+import logging
+import threading
+import weakref
+
+import numpy as np
+
+import model_registry
+
+logger = logging.getLogger(__name__)
+
+# Maximum probability difference tolerated by the compile-time self-check
+# (xgboost computes leaf sums and softmax in float32)
+PARITY_TOLERANCE = 1e-5
+
+# Rows evaluated at once; bounds the (rows, trees, classes) leaf-value buffer
+CHUNK_ROWS = 128
+
+# Gauss-Legendre rule on [0, 1] and central-difference step used to carry
+# raw-output contributions through each member's probability transform
+_nodes, _weights = np.polynomial.legendre.leggauss(4)
+EXPLAIN_POINTS, EXPLAIN_WEIGHTS = (_nodes + 1) / 2, _weights / 2
+GRADIENT_STEP = 1e-5
+
+KIND_MEAN = 0
+KIND_SOFTMAX = 1
+
+class UnsupportedModelError(ValueError):
+    """Raised when a model cannot be flattened into the engine layout."""
+
+class _Builder:
+    """Accumulates flattened trees grouped into ensemble members."""
+
+    def __init__(self, n_classes):
+        self.n_classes = n_classes
+        self.feature, self.threshold, self.left, self.value, self.mean = [], [], [], [], []
+        self.roots, self.tree_member, self.tree_class, self.depths = [], [], [], []
+        self.n_nodes = 0
+
+    def add_tree(self, member, feature, threshold, left, right, value, target_class=-1, cover=None):
+        # ``value`` holds every node's expected output, or, when ``cover`` (the
+        # training weight reaching each node) is given, only the leaves' outputs
+        # Renumber breadth-first so that every right child directly follows its
+        # left sibling; traversal is then ``node = left[node] + (x > threshold)``
+        order = [0]
+        new_id = np.empty(len(left), dtype=np.intp)
+        new_id[0] = 0
+        depth = np.zeros(len(left), dtype=np.intp)
+        for old in order:
+            if left[old] >= 0:
+                new_id[left[old]] = len(order)
+                new_id[right[old]] = len(order) + 1
+                depth[left[old]] = depth[right[old]] = depth[old] + 1
+                order.append(left[old])
+                order.append(right[old])
+        order = np.asarray(order)
+        left, feature, threshold, value = left[order], feature[order], threshold[order], value[order]
+
+        offset = self.n_nodes
+        is_leaf = left < 0
+        mean = value
+        if cover is not None:
+            # Cover-weighted mean of the leaves below each node, filled bottom-up
+            cover = np.asarray(cover, dtype=np.float64)[order]
+            node_depth = depth[order]
+            child = new_id[np.maximum(left, 0)]
+            mean = np.where(is_leaf[:, None], value, 0.0)
+            for d in range(int(node_depth.max()) - 1, -1, -1):
+                nodes = np.flatnonzero((node_depth == d) & ~is_leaf)
+                lo, hi = child[nodes], child[nodes] + 1
+                weight = np.where(cover[nodes] > 0, cover[nodes], 1.0)[:, None]
+                mean[nodes] = (cover[lo, None] * mean[lo] + cover[hi, None] * mean[hi]) / weight
+        # Leaves point to themselves (and never go right) so extra steps are no-ops
+        own = np.arange(len(order)) + offset
+        self.feature.append(np.where(is_leaf, 0, feature).astype(np.int32))
+        self.threshold.append(np.where(is_leaf, np.inf, threshold).astype(np.float32))
+        self.left.append(np.where(is_leaf, own, new_id[np.maximum(left, 0)] + offset).astype(np.int32))
+        self.value.append(np.where(is_leaf[:, None], value, 0.0))
+        self.mean.append(mean)
+        self.roots.append(offset)
+        self.tree_member.append(member)
+        self.tree_class.append(target_class)
+        self.depths.append(int(depth.max()))
+        self.n_nodes += len(order)
+
+def _members(model):
+    """Yield (estimator, sigmoid (a, b) arrays or None) for a model or its calibrated wrapper."""
+    if not hasattr(model, "calibrated_classifiers_"):
+        yield model, None
+        return
+    for calibrated in model.calibrated_classifiers_:
+        if getattr(calibrated, "method", "sigmoid") != "sigmoid":
+            raise UnsupportedModelError(f"Unsupported calibration method: {calibrated.method}")
+        if not np.array_equal(calibrated.estimator.classes_, np.arange(len(calibrated.classes))):
+            raise UnsupportedModelError("Calibrated member does not cover every class.")
+        a = np.array([c.a_ for c in calibrated.calibrators], dtype=np.float64)
+        b = np.array([c.b_ for c in calibrated.calibrators], dtype=np.float64)
+        yield calibrated.estimator, (a, b)
+
+def _float32_floor(threshold):
+    # sklearn compares float32 features against float64 thresholds; for float32
+    # x, ``x <= t`` is equivalent to ``x <= t32`` with t32 the largest float32 <= t
+    t32 = threshold.astype(np.float32)
+    above = t32.astype(np.float64) > threshold
+    t32[above] = np.nextafter(t32[above], np.float32(-np.inf))
+    return t32
+
+def _add_forest(builder, member, forest):
+    if not hasattr(forest, "estimators_"):
+        raise UnsupportedModelError(f"Expected a fitted forest, got {type(forest).__name__}")
+    n_trees = len(forest.estimators_)
+    for est in forest.estimators_:
+        tree = est.tree_
+        if tree.n_outputs != 1:
+            raise UnsupportedModelError("Multi-output forests are not supported.")
+        value = tree.value[:, 0, :].astype(np.float64)
+        totals = value.sum(axis=1, keepdims=True)
+        totals[totals == 0.0] = 1.0
+        builder.add_tree(member, tree.feature, _float32_floor(tree.threshold), tree.children_left.astype(np.intp),
+                         tree.children_right.astype(np.intp), value / totals / n_trees)
+
+def _add_booster(builder, member, xgb_estimator):
+    booster = xgb_estimator.get_booster()
+    model = json.loads(booster.save_raw("json"))
+    gbm = model["learner"]["gradient_booster"]
+    if gbm["name"] != "gbtree":
+        raise UnsupportedModelError(f"Unsupported XGBoost booster: {gbm['name']}")
+    n_classes = int(model["learner"]["learner_model_param"]["num_class"])
+    if n_classes != builder.n_classes:
+        raise UnsupportedModelError("XGBoost model has an unexpected number of classes.")
+    trees = gbm["model"]["trees"]
+    tree_info = gbm["model"]["tree_info"]
+
+    best_iteration = getattr(xgb_estimator, "best_iteration", None)
+    if best_iteration is not None:
+        per_round = n_classes * int(gbm["model"]["gbtree_model_param"].get("num_parallel_tree", 1))
+        trees = trees[:(best_iteration + 1) * per_round]
+
+    # Group a member's trees by output class so each class's margin is one contiguous sum
+    order = sorted(range(len(trees)), key=lambda i: tree_info[i])
+    for tree, target_class in ((trees[i], tree_info[i]) for i in order):
+        if any(int(t) != 0 for t in tree.get("split_type", [])):
+            raise UnsupportedModelError("Categorical XGBoost splits are not supported.")
+        left = np.asarray(tree["left_children"], dtype=np.intp)
+        right = np.asarray(tree["right_children"], dtype=np.intp)
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+        # xgboost goes left when x < t in float32; express it as x <= nextafter(t, -inf)
+        threshold = np.nextafter(conditions, np.float32(-np.inf))
+        value = np.zeros((len(left), n_classes))
+        value[:, target_class] = conditions.astype(np.float64)
+        builder.add_tree(member, np.asarray(tree["split_indices"]), threshold, left, right, value, target_class,
+                         cover=tree["sum_hessian"])
+
+class CompiledEnsemble:
+    """
+    Array-packed RandomForest + XGBoost ensemble.
+
+    Use ``compile_ensemble`` to build one from fitted models.
+    """
+
+    def __init__(self, builder, member_kinds, member_model, calibration, n_models):
+        self.n_classes = builder.n_classes
+        self.feature = np.concatenate(builder.feature)
+        self.threshold = np.concatenate(builder.threshold)
+        self.left = np.concatenate(builder.left)
+        self.value = np.concatenate(builder.value)
+        # Expected output of every node (the leaf value for leaves), for explanations
+        self.mean = np.concatenate(builder.mean)
+        self.roots = np.asarray(builder.roots, dtype=np.int32)
+        self.depths = np.asarray(builder.depths, dtype=np.intp)
+        self.max_depth = int(self.depths.max())
+        # Trees sharing a depth are walked together for exactly that many steps
+        self.depth_groups = [(int(d), np.flatnonzero(self.depths == d)) for d in np.unique(self.depths)]
+
+        self.tree_member = tree_member = np.asarray(builder.tree_member)
+        tree_class = np.asarray(builder.tree_class)
+        # Forest trees carry a probability vector per leaf and are summed per
+        # member; booster trees carry one margin for one class and are summed
+        # per (member, class) slot. Both kinds are stored contiguously.
+        self.vector_trees = np.flatnonzero(tree_class < 0)
+        self.scalar_trees = np.flatnonzero(tree_class >= 0)
+        vector_member = tree_member[self.vector_trees]
+        self.vector_starts = np.flatnonzero(np.r_[True, vector_member[1:] != vector_member[:-1]]) if len(vector_member) else vector_member
+        self.vector_members = vector_member[self.vector_starts]
+        slot = tree_member[self.scalar_trees] * self.n_classes + tree_class[self.scalar_trees]
+        self.scalar_starts = np.flatnonzero(np.r_[True, slot[1:] != slot[:-1]]) if len(slot) else slot
+        self.scalar_slots = slot[self.scalar_starts]
+        self.leaf_scalar = self.value.sum(axis=1)
+        self.mean_scalar = self.mean.sum(axis=1)
+        self.tree_class = tree_class
+        # Depth groups split by tree kind for explanations: a booster tree only
+        # moves its own class, so its path needs one value per node, not a vector
+        self.explain_groups = []
+        for depth, trees in self.depth_groups:
+            for scalar in (False, True):
+                part = trees[(tree_class[trees] >= 0) == scalar]
+                if len(part):
+                    self.explain_groups.append((depth, part, scalar))
+        self.member_kinds = np.asarray(member_kinds)
+        self.member_model = np.asarray(member_model)
+        self.n_models = n_models
+        self.base_margin = np.zeros((len(member_kinds), self.n_classes))
+
+        n_members = len(member_kinds)
+        self.calibrated = np.array([c is not None for c in calibration])
+        self.cal_a = np.stack([c[0] if c is not None else np.zeros(self.n_classes) for c in calibration])
+        self.cal_b = np.stack([c[1] if c is not None else np.zeros(self.n_classes) for c in calibration])
+        # Weight of each member in the final average: 1/2 per model, split across its members
+        counts = np.bincount(self.member_model, minlength=n_models)
+        self.member_weight = 1.0 / (n_models * counts[self.member_model])
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def leaves(self, X):
+        """
+        Return the leaf node reached in every tree.
+
+        Args:
+            X (np.ndarray): Features, shape ``(n_samples, n_features)``.
+
+        Returns:
+            np.ndarray: Node indices, shape ``(n_samples, n_trees)``.
+        """
+        # Both libraries compare float32 feature values
+        Xf = np.ascontiguousarray(X, dtype=np.float32)
+        n_samples, n_features = Xf.shape
+        flat = Xf.ravel()
+        nodes = np.empty((n_samples, len(self.roots)), dtype=np.int32)
+        for depth, trees in self.depth_groups:
+            row_offset = (np.arange(n_samples, dtype=np.int32) * n_features)[:, None]
+            node = np.broadcast_to(self.roots[trees], (n_samples, len(trees))).copy()
+            for _ in range(depth):
+                go_right = flat.take(row_offset + self.feature.take(node)) > self.threshold.take(node)
+                node = self.left.take(node) + go_right
+            nodes[:, trees] = node
+        return nodes
+
+    def member_outputs(self, X):
+        """
+        Return each member's raw output: averaged tree probabilities for
+        forests, margins (including the base score) for boosters.
+
+        Args:
+            X (np.ndarray): Features, shape ``(n_samples, n_features)``.
+
+        Returns:
+            np.ndarray: Shape ``(n_samples, n_members, n_classes)``.
+        """
+        n_members = len(self.member_kinds)
+        out = np.zeros((len(X), n_members * self.n_classes))
+        vector_cols = (self.vector_members[:, None] * self.n_classes + np.arange(self.n_classes)).ravel()
+        for start in range(0, len(X), CHUNK_ROWS):
+            stop = start + CHUNK_ROWS
+            leaves = self.leaves(X[start:stop])
+            if len(self.vector_trees):
+                leaf_values = self.value[leaves[:, self.vector_trees]]
+                sums = np.add.reduceat(leaf_values, self.vector_starts, axis=1)
+                out[start:stop, vector_cols] = sums.reshape(len(leaves), -1)
+            if len(self.scalar_trees):
+                leaf_values = self.leaf_scalar.take(leaves[:, self.scalar_trees])
+                out[start:stop, self.scalar_slots] = np.add.reduceat(leaf_values, self.scalar_starts, axis=1)
+        return out.reshape(len(X), n_members, self.n_classes) + self.base_margin
+
+    def transform_members(self, raw):
+        """
+        Map raw member outputs to each member's (calibrated) class probabilities.
+
+        Args:
+            raw (np.ndarray): Output of ``member_outputs``.
+
+        Returns:
+            np.ndarray: Shape ``(n_samples, n_members, n_classes)``.
+        """
+        proba = raw.copy()
+        softmax = self.member_kinds == KIND_SOFTMAX
+        if softmax.any():
+            margins = proba[:, softmax]
+            margins = np.exp(margins - margins.max(axis=2, keepdims=True))
+            proba[:, softmax] = margins / margins.sum(axis=2, keepdims=True)
+
+        if self.calibrated.any():
+            cal = self.calibrated
+            p = 1.0 / (1.0 + np.exp(self.cal_a[cal] * proba[:, cal] + self.cal_b[cal]))
+            denominator = p.sum(axis=2, keepdims=True)
+            uniform = np.full_like(p, 1.0 / self.n_classes)
+            proba[:, cal] = np.divide(p, denominator, out=uniform, where=denominator != 0)
+            proba[(1.0 < proba) & (proba <= 1.0 + 1e-5)] = 1.0
+        return proba
+
+    def predict_proba(self, X):
+        """
+        Averaged ensemble class probabilities, as ``(rf + xgb) / 2``.
+
+        Args:
+            X (np.ndarray): Features, shape ``(n_samples, n_features)``.
+
+        Returns:
+            np.ndarray: Shape ``(n_samples, n_classes)``.
+        """
+        proba = self.transform_members(self.member_outputs(X))
+        return np.einsum("nmc,m->nc", proba, self.member_weight)
+
+    def contributions(self, X):
+        """
+        Split each member's raw output into per-feature contributions.
+
+        Every split on a row's path moves the expected output from the parent
+        node's mean to the child's; the change is credited to the parent's
+        split feature (Saabas path attribution, what xgboost computes for
+        ``approx_contribs=True``). All trees are walked together as in
+        ``leaves``, so ``bias + contributions.sum(axis=2)`` equals
+        ``member_outputs(X)``.
+
+        Args:
+            X (np.ndarray): Features, shape ``(n_samples, n_features)``.
+
+        Returns:
+            tuple: (contributions of shape ``(n_samples, n_members, n_features, n_classes)``,
+            bias of shape ``(n_members, n_classes)``).
+        """
+        Xf = np.ascontiguousarray(X, dtype=np.float32)
+        n_samples, n_features = Xf.shape
+        n_members, n_classes = len(self.member_kinds), self.n_classes
+        out = np.zeros((n_samples, n_members, n_features, n_classes))
+        classes = np.arange(n_classes)
+        for start in range(0, n_samples, CHUNK_ROWS):
+            chunk = Xf[start:start + CHUNK_ROWS]
+            n = len(chunk)
+            flat = chunk.ravel()
+            row_offset = (np.arange(n) * n_features)[:, None]
+            sums = np.zeros(n * n_members * n_features * n_classes)
+            for depth, trees, scalar in self.explain_groups:
+                # Offset of (row, member, feature 0) in ``sums``, per tree
+                slot = (np.arange(n)[:, None] * n_members + self.tree_member[trees]) * n_features
+                node = np.broadcast_to(self.roots[trees], (n, len(trees))).copy()
+                for _ in range(depth):
+                    feature = self.feature.take(node)
+                    child = self.left.take(node) + (flat.take(row_offset + feature) > self.threshold.take(node))
+                    if scalar:
+                        index = (slot + feature) * n_classes + self.tree_class[trees]
+                        delta = self.mean_scalar.take(child) - self.mean_scalar.take(node)
+                    else:
+                        index = ((slot + feature) * n_classes)[..., None] + classes
+                        delta = self.mean[child] - self.mean[node]
+                    sums += np.bincount(index.ravel(), delta.ravel(), minlength=len(sums))
+                    node = child
+            out[start:start + n] = sums.reshape(n, n_members, n_features, n_classes)
+
+        bias = self.base_margin.copy()
+        np.add.at(bias, self.tree_member, self.mean[self.roots])
+        return out, bias
+
+    def explain(self, X, target_class):
+        """
+        Per-feature contributions to the averaged ensemble probability of one class.
+
+        Raw-output contributions (``contributions``) are carried through each
+        member's softmax and calibration with integrated gradients along the
+        straight line from the member's bias to its output, rescaled so that
+        they add up exactly to the member's change in probability, and then
+        averaged with the members' ensemble weights.
+
+        Args:
+            X (np.ndarray): Features, shape ``(n_samples, n_features)``.
+            target_class (int): Class index to explain.
+
+        Returns:
+            tuple: (base value, contributions of shape ``(n_samples, n_features)``);
+            ``base + contributions.sum(axis=1)`` equals
+            ``predict_proba(X)[:, target_class]``.
+        """
+        contributions, bias = self.contributions(X)
+        n_samples, n_members, _, n_classes = contributions.shape
+        raw = bias + contributions.sum(axis=2)
+        path = bias + EXPLAIN_POINTS[:, None, None, None] * (raw - bias)
+
+        # Central differences of the target probability along each raw output,
+        # for every quadrature point, in one transform call
+        step = GRADIENT_STEP * np.eye(n_classes)[:, None, None, None, :]
+        points = np.stack([path + step, path - step])
+        probs = self.transform_members(points.reshape(-1, n_members, n_classes))[..., target_class]
+        probs = probs.reshape(2, n_classes, len(EXPLAIN_POINTS), n_samples, n_members)
+        gradient = np.einsum("kpnm,p->nmk", probs[0] - probs[1], EXPLAIN_WEIGHTS) / (2 * GRADIENT_STEP)
+        phi = np.einsum("nmfk,nmk->nmf", contributions, gradient)
+
+        base = self.transform_members(bias[None])[0, :, target_class]
+        change = self.transform_members(raw)[..., target_class] - base
+        total = phi.sum(axis=2)
+        scale = np.divide(change, total, out=np.ones_like(change), where=np.abs(total) > 1e-12)
+        phi *= scale[..., None]
+        return float(base @ self.member_weight), np.einsum("nmf,m->nf", phi, self.member_weight)
+
+    def supports(self, X):
+        """NaN inputs use library-specific missing-value routing; leave them to the libraries."""
+        return not np.isnan(X).any()
+
+def compile_ensemble(rf_model, xgb_model, n_features, probe=None):
+    """
+    Flatten the RandomForest and XGBoost models into a ``CompiledEnsemble``.
+
+    Args:
+        rf_model: Fitted RandomForestClassifier or CalibratedClassifierCV wrapping one.
+        xgb_model: Fitted XGBClassifier or CalibratedClassifierCV wrapping one.
+        n_features (int): Number of input features.
+        probe (np.ndarray, optional): Rows used for the parity self-check;
+            random rows are used when omitted.
+
+    Returns:
+        CompiledEnsemble: The compiled engine.
+
+    Raises:
+        UnsupportedModelError: If a model cannot be flattened or the engine
+            disagrees with the libraries on the probe rows.
+    """
+    n_classes = len(rf_model.classes_)
+    builder = _Builder(n_classes)
+    kinds, model_of, calibration, boosters = [], [], [], []
+
+    for model_idx, model in enumerate((rf_model, xgb_model)):
+        for estimator, cal in _members(model):
+            member = len(kinds)
+            if hasattr(estimator, "get_booster"):
+                _add_booster(builder, member, estimator)
+                kinds.append(KIND_SOFTMAX)
+                boosters.append((member, estimator))
+            else:
+                _add_forest(builder, member, estimator)
+                kinds.append(KIND_MEAN)
+            model_of.append(model_idx)
+            calibration.append(cal)
+
+    engine = CompiledEnsemble(builder, kinds, model_of, calibration, n_models=2)
+
+    if probe is None:
+        probe = np.random.default_rng(0).uniform(0, 50, size=(64, n_features))
+
+    # The base score's encoding varies across xgboost versions; recover it from
+    # the library's own margins instead of parsing it
+    if boosters:
+        raw = engine.member_outputs(probe)
+        for member, estimator in boosters:
+            margin = estimator.predict(probe, output_margin=True)
+            engine.base_margin[member] = (margin - raw[:, member]).mean(axis=0)
+
+    with model_registry.unnamed_features():
+        expected = (rf_model.predict_proba(probe) + xgb_model.predict_proba(probe)) / 2
+    diff = np.abs(engine.predict_proba(probe) - expected).max()
+    if diff > PARITY_TOLERANCE:
+        raise UnsupportedModelError(f"Compiled ensemble differs from the libraries by {diff:.2e}.")
+    logger.info(f"Compiled ensemble: {engine.n_trees} trees, {len(engine.threshold)} nodes, "
+                f"max depth {engine.max_depth}, probe max diff {diff:.2e}")
+    return engine
+
+# Engines by registry, so a hot-swapped model version gets its own and the
+# previous one is dropped with its registry
+_engines = weakref.WeakKeyDictionary()
+_engine_lock = threading.Lock()
+
+def get_engine(registry=None):
+    """
+    Return the compiled engine for a model registry, building it on first use.
+
+    Args:
+        registry (model_registry.ModelRegistry, optional): Registry whose
+            models to compile; the process-wide one when omitted.
+
+    Returns:
+        CompiledEnsemble or None: None if the models cannot be compiled, in
+        which case callers fall back to the libraries.
+    """
+    import model_registry
+    if registry is None:
+        registry = model_registry.registry
+    try:
+        return _engines[registry]
+    except KeyError:
+        pass
+    with _engine_lock:
+        if registry not in _engines:
+            from features import FEATURES
+            try:
+                _engines[registry] = compile_ensemble(registry.get("rf_model"), registry.get("xgb_model"), len(FEATURES))
+            except UnsupportedModelError as e:
+                logger.warning(f"Compiled inference backend unavailable for model version {registry.version}, "
+                               f"using sklearn/xgboost: {str(e)}")
+                _engines[registry] = None
+    return _engines[registry]
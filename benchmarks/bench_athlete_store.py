@@ -0,0 +1,162 @@
+"""
+Correctness and per-record cost of the athlete history store.
+
+Feeds synthetic training histories (daily records with rest days, some sent
+late and out of order) into a temporary ``athlete_store.AthleteStore`` and
+checks every athlete's incremental aggregates against a full recomputation
+from the stored records. About 1 record in 10 is then resent with another
+load, which must replace the stored one rather than add to it, and whose
+summary must be as of its own day. It then times ``add`` at growing history lengths
+to show that the per-record cost does not grow with the history, and
+compares one ``/predict``-style call with and without an ``Athlete_Id``.
+
+Usage:
+    python benchmarks/bench_athlete_store.py [--athletes 50] [--days 180]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+
+from synthetic import make_profiles
+from athlete_store import ACUTE_DECAY, ACUTE_DAYS, CHRONIC_DECAY, TREND_MIN_RECORDS, WINDOW_DAYS, AthleteStore
+
+START = date(2025, 1, 1).toordinal()
+
+def make_history(rng, athlete_id, profiles, days):
+    """Daily records with rest days; about 1 in 10 is sent up to 5 days late."""
+    records = []
+    for day in range(days):
+        if rng.random() < 0.2:
+            continue
+        record = dict(profiles[rng.randrange(len(profiles))], Athlete_Id=athlete_id,
+                      Record_Date=date.fromordinal(START + day).isoformat())
+        records.append((day + (rng.randint(1, 5) if rng.random() < 0.1 else 0), record))
+    return [record for _, record in sorted(records, key=lambda item: item[0])]
+
+def recompute(rows):
+    """
+    Aggregates of one athlete recomputed from all of its records.
+
+    Args:
+        rows (list): ``(day, load, fatigue)`` tuples.
+
+    Returns:
+        dict: Same keys as the store's summary values that are compared.
+    """
+    days = np.array([r[0] for r in rows])
+    loads = np.array([r[1] for r in rows])
+    last = days.max()
+    daily = np.bincount(days - days.min(), loads)
+    ewma = {}
+    for name, decay in (("ewma_acute_load", ACUTE_DECAY), ("ewma_chronic_load", CHRONIC_DECAY)):
+        value = 0.0
+        for load in daily:
+            value = decay * load + (1 - decay) * value
+        ewma[name] = value
+    window = days > last - WINDOW_DAYS
+    fatigue = np.array([r[2] for r in rows])[window]
+    trend = None
+    if len(fatigue) >= TREND_MIN_RECORDS and len(set(days[window])) > 1:
+        trend = np.polyfit(days[window], fatigue, 1)[0] * 7
+    return dict(ewma, acute_load_7d=loads[days > last - ACUTE_DAYS].sum(), chronic_load_28d=loads[window].sum(),
+                fatigue_mean_28d=fatigue.mean(), fatigue_trend=trend)
+
+def compare(athlete_id, summary, rows):
+    """Assert a summary matches ``recompute(rows)``; return the largest difference."""
+    worst = 0.0
+    for key, expected in recompute(rows).items():
+        if expected is None or summary[key] is None:
+            assert expected is None and summary[key] is None, f"{athlete_id} {key}: {summary[key]} vs {expected}"
+            continue
+        diff = abs(summary[key] - expected)
+        assert diff <= 1e-4, f"{athlete_id} {key}: {summary[key]} vs {expected}"
+        worst = max(worst, diff)
+    return worst
+
+def check(store, athlete_ids):
+    """
+    Compare every athlete's stored aggregates with a recomputation.
+
+    Returns:
+        float: Maximum absolute difference.
+
+    Raises:
+        AssertionError: If any aggregate differs by more than the summary's rounding.
+    """
+    connection = store._connect()
+    worst = 0.0
+    for athlete_id in athlete_ids:
+        rows = connection.execute("SELECT day, load, fatigue FROM records WHERE athlete_id = ?", (athlete_id,)).fetchall()
+        worst = max(worst, compare(athlete_id, store.summary(athlete_id), rows))
+    return worst
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--athletes", type=int, default=50)
+    parser.add_argument("--days", type=int, default=180)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    profiles = make_profiles(200, seed=8)
+    histories = [make_history(rng, f"athlete-{k}", profiles, args.days) for k in range(args.athletes)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AthleteStore(os.path.join(tmp, "athletes.sqlite3"))
+        # Interleave athletes day by day, as live traffic would
+        timings = {}
+        for step in range(max(len(h) for h in histories)):
+            for history in histories:
+                if step < len(history):
+                    start = time.perf_counter()
+                    store.add(history[step])
+                    timings.setdefault(step, []).append((time.perf_counter() - start) * 1000)
+        # Resent records replace the day's record (e.g. client retries, corrections)
+        resent = [dict(record, Training_Load_Score=rng.uniform(0, 100))
+                  for history in histories for record in rng.sample(history, len(history) // 10)]
+        connection = store._connect()
+        worst = 0.0
+        for record in resent:
+            # A backdated record's summary is as of its own day
+            summary = store.add(record)
+            rows = connection.execute("SELECT day, load, fatigue FROM records WHERE athlete_id = ? AND day <= ?",
+                                      (summary["athlete_id"], date.fromisoformat(summary["last_date"]).toordinal()))
+            worst = max(worst, compare(summary["athlete_id"], summary, rows.fetchall()))
+        total = sum(len(h) for h in histories)
+        stored = store._connect().execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        assert stored == total, f"{stored} records stored for {total} athlete-days"
+        worst = max(worst, check(store, [f"athlete-{k}" for k in range(args.athletes)]))
+        print(f"{total} records for {args.athletes} athletes, {len(resent)} resent; aggregates match "
+              f"a full recomputation (max diff {worst:.1e})")
+
+        print(f"{'history length':>15} {'add p50 ms':>11} {'add p95 ms':>11}")
+        for lo, hi in ((0, 10), (40, 50), (90, 100), (130, 140)):
+            samples = [t for step in range(lo, hi) for t in timings.get(step, [])]
+            if samples:
+                p50, p95 = np.percentile(samples, [50, 95])
+                print(f"{f'{lo}-{hi}':>15} {p50:11.3f} {p95:11.3f}")
+        store.close()
+
+    # End-to-end cost of the history step in predict_injury_risk
+    import predict
+    predict.PREDICTION_CACHE_SIZE = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        predict.athlete_store = AthleteStore(os.path.join(tmp, "athletes.sqlite3"))
+        athlete = make_profiles(1, seed=9)[0]
+        predict.predict_injury_risk(athlete)
+        for label, record in (("without Athlete_Id", athlete), ("with Athlete_Id", dict(athlete, Athlete_Id="a1"))):
+            times = []
+            for _ in range(50):
+                start = time.perf_counter()
+                predict.predict_injury_risk(record)
+                times.append((time.perf_counter() - start) * 1000)
+            print(f"predict_injury_risk {label:<20} p50 {np.median(times):7.2f} ms")
+        predict.athlete_store.close()
+
+if __name__ == "__main__":
+    main()
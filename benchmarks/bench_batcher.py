@@ -0,0 +1,130 @@
+"""
+Throughput/latency trade-off of micro-batching for ``predict_injury_risk``.
+
+Checks that batched predictions equal unbatched ones, then runs a closed-loop
+load generator (``--clients`` threads calling ``predict_injury_risk`` back to
+back, prediction cache off) without batching and with each batching window in
+``--windows``, reporting requests/s, latency percentiles and mean batch size.
+
+Usage:
+    python benchmarks/bench_batcher.py [--clients 32] [--seconds 5]
+        [--windows 0 1 2 5 10] [--max-batch 32]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from synthetic import make_profiles
+import predict
+from batcher import MicroBatcher
+
+def use_batching(window_ms, max_batch):
+    """
+    Switch ``predict`` to micro-batching with the given window (None turns it off).
+
+    Args:
+        window_ms (float or None): Batching window in milliseconds.
+        max_batch (int): Maximum batch size.
+    """
+    if predict._batcher is not None and predict._batcher_pid == os.getpid():
+        predict._batcher.close()
+    predict._batcher = None
+    predict.MICRO_BATCHING = window_ms is not None
+    if window_ms is not None:
+        predict._batcher = MicroBatcher(predict._score_rows, max_batch_size=max_batch, max_wait_ms=window_ms,
+                                        max_queue=predict.BATCH_MAX_QUEUE, name="predict_batcher")
+        predict._batcher_pid = os.getpid()
+
+def check_consistency(records, max_batch):
+    """
+    Compare batched and unbatched predictions.
+
+    Args:
+        records (list): Raw input records.
+        max_batch (int): Maximum batch size.
+
+    Raises:
+        AssertionError: If any response differs.
+    """
+    use_batching(None, max_batch)
+    expected = [predict.predict_injury_risk(r) for r in records]
+    use_batching(5.0, max_batch)
+    actual = [None] * len(records)
+
+    def worker(offset):
+        for i in range(offset, len(records), 16):
+            actual[i] = predict.predict_injury_risk(records[i])
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert json.dumps(expected) == json.dumps(actual), "batched predictions differ"
+
+def run_load(records, clients, seconds):
+    """
+    Closed-loop load: each client sends its next request as soon as the previous one returns.
+
+    Args:
+        records (list): Raw input records to cycle through.
+        clients (int): Concurrent client threads.
+        seconds (float): Test duration.
+
+    Returns:
+        tuple: (latencies in ms, requests per second).
+    """
+    latencies = [[] for _ in range(clients)]
+    stop = time.perf_counter() + seconds
+
+    def client(k):
+        i = k
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            predict.predict_injury_risk(records[i % len(records)])
+            latencies[k].append((time.perf_counter() - start) * 1000)
+            i += clients
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(k,)) for k in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    flat = [ms for per_client in latencies for ms in per_client]
+    return flat, len(flat) / wall
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 1, 2, 5, 10], help="batching windows in ms")
+    parser.add_argument("--max-batch", type=int, default=32)
+    args = parser.parse_args()
+
+    predict.PREDICTION_CACHE_SIZE = 0
+    records = make_profiles(5000)
+    predict.predict_injury_risk(records[0])  # load models
+    check_consistency(records[:500], args.max_batch)
+    print("Batched and unbatched predictions match")
+
+    print(f"{args.clients} clients, {args.seconds:.0f}s per setting, backend={predict.INFERENCE_BACKEND}")
+    print(f"{'window':>10} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean batch':>11}")
+    for window in [None] + args.windows:
+        use_batching(window, args.max_batch)
+        latencies, rps = run_load(records, args.clients, args.seconds)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        stats = predict.batcher_stats()
+        label = "off" if window is None else f"{window:g} ms"
+        mean_batch = f"{stats['mean_batch_size']:.1f}" if stats else "1.0"
+        print(f"{label:>10} {rps:9.1f} {p50:8.2f} {p95:8.2f} {p99:8.2f} {mean_batch:>11}")
+    use_batching(None, args.max_batch)
+
+if __name__ == "__main__":
+    main()
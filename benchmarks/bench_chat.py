@@ -0,0 +1,100 @@
+"""
+Concurrent load test of ``/chat`` against the local mock LLM backend.
+
+Starts ``mock_llm_server`` and the Flask app (threaded) in-process, fires
+``--requests`` general questions from ``--concurrency`` client threads and
+reports throughput, latency percentiles, status codes (503 = fast-failed at
+the concurrency limit), how many upstream connections were opened and how
+many questions the answer cache and request coalescing absorbed. Use
+``--distinct`` to cycle through a few questions, as real traffic does.
+
+Usage:
+    python benchmarks/bench_chat.py [--requests 400] [--concurrency 16]
+        [--llm-concurrency 8] [--latency-ms 200] [--read-timeout 20] [--distinct 0]
+"""
+
+import argparse
+import collections
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from werkzeug.serving import make_server
+
+from mock_llm_server import start_server
+from synthetic import API_DIR  # noqa: F401  (puts api/ on sys.path)
+
+def run_load(url, n_requests, concurrency, distinct=0):
+    """
+    Send chat requests concurrently.
+
+    Args:
+        url (str): ``/chat`` URL.
+        n_requests (int): Total requests.
+        concurrency (int): Client threads.
+        distinct (int): Number of distinct questions to cycle through; 0 makes every question unique.
+
+    Returns:
+        tuple: (latencies in ms, Counter of status codes, wall time in seconds).
+    """
+    local = threading.local()
+
+    def one(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        response = session.post(url, json={"message": f"how do shin splints happen? #{i % distinct if distinct else i}"})
+        return (time.perf_counter() - start) * 1000, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(one, range(n_requests)))
+    wall = time.perf_counter() - start
+    return [ms for ms, _ in results], collections.Counter(code for _, code in results), wall
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16, help="client threads")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="LLM_MAX_CONCURRENCY")
+    parser.add_argument("--queue-timeout", type=float, default=0.0, help="LLM_QUEUE_TIMEOUT")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="mock upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--read-timeout", type=float, default=20.0, help="LLM_READ_TIMEOUT")
+    parser.add_argument("--distinct", type=int, default=0, help="distinct questions (0 = all unique)")
+    args = parser.parse_args()
+
+    mock = start_server(0, args.latency_ms, args.jitter_ms)
+    os.environ["COHERE_API_URL"] = f"http://127.0.0.1:{mock.server_address[1]}/v1/generate"
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.llm_concurrency)
+    os.environ["LLM_QUEUE_TIMEOUT"] = str(args.queue_timeout)
+    os.environ["LLM_READ_TIMEOUT"] = str(args.read_timeout)
+    from app import app, chat_cache, chat_flights, llm
+    for name in ("", "werkzeug"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/chat"
+
+    latencies, codes, wall = run_load(url, args.requests, args.concurrency, args.distinct)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{args.requests} requests, {args.concurrency} clients, LLM_MAX_CONCURRENCY={args.llm_concurrency}, "
+          f"upstream {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms")
+    print(f"throughput: {args.requests / wall:8.1f} req/s ({codes.get(200, 0) / wall:.1f} answered/s)")
+    print(f"latency ms: p50 {p50:.1f}  p95 {p95:.1f}  p99 {p99:.1f}")
+    print(f"status codes: {dict(sorted(codes.items()))}")
+    print(f"upstream: {mock.requests} requests over {mock.connections} connections")
+    print(f"client stats: {llm.stats()}")
+    print(f"chat cache: {dict(chat_cache.stats(), **chat_flights.stats())}")
+
+    server.shutdown()
+    mock.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Correctness and latency budget of per-feature explanations.
+
+Checks on held-out synthetic profiles that:
+
+- the raw per-member contributions (``CompiledEnsemble.contributions``) add
+  up to each member's output, and that the XGBoost members' contributions
+  match xgboost's own Saabas attribution (``pred_contribs=True,
+  approx_contribs=True``);
+- every explanation adds up to the averaged RF + XGBoost "High" probability
+  of the libraries, to within ``tree_engine.PARITY_TOLERANCE``.
+
+It then times ``predict.explain_features`` for single rows and batches and
+exits with status 1 if the single-explanation p95 exceeds ``--budget-ms``.
+
+Usage:
+    python benchmarks/bench_explain.py [--n 1000] [--budget-ms 5] [--batch-sizes 32 256 1024]
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import xgboost
+
+from synthetic import make_profiles
+import model_registry
+import predict
+import tree_engine
+from features import encode_records
+
+def check_members(engine, X):
+    """
+    Check the raw per-member contributions.
+
+    Args:
+        engine (tree_engine.CompiledEnsemble): Compiled engine.
+        X (np.ndarray): Held-out feature rows.
+
+    Returns:
+        tuple: (max local-accuracy error, max difference from xgboost's contributions).
+
+    Raises:
+        AssertionError: If either exceeds ``tree_engine.PARITY_TOLERANCE``.
+    """
+    contributions, bias = engine.contributions(X)
+    local = np.abs(bias + contributions.sum(axis=2) - engine.member_outputs(X)).max()
+    assert local <= tree_engine.PARITY_TOLERANCE, f"contributions do not add up to member outputs ({local:.2e})"
+
+    xgb_diff = 0.0
+    boosters = [estimator for estimator, _ in tree_engine._members(model_registry.get("xgb_model"))]
+    for member, estimator in zip(np.flatnonzero(engine.member_kinds == tree_engine.KIND_SOFTMAX), boosters):
+        # (rows, classes, features + bias) -> (rows, features, classes)
+        booster = estimator.get_booster()
+        expected = booster.predict(xgboost.DMatrix(X, feature_names=booster.feature_names),
+                                   pred_contribs=True, approx_contribs=True)
+        xgb_diff = max(xgb_diff, np.abs(contributions[:, member] - expected[:, :, :-1].transpose(0, 2, 1)).max())
+    assert xgb_diff <= tree_engine.PARITY_TOLERANCE, f"XGBoost contributions differ by {xgb_diff:.2e}"
+    return local, xgb_diff
+
+def check_explanations(X):
+    """
+    Check that explanations add up to the libraries' "High" probability.
+
+    Args:
+        X (np.ndarray): Held-out feature rows.
+
+    Returns:
+        float: Maximum absolute difference.
+
+    Raises:
+        AssertionError: If it exceeds ``tree_engine.PARITY_TOLERANCE``.
+    """
+    high = list(model_registry.get("rf_encoder").classes_).index(predict.EXPLAIN_CLASS)
+    expected = (model_registry.get("rf_model").predict_proba(X) + model_registry.get("xgb_model").predict_proba(X)) / 2
+    explanations = predict.explain_features(X)
+    totals = np.array([e["base_value"] + sum(e["contributions"].values()) for e in explanations])
+    diff = np.abs(totals - expected[:, high]).max()
+    assert diff <= tree_engine.PARITY_TOLERANCE, f"explanations differ from the ensemble probability by {diff:.2e}"
+    return diff
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=1000, help="held-out rows for the checks and single-row timings")
+    parser.add_argument("--budget-ms", type=float, default=5.0, help="p95 budget for one explanation")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[32, 256, 1024])
+    parser.add_argument("--repeat", type=int, default=5, help="timed calls per batch size")
+    args = parser.parse_args()
+
+    X = encode_records(make_profiles(max(args.n, max(args.batch_sizes)), seed=77))
+    engine = tree_engine.get_engine()
+    if engine is None:
+        sys.exit("The models could not be compiled; explanations are unavailable.")
+
+    local, xgb_diff = check_members(engine, X[:args.n])
+    print(f"Member contributions OK on {args.n} rows (local accuracy {local:.1e}, vs xgboost approx_contribs {xgb_diff:.1e})")
+    diff = check_explanations(X[:args.n])
+    print(f"Explanations add up to the ensemble High probability (max |dp| = {diff:.1e})")
+
+    samples = []
+    for i in range(args.n):
+        start = time.perf_counter()
+        predict.explain_features(X[i:i + 1])
+        samples.append((time.perf_counter() - start) * 1000)
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    print(f"single explanation: p50 {p50:.2f} ms, p95 {p95:.2f} ms, p99 {p99:.2f} ms (budget p95 {args.budget_ms} ms)")
+
+    for size in args.batch_sizes:
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            predict.explain_features(X[:size])
+            times.append(time.perf_counter() - start)
+        ms = float(np.median(times)) * 1000
+        print(f"batch {size:>5}: {ms:8.1f} ms ({ms / size * 1000:6.0f} us/row)")
+
+    if p95 > args.budget_ms:
+        print(f"FAIL: single-explanation p95 {p95:.2f} ms exceeds the {args.budget_ms} ms budget")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
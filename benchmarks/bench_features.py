@@ -0,0 +1,130 @@
+"""
+Parity check and timing for the schema-driven feature pipeline.
+
+Verifies that ``features.encode_records`` and ``features.encode_frame`` are
+bit-identical to the pandas preprocessing of the notebooks (kept below as the
+reference), that imputation matches the old ``df.median()`` fill, and
+compares per-record latency.
+
+Usage:
+    python benchmarks/bench_features.py [--n 2000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from synthetic import make_profiles
+from features import (
+    FEATURES, FeaturePipeline, encode_frame, encode_record, encode_records,
+    gender_mapping, experience_mapping, injury_type_mapping, sport_type_mapping
+)
+from preprocessing import preprocess_data as preprocess_frame
+
+def preprocess_data(data_dict):
+    """Pandas reference encoding of one record (as in CalibrateLikelihood.ipynb)."""
+    df = pd.DataFrame([data_dict])
+    df["Gender"] = df["Gender"].map(gender_mapping).fillna(0).astype(int)
+    df["Sport_Type"] = df["Sport_Type"].map(sport_type_mapping).fillna(0).astype(int)
+    df["Experience_Level"] = df["Experience_Level"].map(experience_mapping).fillna(0).astype(int)
+    df["Previous_Injury_Type"] = df["Previous_Injury_Type"].fillna("None")
+    df["Previous_Injury_Type"] = df["Previous_Injury_Type"].map(injury_type_mapping).fillna(0).astype(int)
+    df["Total_Weekly_Training_Hours"] = df["Total_Weekly_Training_Hours"].replace(0, 0.1)
+    df["Intensity_Ratio"] = df["High_Intensity_Training_Hours"] / df["Total_Weekly_Training_Hours"]
+    df["Recovery_Per_Training"] = df["Recovery_Time_Between_Sessions"] / df["Total_Weekly_Training_Hours"]
+    return df[FEATURES]
+
+def check_parity(records):
+    """
+    Compare the encoders against the pandas path record by record.
+
+    Args:
+        records (list): Raw input records.
+
+    Raises:
+        AssertionError: If any encoded value differs bit-for-bit.
+    """
+    expected = np.vstack([preprocess_data(r).to_numpy(dtype=np.float64) for r in records])
+    actual = encode_records(records)
+    assert list(preprocess_data(records[0]).columns) == FEATURES
+    assert actual.flags["C_CONTIGUOUS"]
+    assert np.array_equal(expected.view(np.uint64), actual.view(np.uint64)), "float64 encoding differs"
+    assert np.array_equal(expected.astype(np.float32), encode_records(records, dtype=np.float32)), "float32 encoding differs"
+
+    # Edge cases: zero training hours, unknown categories, missing injury type
+    edge = dict(records[0], Total_Weekly_Training_Hours=0, Gender="Other", Sport_Type=1, Previous_Injury_Type=None)
+    assert np.array_equal(preprocess_data(edge).to_numpy(dtype=np.float64), encode_record(edge))
+
+    # DataFrame chunks, raw and pre-encoded
+    frame = pd.DataFrame(records)
+    assert np.array_equal(expected.view(np.uint64), encode_frame(frame).view(np.uint64)), "encode_frame differs"
+    encoded = pd.DataFrame(expected[:, :16], columns=FEATURES[:16])
+    assert np.array_equal(expected, encode_frame(encoded, encoded=True)), "encoded encode_frame differs"
+
+def check_imputation(records):
+    """
+    Check imputation against the old ``df.fillna(df.median())`` preprocessing.
+
+    Args:
+        records (list): Raw input records.
+
+    Raises:
+        AssertionError: If imputed values differ.
+    """
+    encoded = pd.DataFrame(encode_records(records)[:, :16], columns=FEATURES[:16])
+    rng = np.random.default_rng(0)
+    holes = encoded.mask(rng.random(encoded.shape) < 0.1)
+
+    # Batch-median fallback (no imputation artifact)
+    reference = holes.fillna(holes.median())
+    reference["Total_Weekly_Training_Hours"] = reference["Total_Weekly_Training_Hours"].replace(0, 0.1)
+    reference["Intensity_Ratio"] = reference["High_Intensity_Training_Hours"] / reference["Total_Weekly_Training_Hours"]
+    reference["Recovery_Per_Training"] = reference["Recovery_Time_Between_Sessions"] / reference["Total_Weekly_Training_Hours"]
+    no_stats = FeaturePipeline(imputation_stats={})
+    assert np.allclose(reference.to_numpy(), no_stats.encode_frame(holes, encoded=True, impute=True), rtol=0, atol=1e-12)
+
+    # Persisted medians fitted on the complete data are used instead of the batch's
+    stats = no_stats.fit_imputation_stats(encoded.to_numpy())
+    with_stats = FeaturePipeline(imputation_stats=stats)
+    X = with_stats.encode_frame(holes, encoded=True, impute=True)
+    mask = holes.isna().to_numpy()
+    medians = np.array([stats["medians"][f] for f in FEATURES[:16]])
+    assert np.array_equal(X[:, :16][mask], np.broadcast_to(medians, mask.shape)[mask])
+
+    # Record path: missing and null fields
+    sparse = [{k: v for k, v in r.items() if rng.random() > 0.1} for r in records[:200]]
+    assert np.array_equal(with_stats.encode_records(sparse, impute=True),
+                          with_stats.encode_frame(pd.DataFrame(sparse, columns=FEATURES[:16]), impute=True))
+
+def time_per_record(fn, records):
+    start = time.perf_counter()
+    for r in records:
+        fn(r)
+    return (time.perf_counter() - start) / len(records) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=2000, help="number of synthetic records")
+    args = parser.parse_args()
+
+    records = make_profiles(args.n)
+    check_parity(records)
+    check_imputation(records)
+    assert np.allclose(preprocess_frame(pd.DataFrame(encode_records(records)[:, :16], columns=FEATURES[:16])),
+                       encode_records(records))
+    print(f"Parity OK on {len(records)} records")
+
+    print(f"pandas preprocess_data: {time_per_record(preprocess_data, records):8.1f} us/record")
+    print(f"encode_record:          {time_per_record(encode_record, records):8.1f} us/record")
+    start = time.perf_counter()
+    encode_records(records)
+    print(f"encode_records (batch): {(time.perf_counter() - start) / len(records) * 1e6:8.2f} us/record")
+    frame = pd.DataFrame(records)
+    start = time.perf_counter()
+    encode_frame(frame)
+    print(f"encode_frame (chunk):   {(time.perf_counter() - start) / len(records) * 1e6:8.2f} us/record")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Hot reload under load: atomic swap, integrity check and shadow scoring.
+
+Copies ``model/`` into two bundles (the second with a shifted Low-risk
+threshold, so the versions disagree on some athletes), serves the first, and
+while client threads keep calling ``predict_injury_risk``:
+
+1. swaps in the second bundle, checking that no request fails, that every
+   response matches exactly one of the two versions and that every request
+   started after ``reload`` returned is served by the second;
+2. reloads a copy whose calibrator was altered after its manifest was written,
+   which must be rejected while the current version keeps serving;
+3. runs the first bundle as a shadow, reports its agreement on live traffic
+   and promotes it.
+
+Usage:
+    python benchmarks/bench_hot_reload.py [--threads 4] [--seconds 2]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import joblib
+import numpy as np
+
+from synthetic import make_profiles
+from features import encode_record
+import hot_reload
+import model_bundle
+import model_registry
+import predict
+from model_registry import ModelRegistry
+
+def make_bundles(root):
+    """Write two versions of the shipped model into ``root``; return their directories."""
+    first, second = os.path.join(root, "v1"), os.path.join(root, "v2")
+    shutil.copytree(model_registry.MODEL_DIR, first, ignore=shutil.ignore_patterns("manifest.json"))
+    shutil.copytree(first, second)
+    threshold = joblib.load(os.path.join(first, "calibration_threshold.pkl"))
+    joblib.dump(float(threshold) * 0.9, os.path.join(second, "calibration_threshold.pkl"))
+    model_bundle.write_manifest(first, "v1")
+    model_bundle.write_manifest(second, "v2")
+    return first, second
+
+def expected_outputs(model_dir, athletes):
+    """Return (label, likelihood) per athlete as scored by one bundle."""
+    registry = ModelRegistry(model_dir)
+    X = np.vstack([encode_record(athlete) for athlete in athletes])
+    _, labels, likelihoods = predict._score(X, registry, observe=False)
+    return [(label, round(float(likelihood), 2)) for label, likelihood in zip(labels, likelihoods)]
+
+class Load:
+    """
+    Client threads calling ``predict_injury_risk`` until stopped.
+
+    Each result is ``(phase, index, label, likelihood)`` where ``phase`` is
+    the number of ``next_phase`` calls made before the request started.
+    """
+
+    def __init__(self, athletes, threads):
+        self.athletes = athletes
+        self.phase = 0
+        self.results = []
+        self.errors = []
+        self.latencies = []
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._run, args=(i,)) for i in range(threads)]
+
+    def _run(self, offset):
+        i = offset
+        while not self._stop.is_set():
+            index = i % len(self.athletes)
+            phase = self.phase
+            start = time.perf_counter()
+            try:
+                result = predict.predict_injury_risk(self.athletes[index])
+                self.results.append((phase, index, result["predicted_risk_level"], result["injury_likelihood_percent"]))
+            except Exception as e:
+                self.errors.append(str(e))
+            self.latencies.append(time.perf_counter() - start)
+            i += 1
+
+    def next_phase(self):
+        """Tag the requests started from now on with the next phase."""
+        self.phase += 1
+
+    def __enter__(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+def p99_ms(latencies):
+    return np.percentile(latencies, 99) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=4, help="client threads")
+    parser.add_argument("--seconds", type=float, default=2.0, help="load before and after each step")
+    args = parser.parse_args()
+
+    predict.PREDICTION_CACHE_SIZE = 0
+    athletes = make_profiles(200, seed=19)
+    root = tempfile.mkdtemp()
+    try:
+        first, second = make_bundles(root)
+        expected = {"v1": expected_outputs(first, athletes), "v2": expected_outputs(second, athletes)}
+        changed = sum(a != b for a, b in zip(expected["v1"], expected["v2"]))
+        print(f"Bundles v1, v2 written; they disagree on {changed}/{len(athletes)} athletes")
+
+        reloader = hot_reload.ModelReloader(first, watch_interval=0)
+        model_registry.swap(ModelRegistry(first))
+        model_registry.registry.preload(freeze=False)
+
+        # 1. Swap under load
+        with Load(athletes, args.threads) as load:
+            time.sleep(args.seconds)
+            before = len(load.latencies)
+            report = reloader.reload(second)
+            load.next_phase()
+            time.sleep(args.seconds)
+        assert report["status"] == "swapped", report
+        assert not load.errors, load.errors[:3]
+        allowed = {(i, *expected["v1"][i]) for i in range(len(athletes))} | \
+                  {(i, *expected["v2"][i]) for i in range(len(athletes))}
+        mismatched = [r for r in load.results if r[1:] not in allowed]
+        assert not mismatched, mismatched[:3]
+        # Requests started once reload() returned must all be served by v2
+        after = [r[1:] for r in load.results if r[0] == 1]
+        assert after, "no requests started after the swap"
+        assert all(r == (r[0], *expected["v2"][r[0]]) for r in after), "requests after the swap still use v1"
+        print(f"Swap under load OK: {len(load.results)} requests, 0 errors, reload {report['seconds']}s, "
+              f"canary {report['validation']['canary_rows']} + live {report['validation'].get('live_rows', 0)} rows, "
+              f"p99 {p99_ms(load.latencies[:before]):.1f} ms before / {p99_ms(load.latencies[before:]):.1f} ms during+after")
+
+        # 2. Tampered artifact
+        tampered = os.path.join(root, "tampered")
+        shutil.copytree(first, tampered)
+        with open(os.path.join(tampered, "likelihood_calibrator.pkl"), "ab") as f:
+            f.write(b"\0")
+        report = reloader.reload(tampered)
+        assert report["status"] == "failed" and model_registry.registry.version == "v2", report
+        print(f"Tampered bundle rejected: {report['error']}")
+
+        # 3. Shadow, then promote
+        report = reloader.reload(first, mode="shadow")
+        assert report["status"] == "shadowing", report
+        with Load(athletes, args.threads) as load:
+            time.sleep(args.seconds)
+        time.sleep(1.0)
+        stats = reloader.promote()
+        assert not load.errors and model_registry.registry.version == "v1"
+        assert stats["rows"] > 0 and predict.shadow is None
+        print(f"Shadow v1 vs v2: {stats['rows']} rows, label agreement {stats['label_agreement']}, "
+              f"max |dlikelihood| {stats['max_likelihood_diff']}, dropped {stats['dropped_rows']}, "
+              f"transitions {stats['transitions']}; promoted to {model_registry.registry.version}")
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == "__main__":
+    main()
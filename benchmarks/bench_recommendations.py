@@ -0,0 +1,74 @@
+"""
+Consistency check and timing for the recommendation rule engine.
+
+Verifies that ``generate_recommendations_batch`` returns exactly what
+``generate_recommendations`` returns per record (including string-coded and
+missing fields) and times a roster both ways.
+
+Usage:
+    python benchmarks/bench_recommendations.py [--n 10000]
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from synthetic import make_profiles
+from recommendation import DEFAULTS, evaluate_rules, generate_recommendations, generate_recommendations_batch
+
+def check_consistency(records, seed=0):
+    """
+    Compare the batch engine with the per-record path.
+
+    Args:
+        records (list): Raw input records (copied and perturbed here).
+        seed (int): Seed for the perturbations.
+
+    Raises:
+        AssertionError: If any record's recommendations differ.
+    """
+    rng = random.Random(seed)
+    mixed = []
+    for r in records:
+        r = {k: v for k, v in r.items() if rng.random() > 0.05}
+        if rng.random() < 0.2:
+            r["Gender"] = rng.choice(["Male", "Female", 0, 1])
+        if rng.random() < 0.2:
+            r["Sport_Type"] = rng.choice(["Football", "Running", 0, 3])
+        mixed.append(r)
+    assert generate_recommendations_batch(mixed) == [generate_recommendations(r) for r in mixed]
+
+    def strip(recs):
+        return [[(d["text"], d["category"], round(d["priority"], 12)) for d in rs] for rs in recs]
+    assert strip(generate_recommendations_batch(mixed, rich=True)) == \
+        strip([generate_recommendations(r, rich=True) for r in mixed]), "rich output differs"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=10000, help="roster size")
+    args = parser.parse_args()
+
+    records = make_profiles(args.n)
+    check_consistency(records[:2000])
+    print("Batch and per-record recommendations match")
+
+    start = time.perf_counter()
+    for r in records:
+        generate_recommendations(r)
+    print(f"generate_recommendations loop:  {(time.perf_counter() - start) * 1000:8.1f} ms for {args.n} athletes")
+
+    start = time.perf_counter()
+    generate_recommendations_batch(records)
+    print(f"generate_recommendations_batch: {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+    # Pre-built numeric columns; string-coded values never match a rule
+    columns = {name: np.array([v if isinstance(v, (int, float)) else np.nan for v in (r.get(name, d) for r in records)])
+               for name, d in DEFAULTS.items()}
+    start = time.perf_counter()
+    evaluate_rules(columns)
+    print(f"evaluate_rules (columns):       {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Parity check and timing for the what-if sensitivity grid.
+
+Checks that every point of ``predict.predict_sensitivity`` equals a separate
+``predict_injury_risk`` call on the correspondingly modified athlete, then
+compares the latency of one grid call with one ``predict_injury_risk`` call
+per grid point (what the report page would otherwise send as requests).
+
+Usage:
+    python benchmarks/bench_sensitivity.py [--athletes 5]
+"""
+
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+from synthetic import make_profiles
+import predict
+
+GRID = {
+    "Fatigue_Level": {"start": 1, "stop": 10, "steps": 10},
+    "Recovery_Time_Between_Sessions": [0, 6, 12, 18, 24, 36, 48, 72],
+    "High_Intensity_Training_Hours": {"start": 0, "stop": 12, "steps": 5},
+}
+
+def perturbed(athlete, surface):
+    """Return the modified athletes of a grid response, in grid order."""
+    fields = [axis["feature"] for axis in surface["axes"]]
+    combos = itertools.product(*(axis["values"] for axis in surface["axes"]))
+    return [dict(athlete, **dict(zip(fields, combo))) for combo in combos]
+
+def check_parity(athlete, grid):
+    """
+    Compare every grid point with a single-athlete prediction.
+
+    Args:
+        athlete (dict): Raw input record.
+        grid (dict): Sensitivity grid.
+
+    Returns:
+        dict: The grid response.
+
+    Raises:
+        AssertionError: If any point differs.
+    """
+    surface = predict.predict_sensitivity(athlete, grid)
+    singles = [predict.predict_injury_risk(variant) for variant in perturbed(athlete, surface)]
+    baseline = predict.predict_injury_risk(athlete)
+    for key in ("predicted_risk_level", "injury_likelihood_percent", "model_class_probability"):
+        flat = np.asarray(surface[key]).ravel().tolist()
+        assert flat == [single[key] for single in singles], f"{key} differs from single predictions"
+        assert surface["baseline"][key] == baseline[key], f"baseline {key} differs"
+    return surface
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--athletes", type=int, default=5, help="athletes to check and time")
+    args = parser.parse_args()
+
+    predict.PREDICTION_CACHE_SIZE = 0
+    athletes = make_profiles(args.athletes, seed=11)
+    predict.predict_injury_risk(athletes[0])  # load models
+
+    for athlete in athletes:
+        surface = check_parity(athlete, GRID)
+    points = int(np.prod(surface["shape"]))
+    print(f"Parity OK: {args.athletes} athletes x {points} grid points {surface['shape']}")
+
+    grid_ms, loop_ms = [], []
+    for athlete in athletes:
+        start = time.perf_counter()
+        surface = predict.predict_sensitivity(athlete, GRID)
+        grid_ms.append((time.perf_counter() - start) * 1000)
+        variants = perturbed(athlete, surface)
+        start = time.perf_counter()
+        for variant in variants:
+            predict.predict_injury_risk(variant)
+        loop_ms.append((time.perf_counter() - start) * 1000)
+
+    print(f"backend={predict.INFERENCE_BACKEND}")
+    print(f"predict_sensitivity, {points} points: {np.median(grid_ms):9.1f} ms")
+    print(f"predict_injury_risk x {points}:       {np.median(loop_ms):9.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Throughput of the production server (``api/serve.py``) against the debug server.
+
+Starts each server as a subprocess on a free port, waits for ``/readyz``,
+sends ``--requests`` ``/predict`` calls from ``--clients`` concurrent
+keep-alive clients (prediction cache off) and reports requests/s, latency
+percentiles and errors. Each server is then stopped with SIGTERM while
+clients are waiting for responses, counting the requests that still complete
+and those the shutdown drops. Linux/macOS only.
+
+Servers:
+    debug:    ``python app.py`` (Flask development server, debugger and reloader)
+    werkzeug: ``serve.py --server werkzeug`` (single process, threaded)
+    gunicorn: ``serve.py --workers W --threads T`` for each ``--workers`` value
+
+Usage:
+    python benchmarks/bench_serving.py [--clients 16] [--requests 2000]
+        [--workers 1 2 4] [--threads 4]
+"""
+
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from synthetic import API_DIR, make_profiles
+from run_suite import load_test
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start(command, port, ready_timeout=60.0):
+    """
+    Start a server subprocess and wait until ``/readyz`` answers 200.
+
+    Args:
+        command (list): Arguments after the Python interpreter.
+        port (int): Port the server listens on.
+        ready_timeout (float): Seconds to wait for readiness.
+
+    Returns:
+        subprocess.Popen: The server process (leader of its own process group).
+    """
+    env = dict(os.environ, PORT=str(port), PREDICTION_CACHE_SIZE="0", LOG_LEVEL="WARNING")
+    process = subprocess.Popen([sys.executable, "-W", "ignore"] + command, cwd=API_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.monotonic() + ready_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}: {' '.join(command)}")
+        try:
+            # The debug server loads models lazily; one prediction makes it ready
+            if requests.get(f"http://127.0.0.1:{port}/readyz", timeout=1).status_code == 200:
+                return process
+            requests.post(f"http://127.0.0.1:{port}/predict", json=make_profiles(1)[0], timeout=30)
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    stop(process)
+    raise RuntimeError(f"Server not ready after {ready_timeout}s: {' '.join(command)}")
+
+def stop(process, timeout=30.0):
+    """Send SIGTERM to the server's process group and wait for it to exit."""
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+def shutdown_under_load(process, url, payloads, clients, delay=0.5):
+    """
+    Send SIGTERM to the server while clients are waiting for responses.
+
+    Clients stop sending new requests when the signal goes out, so every
+    failure is a request that was already sent (in flight or waiting to be
+    accepted) and was dropped by the shutdown.
+
+    Args:
+        process (subprocess.Popen): Server process.
+        url (str): Endpoint URL.
+        payloads (list): JSON bodies to cycle through.
+        clients (int): Concurrent client threads.
+        delay (float): Seconds of load before the signal.
+
+    Returns:
+        dict: Counts of ``completed`` and ``dropped`` requests sent before the signal.
+    """
+    counts = {"completed": 0, "dropped": 0}
+    lock = threading.Lock()
+    signalled = threading.Event()
+
+    def client(k):
+        i = k
+        while not signalled.is_set():
+            try:
+                ok = requests.post(url, json=payloads[i % len(payloads)], timeout=60).status_code == 200
+            except requests.RequestException:
+                ok = False
+            with lock:
+                counts["completed" if ok else "dropped"] += 1
+            i += clients
+
+    threads = [threading.Thread(target=client, args=(k,)) for k in range(clients)]
+    for t in threads:
+        t.start()
+    time.sleep(delay)
+    signalled.set()
+    stop(process)
+    for t in threads:
+        t.join()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="gunicorn worker counts")
+    parser.add_argument("--threads", type=int, default=4, help="threads per gunicorn worker")
+    args = parser.parse_args()
+
+    servers = [("debug", ["app.py"]), ("werkzeug", ["serve.py", "--server", "werkzeug"])]
+    try:
+        import gunicorn  # noqa: F401
+        servers += [(f"gunicorn {w}x{args.threads}",
+                     ["serve.py", "--server", "gunicorn", "--workers", str(w), "--threads", str(args.threads)])
+                    for w in args.workers]
+    except ImportError:
+        print("gunicorn is not installed; skipping the gunicorn configurations")
+
+    payloads = make_profiles(args.requests, seed=3)
+    print(f"{args.requests} /predict requests from {args.clients} clients, {os.cpu_count()} CPUs")
+    print(f"{'server':<16} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}   on SIGTERM under load")
+    for name, command in servers:
+        port = free_port()
+        process = start(command, port)
+        url = f"http://127.0.0.1:{port}/predict"
+        try:
+            result = load_test(url, payloads, args.clients)
+        except Exception:
+            stop(process)
+            raise
+        drained = shutdown_under_load(process, url, payloads, args.clients)
+        print(f"{name:<16} {result['rps']:9.1f} {result['p50']:8.2f} {result['p95']:8.2f} {result['p99']:8.2f} "
+              f"{result['errors']:7d}   {drained['completed']} completed, {drained['dropped']} dropped")
+
+if __name__ == "__main__":
+    main()
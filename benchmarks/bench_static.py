@@ -0,0 +1,110 @@
+"""
+Cost of serving the frontend: ``send_from_directory`` against ``static_assets``.
+
+Replays page loads (each HTML page plus the CSS/JS it references) through
+the Flask test client, first with the previous ``send_from_directory``
+routes, then with the in-memory fingerprinted assets. For the latter it
+measures a first visit (full download, compressed when the client accepts
+it) and a repeat visit (HTML revalidated with ``If-None-Match``, fingerprinted
+assets taken from the browser cache). Reports worker CPU time per page load
+and bytes sent.
+
+Usage:
+    python benchmarks/bench_static.py [--loads 300]
+"""
+
+import argparse
+import re
+import time
+
+from flask import Flask, send_from_directory
+
+import synthetic  # noqa: F401 (puts api/ on sys.path)
+from static_assets import StaticAssets
+import app as app_module
+
+PAGES = ["index.html", "about.html", "calculator.html", "chatbot.html", "report.html"]
+ASSET_REFERENCE = re.compile(r"""(?:src|href)=["']([^"'#?:]+\.(?:css|js))["']""")
+
+def legacy_app(folder):
+    """The previous frontend routes: every file read from disk on each request."""
+    legacy = Flask("legacy", static_folder=None)
+
+    @legacy.route("/<path:filename>")
+    def serve(filename):
+        return send_from_directory(folder, filename)
+
+    return legacy
+
+def page_urls(client, page):
+    """Return the page and the CSS/JS it references, as served by ``client``."""
+    text = client.get("/" + page).get_data(as_text=True)
+    return [page] + ASSET_REFERENCE.findall(text)
+
+def page_load(client, urls, headers, cached=None):
+    """
+    Request a page and its CSS/JS.
+
+    Args:
+        client: Flask test client.
+        urls (list): Page followed by its assets.
+        headers (dict): Request headers (e.g. Accept-Encoding).
+        cached (dict, optional): URL -> (ETag, Cache-Control) from a previous
+            visit; ``immutable`` URLs are skipped, others are revalidated.
+
+    Returns:
+        tuple: (bytes received, dict of URL -> (ETag, Cache-Control)).
+    """
+    received = 0
+    seen = {}
+    for url in urls:
+        request_headers = dict(headers)
+        if cached and url in cached:
+            etag, cache_control = cached[url]
+            if "immutable" in cache_control:
+                continue
+            if etag:
+                request_headers["If-None-Match"] = etag
+        response = client.get("/" + url, headers=request_headers)
+        received += len(response.data)
+        seen[url] = (response.headers.get("ETag"), response.headers.get("Cache-Control") or "")
+        response.close()
+    return received, seen
+
+def run(client, loads, headers, repeat_visit=False):
+    """Time ``loads`` page loads; return (CPU ms per load, bytes per load)."""
+    urls = {page: page_urls(client, page) for page in PAGES}
+    first = {page: page_load(client, urls[page], headers)[1] for page in PAGES}
+    total_bytes = 0
+    start = time.process_time()
+    for i in range(loads):
+        page = PAGES[i % len(PAGES)]
+        received, _ = page_load(client, urls[page], headers, first[page] if repeat_visit else None)
+        total_bytes += received
+    return (time.process_time() - start) / loads * 1000, total_bytes / loads
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--loads", type=int, default=300, help="page loads per scenario")
+    args = parser.parse_args()
+
+    assets = app_module.static_assets or StaticAssets(app_module.FRONTEND_FOLDER)
+    app_module.static_assets = assets
+    print(f"{len(assets.assets)} assets from {assets.root}; encodings: {', '.join(assets.encodings())}")
+    legacy = legacy_app(assets.root).test_client()
+    current = app_module.create_app().test_client()
+    compressed = {"Accept-Encoding": "gzip, deflate, br"}
+
+    print(f"{'scenario':<44} {'CPU ms/load':>12} {'KB/load':>9}")
+    for name, client, headers, repeat in [
+        ("send_from_directory", legacy, {}, False),
+        ("send_from_directory, repeat visit", legacy, {}, True),
+        ("static_assets, first visit, no compression", current, {}, False),
+        ("static_assets, first visit, compressed", current, compressed, False),
+        ("static_assets, repeat visit", current, compressed, True),
+    ]:
+        cpu_ms, size = run(client, args.loads, headers, repeat)
+        print(f"{name:<44} {cpu_ms:12.3f} {size / 1024:9.1f}")
+
+if __name__ == "__main__":
+    main()
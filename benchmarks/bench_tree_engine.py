@@ -0,0 +1,79 @@
+"""
+Accuracy parity and latency of the compiled tree engine vs. sklearn/xgboost.
+
+Scores held-out synthetic athlete profiles (a different seed from the
+engine's own compile-time probe) with both backends, checks that the
+ensemble probabilities agree within ``tree_engine.PARITY_TOLERANCE`` and
+that every predicted class matches, then times both at several batch sizes.
+
+Usage:
+    python benchmarks/bench_tree_engine.py [--n 2000] [--batch-sizes 1 32 1024]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from synthetic import make_profiles
+import model_registry
+import tree_engine
+from features import FEATURES, encode_records
+
+def library_proba(X):
+    return (model_registry.get("rf_model").predict_proba(X) + model_registry.get("xgb_model").predict_proba(X)) / 2
+
+def check_parity(engine, X):
+    """
+    Compare the engine against the libraries.
+
+    Args:
+        engine (tree_engine.CompiledEnsemble): Compiled engine.
+        X (np.ndarray): Held-out feature rows.
+
+    Returns:
+        float: Maximum absolute probability difference.
+
+    Raises:
+        AssertionError: If probabilities or predicted classes disagree.
+    """
+    expected = library_proba(X)
+    actual = engine.predict_proba(X)
+    diff = np.abs(actual - expected).max()
+    assert diff <= tree_engine.PARITY_TOLERANCE, f"probability mismatch {diff:.2e}"
+    assert (actual.argmax(axis=1) == expected.argmax(axis=1)).all(), "predicted class mismatch"
+    return diff
+
+def median_ms(fn, X, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=2000, help="number of held-out rows for the parity check")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 1024])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    X = encode_records(make_profiles(max(args.n, max(args.batch_sizes)), seed=2024))
+    start = time.perf_counter()
+    engine = tree_engine.compile_ensemble(model_registry.get("rf_model"), model_registry.get("xgb_model"), len(FEATURES))
+    print(f"Compiled {engine.n_trees} trees ({len(engine.threshold)} nodes, max depth {engine.max_depth}) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    diff = check_parity(engine, X[:args.n])
+    print(f"Parity OK on {args.n} held-out rows (max |dp| = {diff:.2e}, all classes match)")
+
+    print(f"{'batch':>6} {'sklearn+xgb ms':>15} {'compiled ms':>12} {'speedup':>8}")
+    for size in args.batch_sizes:
+        Xb = X[:size]
+        lib = median_ms(library_proba, Xb, args.repeat)
+        comp = median_ms(engine.predict_proba, Xb, args.repeat)
+        print(f"{size:>6} {lib:>15.2f} {comp:>12.2f} {lib / comp:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
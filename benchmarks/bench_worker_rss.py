@@ -0,0 +1,112 @@
+"""
+Memory footprint of N forked workers under different model loading modes.
+
+Modes:
+    eager:   every worker loads all artifacts itself after fork (the previous
+             import-time behaviour of a gunicorn worker without --preload).
+    mmap:    every worker loads lazily with the RandomForest arrays memory-mapped.
+    preload: the master preloads (and gc-freezes) before forking.
+
+Each worker scores a few synthetic requests, then the master reads the
+workers' RSS and PSS (proportional set size, which splits shared pages
+between the processes sharing them) from /proc. Linux only.
+
+Usage:
+    python benchmarks/bench_worker_rss.py [--workers 4] [--mode all]
+"""
+
+import argparse
+import os
+import sys
+
+from synthetic import make_profiles
+
+MODES = ("eager", "mmap", "preload")
+
+def _memory_kb(pid):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(rest.split()[0])
+    return values
+
+def run_mode(mode, workers, requests):
+    """
+    Fork workers for one loading mode and measure their memory.
+
+    Args:
+        mode (str): One of ``MODES``.
+        workers (int): Number of worker processes.
+        requests (int): Predictions each worker runs before measuring.
+
+    Returns:
+        dict: Summed RSS and PSS in MB for master and workers.
+    """
+    import model_registry
+    import predict
+
+    model_registry.registry = model_registry.ModelRegistry(model_registry.MODEL_DIR, mmap=(mode == "mmap"))
+    predict._encoders_checked = False
+    if mode == "preload":
+        report = model_registry.preload()
+        for name, stats in report["artifacts"].items():
+            print(f"  {name:14s} {stats['load_seconds']:7.3f}s  RSS +{stats['rss_delta_mb']} MB")
+
+    profiles = make_profiles(requests)
+    pids = []
+    ready_r, ready_w = os.pipe()
+    release_r, release_w = os.pipe()
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            for profile in profiles:
+                predict.predict_injury_risk(profile)
+            os.write(ready_w, b"x")
+            os.read(release_r, 1)
+            os._exit(0)
+        pids.append(pid)
+
+    for _ in range(workers):
+        os.read(ready_r, 1)
+    usage = [_memory_kb(pid) for pid in pids]
+    master = _memory_kb(os.getpid())
+    os.write(release_w, b"x" * workers)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    for fd in (ready_r, ready_w, release_r, release_w):
+        os.close(fd)
+
+    return {
+        "workers_rss_mb": sum(u["Rss"] for u in usage) / 1024,
+        "workers_pss_mb": sum(u["Pss"] for u in usage) / 1024,
+        "master_pss_mb": master["Pss"] / 1024,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4, help="number of forked workers")
+    parser.add_argument("--requests", type=int, default=20, help="predictions per worker before measuring")
+    parser.add_argument("--mode", choices=MODES + ("all",), default="all")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        sys.exit("This benchmark needs Linux /proc/<pid>/smaps_rollup.")
+
+    modes = MODES if args.mode == "all" else (args.mode,)
+    if len(modes) > 1:
+        # Each mode runs in a fresh interpreter so earlier loads do not leak in
+        for mode in modes:
+            os.system(f"{sys.executable} {os.path.abspath(__file__)} --workers {args.workers} "
+                      f"--requests {args.requests} --mode {mode}")
+        return
+
+    mode = modes[0]
+    print(f"[{mode}] {args.workers} workers")
+    result = run_mode(mode, args.workers, args.requests)
+    print(f"  workers RSS sum {result['workers_rss_mb']:8.1f} MB   "
+          f"workers PSS sum {result['workers_pss_mb']:8.1f} MB   master PSS {result['master_pss_mb']:8.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Local stand-in for the Cohere ``/v1/generate`` endpoint.
+
+Answers every POST with a Cohere-shaped body after a configurable delay, over
+HTTP/1.1 keep-alive, and counts the TCP connections it accepted so connection
+reuse can be checked. Point the API at it with
+``COHERE_API_URL=http://127.0.0.1:8100/v1/generate``.
+
+Usage:
+    python benchmarks/mock_llm_server.py [--port 8100] [--latency-ms 200] [--jitter-ms 50] [--error-rate 0]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.requests += 1
+        delay = self.server.latency_ms + random.uniform(-self.server.jitter_ms, self.server.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000)
+
+        if random.random() < self.server.error_rate:
+            status, payload = 500, {"message": "mock upstream error"}
+        else:
+            try:
+                prompt = json.loads(body).get("prompt", "")
+            except ValueError:
+                prompt = ""
+            question = prompt.rsplit("User:", 1)[-1].split("\n", 1)[0].strip()
+            status, payload = 200, {"generations": [{"text": f" Mock answer to: {question}"}]}
+        data = json.dumps(payload).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client gave up (e.g. hit its read timeout)
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(port=8100, latency_ms=200.0, jitter_ms=0.0, error_rate=0.0):
+    """
+    Start the mock server on a background thread.
+
+    Args:
+        port (int): Port to bind on 127.0.0.1 (0 picks a free one).
+        latency_ms (float): Mean response delay.
+        jitter_ms (float): Uniform jitter added to the delay.
+        error_rate (float): Fraction of requests answered with HTTP 500.
+
+    Returns:
+        ThreadingHTTPServer: The running server (``server_address``,
+        ``requests`` and ``connections`` attributes; call ``shutdown()`` to stop).
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockLLMHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.latency_ms = latency_ms
+    server.jitter_ms = jitter_ms
+    server.error_rate = error_rate
+    server.requests = 0
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"Mock LLM listening on http://127.0.0.1:{server.server_address[1]}/v1/generate")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
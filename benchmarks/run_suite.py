@@ -0,0 +1,299 @@
+"""
+Benchmark suite for the prediction service, with baseline comparison.
+
+Runs offline against synthetic athlete profiles and the models in ``model/``:
+
+- micro-benchmarks: ``preprocess_data``, ``encode_record``, each model's
+  ``predict_proba`` (1 row and a batch), the calibrator,
+  ``explain_features`` (1 row) and ``generate_recommendations`` (single and batch);
+- end-to-end load tests: ``/predict`` and ``/chat`` (against
+  ``mock_llm_server``) over HTTP on a threaded in-process server, reporting
+  p50/p95/p99 latency and requests per second.
+
+Results can be saved as a baseline and later runs compared against it;
+metrics that got worse by more than ``--threshold`` are flagged and the
+script exits with status 1. Baselines depend on the machine and on the model
+artifacts, so record one per environment (``benchmarks/results/`` is ignored
+by git).
+
+Usage:
+    python benchmarks/run_suite.py [--quick] [--save benchmarks/results/baseline.json]
+    python benchmarks/run_suite.py --compare benchmarks/results/baseline.json [--threshold 0.2]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from synthetic import make_profiles
+from mock_llm_server import start_server
+
+# Metrics where larger is better; everything else is a latency
+HIGHER_IS_BETTER = ("rps",)
+
+def summarize(samples_ms, unit="ms"):
+    """
+    Summarize latency samples.
+
+    Args:
+        samples_ms (list): Latencies in milliseconds.
+        unit (str): "ms" or "us" for the reported values.
+
+    Returns:
+        dict: p50/p95/p99/mean in ``unit`` and the sample count.
+    """
+    scale = 1000.0 if unit == "us" else 1.0
+    values = np.asarray(samples_ms) * scale
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"unit": unit, "p50": round(float(p50), 3), "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3), "mean": round(float(values.mean()), 3), "n": int(len(values))}
+
+def time_calls(fn, args_list, unit="us"):
+    """
+    Time ``fn`` once per argument, after one warm-up call.
+
+    Args:
+        fn: Callable taking one argument.
+        args_list (list): Arguments, one per timed call.
+        unit (str): Reported unit.
+
+    Returns:
+        dict: Latency summary.
+    """
+    fn(args_list[0])
+    samples = []
+    for arg in args_list:
+        start = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples, unit)
+
+def run_micro(records, repeat):
+    """
+    Micro-benchmark the pipeline stages.
+
+    Args:
+        records (list): Raw input records.
+        repeat (int): Timed calls per benchmark.
+
+    Returns:
+        dict: Benchmark name -> latency summary.
+    """
+    import model_registry
+    from features import encode_record, encode_records
+    from predict import preprocess_data, explain_features, _ensemble_proba
+    from recommendation import generate_recommendations, generate_recommendations_batch
+
+    singles = records[:repeat]
+    rows = [encode_record(r) for r in singles]
+    batch_size = min(256, len(records))
+    batches = [encode_records(records[:batch_size])] * max(repeat // 10, 3)
+    rf, xgb, calibrator = (model_registry.get(n) for n in ("rf_model", "xgb_model", "calibrator"))
+    probs = [_ensemble_proba(X) for X in rows]
+
+    return {
+        "preprocess_data": time_calls(preprocess_data, singles),
+        "encode_record": time_calls(encode_record, singles),
+        "rf_predict_proba_1": time_calls(rf.predict_proba, rows),
+        "xgb_predict_proba_1": time_calls(xgb.predict_proba, rows),
+        f"rf_predict_proba_{batch_size}": time_calls(rf.predict_proba, batches, unit="ms"),
+        f"xgb_predict_proba_{batch_size}": time_calls(xgb.predict_proba, batches, unit="ms"),
+        "calibrator_predict_proba_1": time_calls(calibrator.predict_proba, probs),
+        "explain_features_1": time_calls(explain_features, rows),
+        "generate_recommendations": time_calls(generate_recommendations, singles),
+        "generate_recommendations_batch_1000": time_calls(
+            generate_recommendations_batch, [records[:1000]] * max(repeat // 20, 3), unit="ms"),
+    }
+
+def load_test(url, payloads, clients):
+    """
+    Send every payload once from ``clients`` concurrent threads (keep-alive sessions).
+
+    Args:
+        url (str): Endpoint URL.
+        payloads (list): JSON bodies.
+        clients (int): Concurrent client threads.
+
+    Returns:
+        dict: Latency summary plus ``rps`` and ``errors`` (non-200 responses).
+    """
+    import requests
+
+    local = threading.local()
+
+    def one(payload):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        status = session.post(url, json=payload).status_code
+        return (time.perf_counter() - start) * 1000, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        results = list(pool.map(one, payloads))
+    wall = time.perf_counter() - start
+    summary = summarize([ms for ms, _ in results])
+    summary["rps"] = round(len(results) / wall, 2)
+    summary["errors"] = sum(status != 200 for _, status in results)
+    return summary
+
+def run_load(records, n_requests, clients, llm_latency_ms):
+    """
+    Load-test ``/predict`` and ``/chat`` on an in-process threaded server.
+
+    Args:
+        records (list): Raw input records for ``/predict``.
+        n_requests (int): Requests per endpoint.
+        clients (int): Concurrent clients.
+        llm_latency_ms (float): Mock LLM response delay.
+
+    Returns:
+        dict: Endpoint -> load summary.
+    """
+    import logging
+    from werkzeug.serving import make_server
+
+    mock = start_server(0, llm_latency_ms, 0.0)
+    os.environ["COHERE_API_URL"] = f"http://127.0.0.1:{mock.server_address[1]}/v1/generate"
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", str(clients))
+    from app import app
+    for name in ("", "werkzeug"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        predict_payloads = [records[i % len(records)] for i in range(n_requests)]
+        chat_payloads = [{"message": f"how do i prevent shin splints #{i}"} for i in range(n_requests)]
+        return {
+            "predict_endpoint": load_test(f"{base}/predict", predict_payloads, clients),
+            "chat_endpoint": load_test(f"{base}/chat", chat_payloads, clients),
+        }
+    finally:
+        server.shutdown()
+        mock.shutdown()
+
+def environment():
+    """Describe the machine, library versions and model artifacts the results belong to."""
+    import model_registry
+    import sklearn
+    import xgboost
+
+    digest = hashlib.sha256()
+    for filename, mtime, size in model_registry.registry.fingerprint():
+        digest.update(f"{filename}:{size}".encode())
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "xgboost": xgboost.__version__,
+        "models": digest.hexdigest()[:16],
+        "inference_backend": os.environ.get("INFERENCE_BACKEND", "sklearn"),
+    }
+
+def compare(results, baseline, threshold, metrics=("p50", "p95", "rps")):
+    """
+    Flag metrics that regressed against a baseline.
+
+    Latencies regress when they grow by more than ``threshold``; throughput
+    (rps) when it drops by more than ``threshold``.
+
+    Args:
+        results (dict): Current ``benchmarks`` section.
+        baseline (dict): Baseline ``benchmarks`` section.
+        threshold (float): Allowed relative change, e.g. 0.2 for 20%.
+        metrics (tuple): Metrics to compare (p99 is noisy on shared machines).
+
+    Returns:
+        list: ``(benchmark, metric, baseline, current, change)`` for each regression.
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None or base.get("unit") != current.get("unit"):
+            continue
+        for metric in metrics:
+            if metric not in current or metric not in base or not base[metric]:
+                continue
+            change = (current[metric] - base[metric]) / base[metric]
+            worse = change < -threshold if metric in HIGHER_IS_BETTER else change > threshold
+            if worse:
+                regressions.append((name, metric, base[metric], current[metric], change))
+    return regressions
+
+def print_results(results, baseline=None):
+    print(f"{'benchmark':<38} {'unit':>4} {'p50':>10} {'p95':>10} {'p99':>10} {'rps':>9}")
+    for name, r in results.items():
+        rps = f"{r['rps']:9.1f}" if "rps" in r else " " * 9
+        line = f"{name:<38} {r['unit']:>4} {r['p50']:10.2f} {r['p95']:10.2f} {r['p99']:10.2f} {rps}"
+        if baseline and name in baseline:
+            line += f"   (baseline p50 {baseline[name]['p50']:.2f})"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quick", action="store_true", help="fewer iterations (smoke test)")
+    parser.add_argument("--repeat", type=int, default=500, help="timed calls per micro-benchmark")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per endpoint in load tests")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent clients in load tests")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="mock LLM delay")
+    parser.add_argument("--only", choices=("micro", "load"), help="run one part of the suite")
+    parser.add_argument("--save", help="write results to this JSON file (e.g. a new baseline)")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change flagged as a regression")
+    parser.add_argument("--metrics", nargs="+", default=["p50", "p95", "rps"], choices=("p50", "p95", "p99", "rps"),
+                        help="metrics compared against the baseline")
+    args = parser.parse_args()
+    if args.quick:
+        args.repeat, args.requests = 100, 200
+    # Measure the uncached paths (read when predict/app are imported)
+    os.environ["PREDICTION_CACHE_SIZE"] = "0"
+    os.environ["CHAT_CACHE_SIZE"] = "0"
+
+    records = make_profiles(max(args.repeat, 2000), seed=7)
+    results = {}
+    if args.only != "load":
+        results.update(run_micro(records, args.repeat))
+    if args.only != "micro":
+        results.update(run_load(records, args.requests, args.clients, args.llm_latency_ms))
+    report = {"environment": environment(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "benchmarks": results}
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline and baseline["benchmarks"])
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if baseline:
+        if baseline["environment"] != report["environment"]:
+            print("Warning: baseline was recorded in a different environment:")
+            for key, value in report["environment"].items():
+                if baseline["environment"].get(key) != value:
+                    print(f"  {key}: {baseline['environment'].get(key)} -> {value}")
+        regressions = compare(results, baseline["benchmarks"], args.threshold, tuple(args.metrics))
+        for name, metric, base, current, change in regressions:
+            print(f"REGRESSION {name}.{metric}: {base} -> {current} ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
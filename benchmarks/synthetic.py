@@ -0,0 +1,60 @@
+"""
+Synthetic athlete profiles for offline benchmarks.
+
+Profiles are drawn from the categorical mappings used by the API, so every
+benchmark exercises the same encoding paths as real traffic.
+"""
+
+import os
+import random
+import sys
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api")
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from features import gender_mapping, sport_type_mapping, experience_mapping, injury_type_mapping
+
+def make_profile(rng):
+    """
+    Draw one random athlete profile.
+
+    Args:
+        rng (random.Random): Random number generator.
+
+    Returns:
+        dict: Raw input record as accepted by ``/predict``.
+    """
+    total_hours = 0 if rng.random() < 0.05 else round(rng.uniform(1, 30), 1)
+    return {
+        "Age": rng.randint(16, 45),
+        "Gender": rng.choice(list(gender_mapping)),
+        "Sport_Type": rng.choice(list(sport_type_mapping)),
+        "Experience_Level": rng.choice(list(experience_mapping)),
+        "Flexibility_Score": round(rng.uniform(1, 10), 1),
+        "Total_Weekly_Training_Hours": total_hours,
+        "High_Intensity_Training_Hours": round(rng.uniform(0, total_hours), 1),
+        "Strength_Training_Frequency": rng.randint(0, 5),
+        "Recovery_Time_Between_Sessions": round(rng.uniform(2, 48), 1),
+        "Training_Load_Score": rng.randint(0, 100),
+        "Sprint_Speed": round(rng.uniform(5, 12), 2),
+        "Endurance_Score": round(rng.uniform(1, 10), 1),
+        "Agility_Score": round(rng.uniform(1, 10), 1),
+        "Fatigue_Level": rng.randint(1, 10),
+        "Previous_Injury_Count": rng.randint(0, 5),
+        "Previous_Injury_Type": rng.choice(list(injury_type_mapping)),
+    }
+
+def make_profiles(n, seed=42):
+    """
+    Draw ``n`` reproducible athlete profiles.
+
+    Args:
+        n (int): Number of profiles.
+        seed (int): Random seed.
+
+    Returns:
+        list: Raw input records.
+    """
+    rng = random.Random(seed)
+    return [make_profile(rng) for _ in range(n)]